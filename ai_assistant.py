@@ -0,0 +1,215 @@
+# --- AI ASSISTANT (SARAN SOLUSI) ---
+# Saran disimpan per tiket di tabel ai_suggestions, dikunci hash isi tiket, jadi
+# membuka tiket yang sama tidak memanggil Gemini lagi. Request identik yang
+# bersamaan digabung jadi satu panggilan, dan token bucket menjaga kuota API.
+# Model client bisa diganti (FakeModelClient) untuk uji offline.
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from db import AISuggestion, session_scope, get_wib_time
+from perf import timer
+
+GEMINI_MODEL = 'gemini-2.0-flash-lite-001'
+
+class QuotaExceeded(Exception):
+    pass
+
+# --- MODEL CLIENT ---
+class GeminiClient:
+    def __init__(self, model_name=GEMINI_MODEL, api_key=None):
+        import google.generativeai as genai
+        from google.api_core.exceptions import ResourceExhausted
+        if api_key:
+            genai.configure(api_key=api_key)
+        self.name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self._quota_error = ResourceExhausted
+
+    def generate(self, prompt):
+        try:
+            return self.model.generate_content(prompt).text
+        except self._quota_error as e:
+            raise QuotaExceeded(str(e)) from e
+
+    def stream(self, prompt):
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True):
+                if chunk.text:
+                    yield chunk.text
+        except self._quota_error as e:
+            raise QuotaExceeded(str(e)) from e
+
+class FakeModelClient:
+    # Pengganti Gemini untuk development/benchmark tanpa API key
+    name = "fake-model"
+
+    def __init__(self, delay=0.5, reply=None):
+        self.delay = delay
+        self.reply = reply
+        self.calls = 0
+
+    def generate(self, prompt):
+        return "".join(self.stream(prompt))
+
+    def stream(self, prompt):
+        self.calls += 1
+        reply = self.reply or "- Restart perangkat.\n- Cek kabel & koneksi.\n- Eskalasi ke tim IT bila masih error."
+        parts = reply.split("\n")
+        for part in parts:
+            time.sleep(self.delay / len(parts))
+            yield part + "\n"
+
+# --- RATE LIMIT ---
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait_time(self):
+        with self._lock:
+            self._refill()
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def refund(self):
+        # Kembalikan token dari try_acquire yang ternyata tidak perlu dihitung
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def drain(self):
+        # Dipakai saat API bilang kuota habis: jangan kirim request lagi sampai terisi
+        with self._lock:
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+
+# --- SERVICE ---
+def build_prompt(description, category, related_asset, context=None):
+    # context: ringkasan tiket serupa yang sudah selesai (lihat similarity.py)
+    reference = f"""
+    Referensi tiket serupa yang sudah selesai:
+    {context}
+    """ if context else ""
+    return f"""
+    Role: Senior IT Support.
+    Masalah: {description}
+    Kategori: {category}
+    Aset: {related_asset if related_asset else 'Umum'}
+    {reference}
+    Berikan solusi teknis singkat (bullet points) dalam Bahasa Indonesia.
+    """
+
+def suggestion_key(model_name, description, category, related_asset):
+    raw = "\x1f".join([model_name, description or "", category or "", related_asset or ""])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class SuggestionService:
+    def __init__(self, client, session_factory, limiter=None, max_workers=2):
+        self.client = client
+        self.session_factory = session_factory
+        self.limiter = limiter
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-suggest")
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def key_for(self, description, category, related_asset):
+        return suggestion_key(self.client.name, description, category, related_asset)
+
+    def get_cached(self, key):
+        with session_scope(self.session_factory) as s:
+            row = s.query(AISuggestion.content).filter(AISuggestion.input_hash == key).first()
+            return row.content if row else None
+
+    def submit(self, ticket_id, description, category, related_asset, context=None):
+        # Return Future; request yang sama selagi masih diproses memakai Future yang sama
+        key = self.key_for(description, category, related_asset)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                self._executor.submit(self._run, future, key, ticket_id, description, category, related_asset, context)
+        return future
+
+    def stream(self, ticket_id, description, category, related_asset, context=None):
+        # Generator potongan teks untuk st.write_stream. Kalau sudah ada di cache
+        # atau sedang diproses di thread lain, hasilnya diberikan utuh.
+        key = self.key_for(description, category, related_asset)
+        cached = self.get_cached(key)
+        if cached:
+            yield cached
+            return
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            yield future.result()
+            return
+        try:
+            self._acquire()
+            parts = []
+            with timer(f"ai:{self.client.name}"):
+                for part in self.client.stream(build_prompt(description, category, related_asset, context)):
+                    parts.append(part)
+                    yield part
+            content = "".join(parts)
+            self._save(key, ticket_id, content)
+            future.set_result(content)
+        except BaseException as e:
+            if isinstance(e, QuotaExceeded) and self.limiter:
+                self.limiter.drain()
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _run(self, future, key, ticket_id, description, category, related_asset, context=None):
+        try:
+            content = self.get_cached(key)
+            if content is None:
+                self._acquire()
+                with timer(f"ai:{self.client.name}"):
+                    content = self.client.generate(build_prompt(description, category, related_asset, context))
+                self._save(key, ticket_id, content)
+            future.set_result(content)
+        except Exception as e:
+            if isinstance(e, QuotaExceeded) and self.limiter:
+                self.limiter.drain()
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _acquire(self):
+        if self.limiter and not self.limiter.try_acquire():
+            raise QuotaExceeded(f"Batas request AI tercapai, coba lagi dalam {int(self.limiter.wait_time()) + 1} detik.")
+
+    def _save(self, key, ticket_id, content):
+        try:
+            with session_scope(self.session_factory) as s:
+                s.add(AISuggestion(ticket_id=ticket_id, input_hash=key, model=self.client.name, content=content, created_at=get_wib_time()))
+                s.commit()
+        except Exception as e:
+            # Mis. unique violation karena proses lain menyimpan lebih dulu: tidak masalah
+            print(f"⚠️ Gagal simpan saran AI: {e}")
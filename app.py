@@ -1,15 +1,38 @@
 import streamlit as st
+import streamlit.components.v1 as components
+import json
+import bisect
 import pandas as pd
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
-from datetime import datetime
-import os
-from passlib.hash import pbkdf2_sha256
+from sqlalchemy import text
+from datetime import datetime, timedelta
 import time
-import requests
-import google.generativeai as genai 
-from google.api_core.exceptions import ResourceExhausted
-import pytz  # <-- [UPDATE] Import Library Timezone
+import tempfile
+import uuid
+import logging
+from contextlib import nullcontext
+from collections import deque
+from db import (
+    Asset, Ticket, Comment, ArchivedTicket, ArchivedComment, get_wib_time, get_schema_version, migrate, SCHEMA_VERSION,
+    build_engine, make_session_factory, session_scope, get_pool_stats, get_ticket_stats,
+    list_tickets_page, search_tickets, list_assets_page, load_asset_options,
+    build_asset_catalogue, search_asset_catalogue, asset_label, get_asset_health, list_asset_tickets,
+    bulk_update_tickets, add_ticket_comments, add_ticket_events, list_events_since, list_recent_events,
+    POOL_SIZE, MAX_OVERFLOW,
+)
+from chatbus import ChatBus, ChatMessage, CHAT_NOTIFY_CHANNEL, PROCESS_ID, notify_payload, start_pg_listener
+from notifier import TelegramNotifier, TELEGRAM_API
+from perf import REGISTRY as perf, start_metrics_server, profile
+from auth import AuthService, LoginThrottled, LoginBusy, ensure_default_admin
+from archive import ArchiveWorker, ARCHIVE_INTERVAL_HOURS
+from bulk import CONFLICT_POLICIES, FILE_FORMATS, import_assets, import_tickets, export_rows, format_result
+from attachments import AttachmentService, LocalAttachmentStore, S3AttachmentStore
+from ai_assistant import GeminiClient, FakeModelClient, SuggestionService, TokenBucket, QuotaExceeded
+from reports import EXPORT_FORMATS, export_resolved
+from sla import load_thresholds, compute_sla, get_sla_summary, get_sla_watchlist, DUE_SOON_HOURS
+from similarity import SimilarityIndex, iter_resolved_tickets, load_similar_details, format_prompt_context, ticket_text
+
+# Mulai ukur script run ini (SQL, panggilan eksternal, waktu render)
+perf_run, perf_token = perf.start_run("startup")
 
 # --- KONFIGURASI HALAMAN ---
 st.set_page_config(
@@ -22,109 +45,170 @@ st.set_page_config(
 # --- 🔗 KONFIGURASI WHATSAPP ---
 WA_LINK = "https://chat.whatsapp.com/Dg09QTJ9f9gFemTnQoYM0o" 
 
-# Setup Gemini AI
-if "GOOGLE_API_KEY" in st.secrets:
-    genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-
 # --- DATABASE SETUP ---
-Base = declarative_base()
-engine = create_engine(st.secrets["DB_URL"])
-Session = sessionmaker(bind=engine)
-session = Session()
+# Engine & pool dibuat sekali per proses server (bukan tiap rerun), session per script run
+@st.cache_resource
+def get_engine():
+    return perf.instrument_engine(build_engine(
+        st.secrets["DB_URL"],
+        pool_size=int(st.secrets.get("DB_POOL_SIZE", POOL_SIZE)),
+        max_overflow=int(st.secrets.get("DB_MAX_OVERFLOW", MAX_OVERFLOW)),
+    ))
+
+@st.cache_resource
+def get_session_factory():
+    return make_session_factory(get_engine())
 
-# --- FUNGSI WAKTU WIB (BARU) ---
-# Fungsi ini memastikan waktu selalu WIB, tidak peduli server ada di mana
-def get_wib_time():
-    utc_now = datetime.now(pytz.utc)
-    wib_now = utc_now.astimezone(pytz.timezone('Asia/Jakarta'))
-    return wib_now.replace(tzinfo=None) # Hapus info timezone agar DB tidak bingung
-
-# --- MODEL DATABASE ---
-class User(Base):
-    __tablename__ = 'users'
-    id = Column(Integer, primary_key=True)
-    username = Column(String(50), unique=True, nullable=False)
-    password_hash = Column(String(200), nullable=False)
-    role = Column(String(20), default='user') 
-
-class Asset(Base):
-    __tablename__ = 'assets'
-    id = Column(Integer, primary_key=True)
-    name = Column(String(100), nullable=False)
-    category = Column(String(50), nullable=False)
-    serial_number = Column(String(50), unique=True)
-    assigned_to = Column(String(50)) 
-    status = Column(String(20), default='Active') 
-
-class Ticket(Base):
-    __tablename__ = 'tickets'
-    id = Column(Integer, primary_key=True)
-    requester_name = Column(String(100), nullable=False)
-    department = Column(String(50), nullable=False)
-    category = Column(String(50), nullable=False)
-    related_asset = Column(String(100), nullable=True) 
-    priority = Column(String(20), nullable=False)
-    subject = Column(String(200), nullable=False)
-    description = Column(Text, nullable=False)
-    status = Column(String(20), default='Open')
-    created_at = Column(DateTime, default=datetime.now) # Default tetap ada, tapi nanti kita override
-    image_path = Column(String(200), nullable=True)
-    comments = relationship('Comment', backref='ticket', cascade="all, delete-orphan")
-
-class Comment(Base):
-    __tablename__ = 'comments'
-    id = Column(Integer, primary_key=True)
-    ticket_id = Column(Integer, ForeignKey('tickets.id'), nullable=False)
-    sender = Column(String(50), nullable=False)
-    content = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.now)
-
-# Create tables
-Base.metadata.create_all(engine)
+engine = get_engine()
+Session = get_session_factory()
+session = Session()
 
 # --- HELPER FUNCTIONS ---
-def create_default_admin():
-    if not session.query(User).filter_by(username='admin').first():
-        hashed = pbkdf2_sha256.hash("admin123")
-        admin = User(username='admin', password_hash=hashed, role='admin')
-        session.add(admin)
-        session.commit()
-
-def verify_user(username, password):
-    user = session.query(User).filter_by(username=username).first()
-    if user and pbkdf2_sha256.verify(password, user.password_hash):
-        return user
-    return None
+# Login diverifikasi di worker pool AuthService (lihat auth.py)
+@st.cache_resource
+def get_auth_service():
+    return AuthService(Session, secret=st.secrets.get("AUTH_SECRET"))
 
-def save_uploaded_file(uploadedfile):
-    if not os.path.exists("uploads"):
-        os.makedirs("uploads")
-    file_path = os.path.join("uploads", f"{datetime.now().timestamp()}_{uploadedfile.name}")
-    with open(file_path, "wb") as f:
-        f.write(uploadedfile.getbuffer())
-    return file_path
-
-def calculate_sla(created_at, status):
-    if status == 'Resolved':
-        return "Selesai"
-    # Hitung durasi realtime
-    now_wib = get_wib_time()
-    duration = now_wib - created_at
-    hours = duration.total_seconds() / 3600
-    if hours < 24:
-        return f"🟢 {int(hours)} Jam"
-    elif hours < 48:
-        return f"🟡 {int(hours/24)} Hari"
+# --- BOOTSTRAP (SEKALI PER PROSES) ---
+# Skema dibuat/diupdate lewat `python migrate.py`. Di sini hanya cek versi
+# sekali per proses; AUTO_MIGRATE menjalankan migrasi kalau skema belum terbaru.
+# Default hanya aktif untuk SQLite (development lokal): di Postgres DDL & backfill
+# tidak boleh jalan di script run pengunjung pertama.
+@st.cache_resource
+def bootstrap_app():
+    started = time.perf_counter()
+    version = get_schema_version(engine)
+    if version < SCHEMA_VERSION:
+        if not st.secrets.get("AUTO_MIGRATE", engine.dialect.name == "sqlite"):
+            return {"error": f"Skema database versi {version}, butuh versi {SCHEMA_VERSION}. Jalankan `python migrate.py`."}
+        version = migrate(engine)[1]
+    ensure_default_admin(Session)
+    return {"schema_version": version, "bootstrap_ms": (time.perf_counter() - started) * 1000}
+
+# --- OBSERVABILITY ---
+# PERF_METRICS_PORT (mis. 9108): endpoint Prometheus di http://127.0.0.1:<port>/metrics
+# PERF_LOG = true: satu baris JSON per script run ke logger "itsd.perf"
+@st.cache_resource
+def setup_observability():
+    info = {}
+    if st.secrets.get("PERF_LOG"):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logging.getLogger("itsd.perf").addHandler(handler)
+        logging.getLogger("itsd.perf").setLevel(logging.INFO)
+        perf.log_runs = True
+        info["log"] = "itsd.perf"
+    port = st.secrets.get("PERF_METRICS_PORT")
+    if port:
+        try:
+            start_metrics_server(perf, int(port))
+            info["metrics_url"] = f"http://127.0.0.1:{port}/metrics"
+        except OSError as e:
+            print(f"⚠️ Endpoint metrics gagal dibuka: {e}")
+    return info
+
+def profile_current_run():
+    # Profiler aktif per sesi (toggle di halaman Performance), laporan disimpan per halaman
+    if not st.session_state.get("perf_profile"):
+        return nullcontext()
+    reports = st.session_state.setdefault("perf_profiles", {})
+    return profile(lambda text: reports.__setitem__(perf_run.page, text))
+
+# Token sesi disimpan di cookie, bukan di URL: tidak ikut riwayat browser, link
+# yang dibagikan, screenshot, atau header Referer
+AUTH_COOKIE = "itsd_auth"
+LEGACY_AUTH_QUERY_PARAM = "auth"
+
+def start_user_session(user):
+    st.session_state.logged_in = True
+    st.session_state.user_role = user["role"]
+    st.session_state.username = user["username"]
+
+def restore_user_session():
+    # Cookie token -> refresh / reconnect tidak perlu login (dan PBKDF2) ulang
+    if LEGACY_AUTH_QUERY_PARAM in st.query_params:
+        del st.query_params[LEGACY_AUTH_QUERY_PARAM]  # link lama ?auth=... tidak lagi diterima
+    token = st.context.cookies.get(AUTH_COOKIE)
+    if token:
+        user = get_auth_service().verify_token(token)
+        if user:
+            start_user_session(user)
+        else:
+            st.session_state.auth_cookie = ("", 0)
+
+def write_auth_cookie(token, max_age):
+    # Streamlit tidak punya API set-cookie; iframe komponen satu origin dengan
+    # halaman, jadi cookie diset lewat document.cookie milik parent
+    cookie = f"{AUTH_COOKIE}={token}; Path=/; Max-Age={max_age}; SameSite=Strict"
+    components.html(
+        f"<script>window.parent.document.cookie = {json.dumps(cookie)}"
+        " + (window.parent.location.protocol === 'https:' ? '; Secure' : '');</script>",
+        height=0,
+    )
+
+def logout():
+    st.session_state.logged_in = False
+    st.session_state.active_ticket_id = None
+    st.session_state.auth_cookie = ("", 0)
+    for key in EVENT_STATE_KEYS:
+        st.session_state.pop(key, None)
+    st.rerun()
+
+# --- LAMPIRAN ---
+# Default folder lokal "uploads"; set ATTACHMENT_BACKEND = "s3" + S3_BUCKET
+# (opsional S3_ENDPOINT_URL untuk MinIO, S3_PREFIX) untuk object storage
+@st.cache_resource
+def get_attachment_service():
+    if st.secrets.get("ATTACHMENT_BACKEND") == "s3":
+        store = S3AttachmentStore(
+            st.secrets["S3_BUCKET"],
+            prefix=st.secrets.get("S3_PREFIX", ""),
+            endpoint_url=st.secrets.get("S3_ENDPOINT_URL"),
+        )
     else:
-        return f"🔴 {int(hours/24)} Hari"
+        store = LocalAttachmentStore(st.secrets.get("UPLOAD_DIR", "uploads"))
+    return AttachmentService(store)
 
-def send_telegram_alert(ticket_id, name, dept, subject, priority):
+def save_uploaded_file(uploadedfile):
+    # Return key lampiran (disimpan di Ticket.image_path), thumbnail dibuat di background
+    return get_attachment_service().save(uploadedfile.name, uploadedfile.getvalue())
+
+@st.cache_data(ttl=3600, max_entries=200, show_spinner=False)
+def load_attachment_thumbnail(key):
+    thumb = get_attachment_service().thumbnail(key)
+    if thumb is None:
+        # Exception tidak di-cache, jadi rerun berikutnya mencoba lagi
+        raise FileNotFoundError(f"Thumbnail {key} belum tersedia")
+    return thumb
+
+def render_attachment(ticket_id, key):
+    attachments = get_attachment_service()
+    try:
+        st.image(load_attachment_thumbnail(key), caption="Lampiran", width=300)
+    except Exception:
+        # Cek ke storage hanya kalau thumbnail (yang di-cache) tidak tersedia
+        if not attachments.exists(key):
+            return
+        st.caption("📎 Lampiran tersedia (preview belum siap).")
+    # File asli baru diambil dari storage kalau diminta
+    if st.toggle("🔍 Tampilkan ukuran asli", key=f"attachment_full_{ticket_id}"):
+        st.image(attachments.load(key), caption="Lampiran (asli)")
+
+# Notifier dibuat sekali per proses; worker thread-nya yang kirim ke Telegram
+@st.cache_resource
+def get_notifier():
     if "TELEGRAM_BOT_TOKEN" in st.secrets and "TELEGRAM_CHAT_ID" in st.secrets:
-        try:
-            token = st.secrets["TELEGRAM_BOT_TOKEN"]
-            chat_id = st.secrets["TELEGRAM_CHAT_ID"]
-            prio_icon = "🔴" if priority in ["High", "Critical"] else "🔵"
-            message = f"""
+        return TelegramNotifier(
+            st.secrets["TELEGRAM_BOT_TOKEN"], st.secrets["TELEGRAM_CHAT_ID"], session_factory=Session,
+            api_base=st.secrets.get("TELEGRAM_API_BASE", TELEGRAM_API),  # bisa diarahkan ke stub lokal (loadtest.py)
+        ).start()
+    return None
+
+def send_telegram_alert(ticket_id, name, dept, subject, priority):
+    notifier = get_notifier()
+    if notifier:
+        prio_icon = "🔴" if priority in ["High", "Critical"] else "🔵"
+        message = f"""
 🚨 *TIKET BARU MASUK!* 🚨
 -----------------------------
 🆔 *ID:* #{ticket_id}
@@ -133,19 +217,311 @@ def send_telegram_alert(ticket_id, name, dept, subject, priority):
 📝 *Masalah:* {subject}
 
 👉 Segera cek dashboard admin!
-            """
-            url = f"https://api.telegram.org/bot{token}/sendMessage"
-            data = {"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
-            requests.post(url, data=data, timeout=5)
-        except Exception as e:
-            print(f"⚠️ Gagal kirim Telegram: {e}")
+        """
+        notifier.send(message)
+
+def send_reply_alert(ticket_id, sender_name, user_msg):
+    notifier = get_notifier()
+    if notifier:
+        notifier.send(f"💬 *BALASAN BARU*\nTiket #{ticket_id}\nOleh: {sender_name}\n\nPesan: {user_msg}")
+
+# --- AI ASSISTANT ---
+AI_REQUESTS_PER_MINUTE = 15
+AI_TIMEOUT = 60
+
+@st.cache_resource
+def get_ai_service():
+    if "GOOGLE_API_KEY" in st.secrets:
+        client = GeminiClient(api_key=st.secrets["GOOGLE_API_KEY"])
+    elif st.secrets.get("AI_FAKE_MODEL"):
+        client = FakeModelClient(delay=float(st.secrets.get("AI_FAKE_DELAY", 0.5))) # Mode offline untuk development
+    else:
+        return None
+    rpm = int(st.secrets.get("AI_REQUESTS_PER_MINUTE", AI_REQUESTS_PER_MINUTE))
+    return SuggestionService(client, Session, TokenBucket(rpm, capacity=max(1, rpm // 3)))
+
+# --- TIKET SERUPA ---
+# Index dibangun sekali per proses (di background) dan diperbarui saat status
+# tiket berubah; rebuild penuh tiap 6 jam atau kalau data sudah tumbuh 2x.
+def load_resolved_rows():
+    with session_scope(Session) as s:
+        yield from iter_resolved_tickets(s)
+
+@st.cache_resource(ttl=6 * 3600)
+def get_similarity_index():
+    return SimilarityIndex().build_async(load_resolved_rows)
+
+def find_similar_tickets(text, exclude_id=None, k=5):
+    matches = get_similarity_index().query(text, k=k, exclude_id=exclude_id)
+    if not matches:
+        return []
+    with session_scope(Session) as s:
+        return load_similar_details(s, matches)
+
+def update_similarity_index(ticket_id, status, subject, description):
+    index = get_similarity_index()
+    if status == 'Resolved':
+        index.add(ticket_id, subject, description)
+    else:
+        index.remove(ticket_id)
+    if index.needs_rebuild():
+        index.build_async(load_resolved_rows)
+
+def render_similar_tickets(details):
+    for d in details:
+        st.markdown(f"**#{d['id']} · {d['subject']}** ({d['score']:.0%} mirip)")
+        if d["solution"]:
+            st.caption(f"✅ Solusi: {d['solution']}")
+
+# --- EXPORT LAPORAN ---
+def build_report(fmt, start_date=None, end_date=None, include_archive=False):
+    # Ditulis ke file sementara (pindah ke disk kalau besar), lalu dibaca sekali
+    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as out:
+        with session_scope(Session) as s:
+            export_resolved(s, fmt, out, start_date, end_date, include_archive)
+        out.seek(0)
+        return out.read()
+
+# --- IMPORT / EXPORT MASSAL (ADMIN) ---
+def build_bulk_export(kind, fmt):
+    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as out:
+        with session_scope(Session) as s:
+            export_rows(s, kind, fmt, out)
+        out.seek(0)
+        return out.read()
+
+def render_bulk_tools(kind):
+    label = "aset" if kind == "assets" else "tiket"
+    uploaded = st.file_uploader(f"Import {label} (CSV / XLSX)", type=["csv", "xlsx"], key=f"bulk_file_{kind}")
+    if kind == "assets":
+        on_conflict = st.selectbox("Kalau serial number sudah ada", CONFLICT_POLICIES, key="bulk_conflict",
+                                   format_func={"skip": "Lewati", "update": "Update data lama", "error": "Catat sebagai error"}.get)
+    if uploaded and st.button(f"🚀 Import {label}", key=f"bulk_import_{kind}", use_container_width=True):
+        try:
+            with st.spinner("Mengimpor data..."):
+                if kind == "assets":
+                    result = import_assets(engine, uploaded, uploaded.name, on_conflict)
+                else:
+                    result = import_tickets(engine, uploaded, uploaded.name)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            invalidate_asset_caches()
+            if kind == "tickets":
+                invalidate_ticket_caches()
+                get_similarity_index().build_async(load_resolved_rows)
+            st.success(format_result(result))
+            if result["errors"]:
+                st.dataframe(pd.DataFrame(result["errors"], columns=["Baris", "Masalah"]), use_container_width=True, hide_index=True)
+
+    backup_format = st.selectbox("Format backup", list(FILE_FORMATS), key=f"bulk_format_{kind}")
+    st.download_button(
+        label=f"💾 Backup semua {label}", data=lambda: build_bulk_export(kind, backup_format),
+        file_name=f"Backup_{kind}_{datetime.now().strftime('%Y-%m-%d')}{backup_format}",
+        mime=FILE_FORMATS[backup_format], use_container_width=True, key=f"bulk_export_{kind}",
+    )
+    if kind == "tickets":
+        st.caption("ℹ️ Backup tiket satu arah: komentar tidak ikut, dan import ulang file ini menambah tiket baru (tidak menimpa tiket dengan ID yang sama).")
+
+# --- CACHE DATA TIKET ---
+# TTL pendek sebagai batas atas; setiap tulis tiket langsung invalidasi.
+@st.cache_data(ttl=30, show_spinner=False)
+def load_ticket_stats():
+    with session_scope(Session) as s:
+        return get_ticket_stats(s)
+
+# Hasil pencarian di-cache sebentar: rerun karena widget lain (ganti halaman,
+# pilih tiket) tidak mengulang query full-text yang sama.
+SEARCH_MIN_CHARS = 2
+
+@st.cache_data(ttl=15, show_spinner=False)
+def load_ticket_search(query, statuses, limit):
+    with session_scope(Session) as s:
+        return search_tickets(s, query, list(statuses), limit)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_archive_search(query, limit):
+    with session_scope(Session) as s:
+        return search_tickets(s, query, limit=limit, archive=True)
+
+# --- ARSIP ---
+# ARCHIVE_AFTER_DAYS (mis. 180) di secrets: tiket Resolved yang lebih tua dipindah
+# ke tabel arsip oleh thread background (lihat archive.py). Tampilan aktif hanya
+# membaca tabel tiket; laporan, pencarian & cek ID bisa ikut membaca arsip.
+@st.cache_resource
+def start_archive_worker():
+    days = st.secrets.get("ARCHIVE_AFTER_DAYS")
+    if not days:
+        return None
+    return ArchiveWorker(
+        engine, int(days), interval_hours=float(st.secrets.get("ARCHIVE_INTERVAL_HOURS", ARCHIVE_INTERVAL_HOURS)),
+        on_archived=lambda result: invalidate_ticket_caches(),
+    ).start()
+
+def load_archived_ticket(ticket_id):
+    # Return (tiket, komentar) dari arsip, atau (None, []) kalau tidak ada
+    ticket = session.get(ArchivedTicket, ticket_id)
+    if ticket is None:
+        return None, []
+    comments = (
+        session.query(ArchivedComment.sender, ArchivedComment.content, ArchivedComment.created_at)
+        .filter(ArchivedComment.ticket_id == ticket_id)
+        .order_by(ArchivedComment.id)
+        .all()
+    )
+    return ticket, comments
+
+# --- SLA ---
+# Ambang per prioritas bisa diubah lewat secrets, mis. [SLA_HOURS] Critical = [2, 4]
+SLA_THRESHOLDS = load_thresholds(st.secrets.get("SLA_HOURS"))
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_sla_overview():
+    now = get_wib_time()
+    with session_scope(Session) as s:
+        return get_sla_summary(s, now, SLA_THRESHOLDS), get_sla_watchlist(s, now, SLA_THRESHOLDS)
+
+def invalidate_ticket_caches():
+    load_ticket_stats.clear()
+    load_asset_health.clear()
+    load_sla_overview.clear()
+    load_ticket_search.clear()
+
+# --- KATALOG ASET ---
+# Katalog (id, nama, SN) dimuat sekali per proses (cache_resource: tanpa salinan
+# per rerun) lalu dicari dengan bisect atas list terurut, jadi mengetik di form
+# tiket tidak query DB & tidak mengirim ribuan opsi ke browser.
+ASSET_NONE_OPTION = "- Tidak Ada / Perangkat Umum -"
+ASSET_PICKER_LIMIT = 50
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def load_asset_catalogue():
+    with session_scope(Session) as s:
+        return build_asset_catalogue(load_asset_options(s))
+
+def find_assets(query, limit=ASSET_PICKER_LIMIT):
+    catalogue = load_asset_catalogue()
+    return search_asset_catalogue(catalogue, query, limit), len(catalogue["labels"])
+
+# Rekap kesehatan aset (tiket per aset / kategori / pemegang) dalam N hari terakhir
+ASSET_HEALTH_WINDOWS = {"30 hari": 30, "90 hari": 90, "1 tahun": 365, "Semua": None}
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_asset_health(days, limit=20):
+    since = get_wib_time() - timedelta(days=days) if days else None
+    with session_scope(Session) as s:
+        health = get_asset_health(s, since, limit)
+    health["assets"] = [tuple(r) for r in health["assets"]]
+    return health
+
+def invalidate_asset_caches():
+    load_asset_catalogue.clear()
+    load_asset_health.clear()
+
+# --- CHAT BUS ---
+# Lihat chatbus.py; fragment chat tetap resync dari DB sesekali
+CHAT_RESYNC_SECONDS = 30
+CHAT_LOOKBACK = 20
+
+@st.cache_resource
+def get_chat_bus():
+    bus = ChatBus()
+    # Tanpa Postgres (mis. SQLite lokal) bus cukup jalan in-memory
+    if engine.dialect.name == "postgresql":
+        start_pg_listener(bus, engine)
+    return bus
+
+def session_origin():
+    # Id sesi browser ini, disimpan di ticket_events.origin (lihat is_own_event)
+    return st.session_state.setdefault("session_origin", uuid.uuid4().hex)
+
+def post_comment(ticket_id, sender, content):
+    new_comment = Comment(ticket_id=ticket_id, sender=sender, content=content, created_at=get_wib_time())
+    session.add(new_comment)
+    session.flush()
+    add_ticket_events(session, "comment", [(ticket_id, content)], actor=sender,
+                      created_at=new_comment.created_at, origin=session_origin())
+    message = ChatMessage(new_comment.id, new_comment.sender, new_comment.content, new_comment.created_at)
+    if engine.dialect.name == "postgresql":
+        session.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHAT_NOTIFY_CHANNEL, "payload": notify_payload(ticket_id)})
+    session.commit()
+    get_chat_bus().publish(ticket_id, message)
+    return new_comment
+
+# --- TINDAKAN MASSAL TIKET (ADMIN) ---
+# Balasan cepat dipakai tombol di detail tiket & aksi massal di tabel tiket
+QUICK_REPLIES = {
+    "✅ Akan Dicek": "Baik, laporan diterima. Sedang kami cek.",
+    "🔄 Restart": "Mohon restart perangkat Anda terlebih dahulu.",
+    "👍 Selesai": "Masalah selesai. Tiket ditutup.",
+}
+
+def apply_bulk_ticket_action(ticket_ids, status=None, priority=None, reply=None):
+    # Satu transaksi untuk semua tiket terpilih (UPDATE ... IN + INSERT executemany).
+    # Notifikasi dikirim sekali per aksi: satu pg_notify untuk semua tiket, satu
+    # pesan Telegram ringkasan; chat bus & index tiket serupa diperbarui di memori.
+    # Tiket yang status/prioritasnya sudah sama tidak dihitung berubah.
+    with session_scope(Session) as s:
+        status_ids, priority_ids = bulk_update_tickets(s, ticket_ids, status=status, priority=priority)
+        changed = sorted(status_ids | priority_ids)
+        comments = add_ticket_comments(s, ticket_ids, "Admin", reply, get_wib_time()) if reply else []
+        add_ticket_events(s, "status", [(tid, status) for tid in sorted(status_ids)],
+                          actor=st.session_state.username, origin=session_origin())
+        add_ticket_events(s, "comment", [(c.ticket_id, reply) for c in comments], actor="Admin", origin=session_origin())
+        if comments and engine.dialect.name == "postgresql":
+            s.execute(
+                text("SELECT pg_notify(:channel, :origin || ':' || CAST(t AS text)) FROM unnest(CAST(:ids AS integer[])) AS t"),
+                {"channel": CHAT_NOTIFY_CHANNEL, "origin": PROCESS_ID, "ids": list(ticket_ids)},
+            )
+        # Teks tiket untuk index tiket serupa (hanya tiket yang statusnya berubah)
+        status_rows = (
+            s.query(Ticket.id, Ticket.subject, Ticket.description).filter(Ticket.id.in_(status_ids)).all()
+            if status_ids else []
+        )
+        s.commit()
+
+    mark_events_read(ticket_ids)
+    bus = get_chat_bus()
+    for c in comments:
+        bus.publish(c.ticket_id, ChatMessage(c.id, "Admin", reply, c.created_at))
+    if changed:
+        invalidate_ticket_caches()
+        index = get_similarity_index()
+        for row in status_rows:
+            if status == 'Resolved':
+                index.add(row.id, row.subject, row.description)
+            else:
+                index.remove(row.id)
+        if index.needs_rebuild():
+            index.build_async(load_resolved_rows)
+
+    notifier = get_notifier()
+    if notifier and (changed or comments):
+        actions = [f"Status → {status} ({len(status_ids)})" if status_ids else None,
+                   f"Prioritas → {priority} ({len(priority_ids)})" if priority_ids else None,
+                   f"Balasan terkirim ({len(comments)})" if comments else None]
+        notified = changed if not comments else ticket_ids
+        ids_text = ", ".join(f"#{tid}" for tid in notified[:30]) + (" ..." if len(notified) > 30 else "")
+        notifier.send(f"🛠️ *TINDAKAN MASSAL* ({len(notified)} tiket)\n{' | '.join(a for a in actions if a)}\n\nTiket: {ids_text}")
+    return len(changed), len(comments)
 
 # --- INIT STATE ---
-create_default_admin()
+bootstrap = bootstrap_app()
+if "error" in bootstrap:
+    # Jangan simpan error di cache: setelah `python migrate.py` run berikutnya cek ulang
+    bootstrap_app.clear()
+    st.error(bootstrap["error"])
+    # st.stop() melewati try/finally di bawah: tutup run & koneksi di sini
+    session.close()
+    perf.finish_run(perf_run, perf_token)
+    st.stop()
+observability = setup_observability()
+start_archive_worker()
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
     st.session_state.user_role = None
     st.session_state.username = None
+    restore_user_session()
 
 if 'active_ticket_id' not in st.session_state:
     st.session_state.active_ticket_id = None
@@ -153,6 +529,7 @@ if 'active_ticket_id' not in st.session_state:
 # --- UI LOGIC ---
 
 def login_page():
+    perf.set_page("login")
     st.markdown("<h1 style='text-align: center;'>🔐 IT Service Desk</h1>", unsafe_allow_html=True)
     col1, col2, col3 = st.columns([1,2,1])
     with col2:
@@ -162,14 +539,18 @@ def login_page():
             submitted = st.form_submit_button("Masuk / Login Admin")
             
             if submitted:
-                user = verify_user(username, password)
-                if user:
-                    st.session_state.logged_in = True
-                    st.session_state.user_role = user.role
-                    st.session_state.username = user.username
-                    st.rerun()
+                auth = get_auth_service()
+                try:
+                    user = auth.login(username, password, st.context.ip_address)
+                except (LoginThrottled, LoginBusy) as e:
+                    st.warning(f"🚦 {e}")
                 else:
-                    st.error("Username atau password salah")
+                    if user:
+                        start_user_session(user)
+                        st.session_state.auth_cookie = (auth.issue_token(user), auth.token_ttl)
+                        st.rerun()
+                    else:
+                        st.error("Username atau password salah")
         
         st.markdown("---")
         if st.button("Masuk sebagai Guest / User Biasa"):
@@ -179,44 +560,105 @@ def login_page():
             st.rerun()
 
 # --- 🔥 FITUR CHAT REAL-TIME ---
+def render_chat_bubble(sender, content, created_at):
+    if sender == "Admin":
+        bg_color = "#e6f3ff"
+        align = "right"
+        sender_display = "👨‍💻 Admin Support"
+        border_color = "#b3d9ff"
+    else:
+        bg_color = "#f0f2f6"
+        align = "left"
+        sender_display = f"👤 {sender}" 
+        border_color = "#ddd"
+    
+    # Format Jam Chat
+    jam_chat = created_at.strftime('%H:%M')
+    
+    return f"""
+    <div style='display: flex; justify-content: {align}; margin-bottom: 10px;'>
+        <div style='background-color: {bg_color}; padding: 10px 15px; border-radius: 12px; border: 1px solid {border_color}; max-width: 75%;'>
+            <div style='font-size: 0.8em; font-weight: bold; color: #555; margin-bottom: 2px;'>{sender_display}</div>
+            <div style='color: #222; font-size: 1em;'>{content}</div>
+            <div style='font-size: 0.7em; color: gray; text-align: right; margin-top: 5px;'>
+                {jam_chat}
+            </div>
+        </div>
+    </div>
+    """
+
 @st.fragment(run_every=2)
 def render_chat_stream(ticket_id):
-    chats = session.query(Comment).filter(Comment.ticket_id == ticket_id).all()
+    with perf.fragment("chat_stream"):
+        _render_chat_stream(ticket_id)
+
+def _render_chat_stream(ticket_id):
+    # Cache per tiket: (id, HTML) komentar yang sudah dirender, urut id, + set id.
+    # Versi di chat bus menentukan apakah perlu ambil data; kalau perlu ke DB,
+    # hanya komentar sejak CHAT_LOOKBACK komentar terakhir lewat index (ticket_id, id).
+    # Id bisa datang tidak urut (dua pengirim publish terbalik, sequence Postgres
+    # commit tidak urut), jadi jendela di bawah id terakhir ikut dibaca ulang dan
+    # komentar digabung berdasarkan id, bukan hanya "id > terakhir".
+    chat_cache = st.session_state.setdefault('chat_cache', {})
+    state = chat_cache.setdefault(ticket_id, {'ids': set(), 'blocks': [], 'html': "", 'version': None, 'synced_at': 0})
+
+    version, new_chats = get_chat_bus().events_since(ticket_id, state['version'])
+    if new_chats is None or time.time() - state['synced_at'] > CHAT_RESYNC_SECONDS:
+        since_id = state['blocks'][-CHAT_LOOKBACK][0] if len(state['blocks']) >= CHAT_LOOKBACK else 0
+        with session_scope(Session) as chat_session:
+            new_chats = (
+                chat_session.query(Comment.id, Comment.sender, Comment.content, Comment.created_at)
+                .filter(Comment.ticket_id == ticket_id, Comment.id > since_id)
+                .order_by(Comment.id)
+                .all()
+            )
+        state['synced_at'] = time.time()
+    state['version'] = version
+
+    new_chats = [chat for chat in new_chats if chat.id not in state['ids']]
+    if new_chats:
+        for chat in new_chats:
+            bisect.insort(state['blocks'], (chat.id, render_chat_bubble(chat.sender, chat.content, chat.created_at)))
+            state['ids'].add(chat.id)
+        state['html'] = "".join(html for _, html in state['blocks'])
+
     with st.container(height=400, border=True):
-        if not chats:
+        if not state['blocks']:
             st.caption("Belum ada diskusi. Mulai percakapan sekarang!")
         else:
-            for chat in chats:
-                if chat.sender == "Admin":
-                    bg_color = "#e6f3ff"
-                    align = "right"
-                    sender_display = "👨‍💻 Admin Support"
-                    border_color = "#b3d9ff"
-                else:
-                    bg_color = "#f0f2f6"
-                    align = "left"
-                    sender_display = f"👤 {chat.sender}" 
-                    border_color = "#ddd"
-                
-                # Format Jam Chat
-                jam_chat = chat.created_at.strftime('%H:%M')
-                
-                st.markdown(
-                    f"""
-                    <div style='display: flex; justify-content: {align}; margin-bottom: 10px;'>
-                        <div style='background-color: {bg_color}; padding: 10px 15px; border-radius: 12px; border: 1px solid {border_color}; max-width: 75%;'>
-                            <div style='font-size: 0.8em; font-weight: bold; color: #555; margin-bottom: 2px;'>{sender_display}</div>
-                            <div style='color: #222; font-size: 1em;'>{chat.content}</div>
-                            <div style='font-size: 0.7em; color: gray; text-align: right; margin-top: 5px;'>
-                                {jam_chat}
-                            </div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True
-                )
+            st.markdown(state['html'], unsafe_allow_html=True)
 
 
 # --- FUNGSI DETAIL TIKET ---
+def show_archived_ticket(ticket, comments):
+    # Tiket arsip hanya dibaca: tanpa ubah status, AI, atau chat
+    st.markdown("---")
+    st.subheader(f"#{ticket.id}: {ticket.subject}")
+    st.caption(f"Pelapor: {ticket.requester_name} ({ticket.department}) | {ticket.created_at.strftime('%d %B %Y, %H:%M')}")
+    st.info(f"🗄️ Tiket ini sudah selesai dan diarsipkan pada {ticket.archived_at.strftime('%d %B %Y')}.")
+    st.markdown(f"**Prioritas:** {ticket.priority} | **Kategori:** {ticket.category} | **Status:** {ticket.status}")
+    if ticket.related_asset:
+        st.markdown(f"📦 **Aset Bermasalah:** `{ticket.related_asset}`")
+    st.info(f"**Deskripsi:**\n\n{ticket.description}")
+    if comments:
+        with st.container(height=400, border=True):
+            st.markdown("".join(render_chat_bubble(c.sender, c.content, c.created_at) for c in comments), unsafe_allow_html=True)
+
+def change_ticket_status(ticket_id):
+    # Callback selectbox status (jalan sebelum script rerun)
+    new_status = st.session_state[f"status_{ticket_id}"]
+    with session_scope(Session) as s:
+        ticket = s.get(Ticket, ticket_id)
+        if ticket is None or ticket.status == new_status:
+            return
+        ticket.status = new_status
+        add_ticket_events(s, "status", [(ticket_id, new_status)], actor=st.session_state.username, origin=session_origin())
+        s.commit()
+        subject, description = ticket.subject, ticket.description
+    invalidate_ticket_caches()
+    mark_events_read([ticket_id])
+    update_similarity_index(ticket_id, new_status, subject, description)
+
 def show_ticket_detail(ticket, is_admin=False):
     st.markdown("---")
     c1, c2 = st.columns([3, 1])
@@ -226,46 +668,69 @@ def show_ticket_detail(ticket, is_admin=False):
         prio_color = "red" if ticket.priority in ['High', 'Critical'] else "blue"
         st.markdown(f"**Prioritas:** :{prio_color}[{ticket.priority}] | **Kategori:** {ticket.category}")
         
-        if ticket.related_asset:
-             st.markdown(f"📦 **Aset Bermasalah:** `{ticket.related_asset}`")
+        # Label diambil dari aset terkini (via FK) supaya rename aset ikut tampil
+        asset = session.get(Asset, ticket.asset_id) if ticket.asset_id else None
+        asset_text = asset_label(asset.name, asset.serial_number) if asset else ticket.related_asset
+        if asset_text:
+             st.markdown(f"📦 **Aset Bermasalah:** `{asset_text}`")
+        if asset and is_admin:
+            history = [t for t in list_asset_tickets(session, asset.id) if t.id != ticket.id]
+            if history:
+                with st.expander(f"🧾 Riwayat Tiket Perangkat Ini ({len(history)})", expanded=False):
+                    for t in history:
+                        st.markdown(f"- **#{t.id}** {t.subject} · {t.status} · {t.created_at.strftime('%d/%m/%Y')}")
+
+        # Tiket Resolved yang mirip: ditampilkan ke admin & jadi konteks prompt AI
+        similar = find_similar_tickets(ticket_text(ticket.subject, ticket.description), exclude_id=ticket.id) if is_admin else []
 
         # --- FITUR AI ---
-        if is_admin and "GOOGLE_API_KEY" in st.secrets:
+        ai_service = get_ai_service() if is_admin else None
+        if ai_service:
             with st.expander("🤖 AI Assistant (Saran Solusi)", expanded=False):
-                st.info("Klik tombol di bawah untuk meminta saran teknis dari AI.")
-                if st.button("🔍 Analisa Solusi via AI", key=f"ai_btn_{ticket.id}"):
-                    with st.spinner("AI sedang berpikir... (Menggunakan Model Lite)"):
+                ai_args = (ticket.id, ticket.description, ticket.category, ticket.related_asset)
+                ai_context = format_prompt_context(similar)
+                cached_suggestion = ai_service.get_cached(ai_service.key_for(*ai_args[1:]))
+                if cached_suggestion:
+                    st.markdown("### 💡 Saran AI:")
+                    st.markdown(cached_suggestion)
+                    st.caption("Tersimpan dari analisa sebelumnya.")
+                else:
+                    st.info("Klik tombol di bawah untuk meminta saran teknis dari AI.")
+                    use_stream = st.toggle("Tampilkan jawaban bertahap", key=f"ai_stream_{ticket.id}")
+                    if st.button("🔍 Analisa Solusi via AI", key=f"ai_btn_{ticket.id}"):
                         try:
-                            model = genai.GenerativeModel('gemini-2.0-flash-lite-001') 
-                            prompt = f"""
-                            Role: Senior IT Support.
-                            Masalah: {ticket.description}
-                            Kategori: {ticket.category}
-                            Aset: {ticket.related_asset if ticket.related_asset else 'Umum'}
-                            
-                            Berikan solusi teknis singkat (bullet points) dalam Bahasa Indonesia.
-                            """
-                            response = model.generate_content(prompt)
-                            st.markdown("### 💡 Saran AI:")
-                            st.markdown(response.text)
-                        except ResourceExhausted:
-                            st.warning("🚦 Kuota AI Habis. Coba lagi besok!")
+                            if use_stream:
+                                st.markdown("### 💡 Saran AI:")
+                                st.write_stream(ai_service.stream(*ai_args, context=ai_context))
+                            else:
+                                # Diproses di thread AI; kalau halaman ditinggal, hasil tetap tersimpan
+                                with st.spinner("AI sedang berpikir... (Menggunakan Model Lite)"):
+                                    suggestion = ai_service.submit(*ai_args, context=ai_context).result(timeout=AI_TIMEOUT)
+                                st.markdown("### 💡 Saran AI:")
+                                st.markdown(suggestion)
+                        except QuotaExceeded as e:
+                            st.warning(f"🚦 Kuota AI Habis. Coba lagi nanti! ({e})")
                         except Exception as e:
                             st.error(f"Gagal memuat AI: {e}")
 
+        if similar:
+            with st.expander(f"🧩 Tiket Serupa yang Sudah Selesai ({len(similar)})", expanded=False):
+                render_similar_tickets(similar)
+
         with st.container(border=True):
             st.markdown(ticket.description)
-            if ticket.image_path and os.path.exists(ticket.image_path):
-                st.image(ticket.image_path, caption="Lampiran", width=300)
+            if ticket.image_path:
+                render_attachment(ticket.id, ticket.image_path)
 
     with c2:
         st.markdown("**Status Terkini:**")
         if is_admin:
-            new_status = st.selectbox("Update Status", ["Open", "In Progress", "Resolved"], index=["Open", "In Progress", "Resolved"].index(ticket.status), key=f"status_{ticket.id}")
-            if new_status != ticket.status:
-                ticket.status = new_status
-                session.commit()
-                st.rerun()
+            # Nilai widget selalu diisi ulang dari DB (status bisa berubah lewat aksi massal /
+            # admin lain); update hanya jalan saat admin benar-benar mengganti pilihan
+            status_key = f"status_{ticket.id}"
+            st.session_state[status_key] = ticket.status
+            st.selectbox("Update Status", ["Open", "In Progress", "Resolved"], key=status_key,
+                         on_change=change_ticket_status, args=(ticket.id,))
         else:
             status_color = "green" if ticket.status == "Resolved" else "orange"
             st.markdown(f":{status_color}[**{ticket.status}**]")
@@ -278,22 +743,12 @@ def show_ticket_detail(ticket, is_admin=False):
         st.markdown("⚡ **Balasan Cepat:**")
         qc1, qc2, qc3 = st.columns(3)
         
-        # [UPDATE] Menambahkan created_at=get_wib_time() di setiap tombol
-        if qc1.button("✅ Akan Dicek", key=f"qr1_{ticket.id}", use_container_width=True):
-            new_comment = Comment(ticket_id=ticket.id, sender="Admin", content="Baik, laporan diterima. Sedang kami cek.", created_at=get_wib_time())
-            session.add(new_comment)
-            session.commit()
-            st.rerun()
-        if qc2.button("🔄 Restart", key=f"qr2_{ticket.id}", use_container_width=True):
-            new_comment = Comment(ticket_id=ticket.id, sender="Admin", content="Mohon restart perangkat Anda terlebih dahulu.", created_at=get_wib_time())
-            session.add(new_comment)
-            session.commit()
-            st.rerun()
-        if qc3.button("👍 Selesai", key=f"qr3_{ticket.id}", use_container_width=True):
-            new_comment = Comment(ticket_id=ticket.id, sender="Admin", content="Masalah selesai. Tiket ditutup.", created_at=get_wib_time())
-            session.add(new_comment)
-            session.commit()
-            st.rerun()
+        # [UPDATE] post_comment mengisi created_at=get_wib_time() & memberi tahu chat bus
+        for idx, (col, (label, reply)) in enumerate(zip((qc1, qc2, qc3), QUICK_REPLIES.items()), start=1):
+            if col.button(label, key=f"qr{idx}_{ticket.id}", use_container_width=True):
+                post_comment(ticket.id, "Admin", reply)
+                mark_events_read([ticket.id])
+                st.rerun()
 
     # FORM CHAT (WIB ENABLED)
     with st.form(key=f"chat_form_{ticket.id}", clear_on_submit=True):
@@ -307,20 +762,12 @@ def show_ticket_detail(ticket, is_admin=False):
         if btn_send and user_msg:
             sender_name = "Admin" if is_admin else ticket.requester_name 
             
-            # [UPDATE] Tambahkan created_at=get_wib_time()
-            new_comment = Comment(ticket_id=ticket.id, sender=sender_name, content=user_msg, created_at=get_wib_time())
-            session.add(new_comment)
-            session.commit()
+            post_comment(ticket.id, sender_name, user_msg)
             
-            if not is_admin and "TELEGRAM_BOT_TOKEN" in st.secrets:
-                try:
-                    token = st.secrets["TELEGRAM_BOT_TOKEN"]
-                    chat_id = st.secrets["TELEGRAM_CHAT_ID"]
-                    msg_alert = f"💬 *BALASAN BARU*\nTiket #{ticket.id}\nOleh: {sender_name}\n\nPesan: {user_msg}"
-                    url = f"https://api.telegram.org/bot{token}/sendMessage"
-                    data = {"chat_id": chat_id, "text": msg_alert, "parse_mode": "Markdown"}
-                    requests.post(url, data=data, timeout=3)
-                except: pass 
+            if is_admin:
+                mark_events_read([ticket.id])
+            else:
+                send_reply_alert(ticket.id, sender_name, user_msg)
             st.success("Pesan terkirim!")
             st.rerun() 
 
@@ -328,13 +775,12 @@ def show_ticket_detail(ticket, is_admin=False):
 def user_dashboard():
     st.sidebar.title(f"👋 Halo, {st.session_state.username}")
     menu = st.sidebar.radio("Menu", ["📝 Buat Tiket", "🔍 Cek Tiket", "📚 Knowledge Base", "🚪 Logout"])
+    perf.set_page(f"user:{menu}")
     st.sidebar.markdown("---")
     st.sidebar.link_button("📲 Chat via WhatsApp", WA_LINK, use_container_width=True)
 
     if menu == "🚪 Logout":
-        st.session_state.logged_in = False
-        st.session_state.active_ticket_id = None 
-        st.rerun()
+        logout()
 
     elif menu == "📚 Knowledge Base":
         st.title("📚 Knowledge Base (FAQ)")
@@ -345,9 +791,25 @@ def user_dashboard():
     elif menu == "📝 Buat Tiket":
         st.title("🚀 Submit Tiket Baru")
         
-        # Ambil Data Asset untuk Dropdown
-        assets = session.query(Asset).all()
-        asset_options = ["- Tidak Ada / Perangkat Umum -"] + [f"{a.name} ({a.serial_number})" for a in assets]
+        # Sebelum lapor: cari solusi dari tiket serupa yang sudah selesai
+        with st.expander("💡 Cek dulu: mungkin masalahmu sudah pernah diselesaikan", expanded=False):
+            draft_problem = st.text_input("Jelaskan singkat masalahmu", key="draft_problem", placeholder="mis. printer tidak bisa print")
+            if draft_problem:
+                draft_similar = find_similar_tickets(draft_problem, k=3)
+                if draft_similar:
+                    render_similar_tickets(draft_similar)
+                else:
+                    st.caption("Belum ada tiket serupa. Silakan buat tiket di bawah.")
+
+        # Cari aset dulu (di luar form supaya daftar pilihan ikut ter-update)
+        asset_query = st.text_input("🔎 Cari Perangkat (nama / serial number)", key="asset_query", placeholder="mis. Laptop Dell atau SN123")
+        asset_matches, asset_total = find_assets(asset_query)
+        if asset_query and not asset_matches:
+            st.caption("Perangkat tidak ditemukan, pilih 'Perangkat Umum' atau hubungi admin.")
+        elif len(asset_matches) == ASSET_PICKER_LIMIT < asset_total:
+            st.caption(f"Menampilkan {ASSET_PICKER_LIMIT} dari {asset_total} perangkat, ketik nama/SN untuk mempersempit.")
+        asset_labels = dict(asset_matches)
+        asset_options = [None] + list(asset_labels)
 
         with st.form("ticket_form", clear_on_submit=True):
             col_a, col_b = st.columns(2)
@@ -359,7 +821,10 @@ def user_dashboard():
                 prio = st.selectbox("Prioritas", ["Low", "Medium", "High", "Critical"])
             
             # INPUT BARU: PILIH ASET
-            selected_asset_str = st.selectbox("📦 Perangkat Bermasalah (Opsional)", asset_options)
+            selected_asset_id = st.selectbox(
+                "📦 Perangkat Bermasalah (Opsional)", asset_options,
+                format_func=lambda asset_id: asset_labels.get(asset_id, ASSET_NONE_OPTION),
+            )
             
             subject = st.text_input("Judul Masalah")
             desc = st.text_area("Deskripsi Detail")
@@ -369,20 +834,23 @@ def user_dashboard():
             
             if submit and name and subject and desc:
                 img_path = save_uploaded_file(uploaded_file) if uploaded_file else None
-                final_asset = selected_asset_str if selected_asset_str != "- Tidak Ada / Perangkat Umum -" else None
+                final_asset = asset_labels.get(selected_asset_id)
 
                 # [UPDATE] Tambahkan created_at=get_wib_time()
                 new_ticket = Ticket(
                     requester_name=name, department=dept, category=cat, priority=prio,
                     subject=subject, description=desc, image_path=img_path,
-                    related_asset=final_asset,
+                    related_asset=final_asset, asset_id=selected_asset_id,
                     created_at=get_wib_time() # <-- JAM WIB
                 )
                 session.add(new_ticket)
+                session.flush()
+                add_ticket_events(session, "ticket", [(new_ticket.id, subject)], actor=name,
+                                  created_at=new_ticket.created_at, origin=session_origin())
                 session.commit()
+                invalidate_ticket_caches()
                 
-                with st.spinner("Mengirim notifikasi..."):
-                    send_telegram_alert(new_ticket.id, name, dept, subject, prio)
+                send_telegram_alert(new_ticket.id, name, dept, subject, prio)
                 
                 if prio == "Critical":
                     st.error("🔥 STATUS CRITICAL!")
@@ -402,23 +870,183 @@ def user_dashboard():
             if st.button("Cari", use_container_width=True): st.session_state.active_ticket_id = input_id
         
         if st.session_state.active_ticket_id:
-            ticket = session.query(Ticket).get(st.session_state.active_ticket_id)
+            ticket = session.get(Ticket, st.session_state.active_ticket_id)
             if ticket:
                 if st.button("❌ Tutup"): 
                     st.session_state.active_ticket_id = None
                     st.rerun()
                 show_ticket_detail(ticket, is_admin=False)
             else:
-                st.error("Tiket tidak ditemukan.")
+                archived, archived_comments = load_archived_ticket(st.session_state.active_ticket_id)
+                if archived:
+                    show_archived_ticket(archived, archived_comments)
+                else:
+                    st.error("Tiket tidak ditemukan.")
+
+# --- FEED AKTIVITAS (ADMIN) ---
+# Satu fragment di sidebar membaca ticket_events dengan cursor "id > N" (satu query
+# PK per tick, ikut menangkap perubahan dari proses/server lain). Event dari orang
+# lain menambah badge "belum dibaca" per tiket dan merender ulang halaman daftar /
+# dashboard sekali, bukan mengulang query daftar penuh setiap tick.
+EVENT_FEED_SECONDS = 5
+EVENT_FEED_SIZE = 15
+EVENT_FETCH_LIMIT = 200
+# Di Postgres id sequence bisa commit tidak urut: event dengan id di bawah cursor
+# yang baru terlihat belakangan ikut dibaca ulang lewat jendela ini, lalu
+# digabung berdasarkan id (event_seen).
+EVENT_LOOKBACK = 50
+EVENT_ICONS = {"ticket": "🆕", "status": "🔄", "comment": "💬"}
+EVENT_STATE_KEYS = ("event_cursor", "event_feed", "event_unread", "event_seen")
+
+def init_event_feed():
+    # Mulai dari event terakhir, jadi login tidak membanjiri badge dengan riwayat lama
+    if "event_cursor" in st.session_state:
+        return
+    with session_scope(Session) as s:
+        recent = list_recent_events(s, EVENT_FEED_SIZE)
+    st.session_state.event_cursor = recent[-1].id if recent else 0
+    st.session_state.event_feed = deque(recent, maxlen=EVENT_FEED_SIZE)
+    st.session_state.event_unread = {}
+    st.session_state.event_seen = {e.id for e in recent}
+
+def mark_events_read(ticket_ids):
+    # Tiket yang sudah ditanggapi admin (balas / ganti status) hilang dari badge
+    unread = st.session_state.get("event_unread", {})
+    for tid in ticket_ids:
+        unread.pop(tid, None)
+
+def is_own_event(event):
+    # Hanya event dari sesi ini sendiri yang tidak dihitung "baru"; balasan & perubahan
+    # admin lain (pengirim juga "Admin") tetap muncul di badge
+    return event.origin is not None and event.origin == st.session_state.get("session_origin")
+
+def format_event(event, max_chars=60):
+    detail = (event.detail or "")[:max_chars]
+    if event.kind == "ticket":
+        text = f"Tiket baru dari {event.actor}: {detail}"
+    elif event.kind == "status":
+        text = f"Status → {detail} ({event.actor})"
+    else:
+        text = f"{event.actor}: {detail}"
+    return f"{EVENT_ICONS.get(event.kind, '•')} `{event.created_at.strftime('%H:%M')}` **#{event.ticket_id}** {text}"
+
+@st.fragment(run_every=EVENT_FEED_SECONDS)
+def render_event_feed(auto_refresh):
+    with perf.fragment("event_feed"):
+        _render_event_feed(auto_refresh)
+
+def _render_event_feed(auto_refresh):
+    with session_scope(Session) as s:
+        events = list_events_since(s, max(st.session_state.event_cursor - EVENT_LOOKBACK, 0), EVENT_FETCH_LIMIT)
+    unread, seen = st.session_state.event_unread, st.session_state.event_seen
+    events = [e for e in events if e.id not in seen]
+    if events:
+        cursor = max(st.session_state.event_cursor, events[-1].id)
+        st.session_state.event_cursor = cursor
+        # Id di bawah jendela tidak dibaca lagi, jadi tidak perlu diingat
+        seen.update(e.id for e in events)
+        st.session_state.event_seen = {i for i in seen if i > cursor - EVENT_LOOKBACK}
+        st.session_state.event_feed.extend(events)
+        others = [e for e in events if not is_own_event(e)]
+        for e in others:
+            unread[e.ticket_id] = unread.get(e.ticket_id, 0) + 1
+        if any(e.kind != "comment" for e in events):
+            # Tiket / status berubah (mungkin dari proses lain): cache stats & pencarian basi
+            invalidate_ticket_caches()
+        if others and auto_refresh:
+            st.rerun(scope="app")
+
+    total = sum(unread.values())
+    st.markdown(f"**🔔 Aktivitas** :red-background[{total} baru]" if total else "**🔔 Aktivitas**")
+    if not st.session_state.event_feed:
+        st.caption("Belum ada aktivitas.")
+    for e in reversed(st.session_state.event_feed):
+        st.caption(format_event(e))
+    if total and st.button("✔️ Tandai semua dibaca", key="event_mark_read", use_container_width=True):
+        unread.clear()
+        st.rerun()
+
+# --- HALAMAN PERFORMANCE (ADMIN) ---
+def render_performance_view():
+    st.title("⏱️ Performance")
+    summary = perf.summary()
+    st.caption("Per halaman: durasi script run & jumlah statement SQL (200 run terakhir). "
+               "Tick fragment chat tercatat sebagai 'fragment:chat_stream'.")
+    if summary["pages"]:
+        st.dataframe(pd.DataFrame(summary["pages"]).rename(columns={
+            "page": "Halaman", "runs": "Run", "p50_ms": "p50 (ms)", "p95_ms": "p95 (ms)",
+            "sql_p50": "SQL p50", "sql_max": "SQL maks", "sql_ms_avg": "Waktu SQL rata2 (ms)",
+            "setup_ms_p50": "Setup p50 (ms)",
+        }), use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("🌐 Panggilan Eksternal")
+        if summary["external"]:
+            st.dataframe(pd.DataFrame.from_dict(summary["external"], orient="index"), use_container_width=True)
+        else:
+            st.caption("Belum ada panggilan Gemini / Telegram.")
+    with col2:
+        st.subheader("🔁 Fragment & Background")
+        for name, ticks in summary["fragment_ticks_per_min"].items():
+            st.metric(f"Tick {name} / menit", ticks)
+        st.metric("SQL di thread background", summary["background_sql"]["statements"])
+        st.json({**bootstrap, **observability, "pool": get_pool_stats(engine)})
+
+    st.subheader("🧪 Profiler")
+    # Bukan key widget: state widget dibuang Streamlit saat pindah halaman
+    st.session_state.perf_profile = st.toggle(
+        "Profil setiap run di sesi ini (cProfile / pyinstrument)", value=st.session_state.get("perf_profile", False),
+    )
+    reports = st.session_state.get("perf_profiles", {})
+    if reports:
+        page = st.selectbox("Laporan halaman", sorted(reports))
+        st.code(reports[page], language="text")
+    else:
+        st.caption("Aktifkan profiler lalu buka halaman lain; laporannya muncul di sini.")
+
+    with st.expander("📈 Format Prometheus"):
+        if observability.get("metrics_url"):
+            st.caption(f"Scrape: {observability['metrics_url']}")
+        st.code(perf.prometheus(), language="text")
 
 # 3. HALAMAN ADMIN
+def render_bulk_ticket_actions(ticket_ids):
+    with st.form("bulk_ticket_actions", border=True):
+        st.markdown(f"**⚡ Tindakan Massal** · {len(ticket_ids)} tiket dipilih")
+        b1, b2, b3 = st.columns(3)
+        status = b1.selectbox("Status", ["-", "Open", "In Progress", "Resolved"])
+        priority = b2.selectbox("Prioritas", ["-", "Low", "Medium", "High", "Critical"])
+        reply = b3.selectbox("Balasan Cepat", ["-"] + list(QUICK_REPLIES))
+        if st.form_submit_button("Terapkan ke Tiket Terpilih", use_container_width=True):
+            if status == "-" and priority == "-" and reply == "-":
+                st.warning("Pilih minimal satu tindakan.")
+                return
+            changed, replies = apply_bulk_ticket_action(
+                ticket_ids, status=None if status == "-" else status,
+                priority=None if priority == "-" else priority,
+                reply=QUICK_REPLIES.get(reply),
+            )
+            st.session_state.bulk_result = f"✅ {changed} tiket diperbarui, {replies} balasan terkirim."
+            st.session_state.bulk_nonce = st.session_state.get("bulk_nonce", 0) + 1
+            st.rerun()
+
 def admin_dashboard():
     st.sidebar.title("🛠️ Admin Panel")
-    menu = st.sidebar.radio("Navigasi", ["📊 Dashboard", "📋 Manajemen Tiket", "📦 Manajemen Aset", "🚪 Logout"])
+    menu = st.sidebar.radio("Navigasi", ["📊 Dashboard", "📋 Manajemen Tiket", "📦 Manajemen Aset", "⏱️ Performance", "🚪 Logout"])
+    perf.set_page(f"admin:{menu}")
+    if menu != "🚪 Logout":
+        init_event_feed()
+        with st.sidebar:
+            render_event_feed(auto_refresh=menu in ("📊 Dashboard", "📋 Manajemen Tiket"))
+    with st.sidebar.expander("🔌 Status Koneksi DB"):
+        st.json(get_pool_stats(engine))
 
     if menu == "🚪 Logout":
-        st.session_state.logged_in = False
-        st.rerun()
+        logout()
+
+    elif menu == "⏱️ Performance":
+        render_performance_view()
 
     elif menu == "📦 Manajemen Aset":
         st.title("📦 Inventaris Aset IT")
@@ -436,123 +1064,239 @@ def admin_dashboard():
                             new_asset = Asset(name=a_name, serial_number=a_sn, category=a_cat, assigned_to=a_user)
                             session.add(new_asset)
                             session.commit()
+                            invalidate_asset_caches()
                             st.success("Aset berhasil ditambahkan!")
                             st.rerun()
-                        except:
+                        except Exception:
+                            session.rollback()
                             st.error("Gagal simpan (SN mungkin duplikat).")
                     else:
                         st.warning("Data wajib diisi.")
 
-        assets = session.query(Asset).all()
+        # Tabel aset per halaman (keyset by id) + cari prefix nama / SN di DB
+        col_f1, col_f2 = st.columns([3, 1])
+        asset_search = col_f1.text_input("🔎 Cari Aset (awalan nama / serial number)", key="asset_admin_search").strip()
+        asset_page_size = col_f2.selectbox("Baris per halaman", [25, 50, 100], index=1, key="asset_page_size")
+        asset_filter = (asset_search, asset_page_size)
+        if st.session_state.get('asset_list_filter') != asset_filter:
+            st.session_state.asset_list_filter = asset_filter
+            st.session_state.asset_page_cursors = [None]
+        asset_cursors = st.session_state.asset_page_cursors
+
+        assets, next_after = list_assets_page(session, asset_search, asset_page_size, asset_cursors[-1])
         if assets:
-            data_asset = [{"ID": a.id, "Nama": a.name, "SN": a.serial_number, "Kategori": a.category, "User": a.assigned_to, "Status": a.status} for a in assets]
-            st.dataframe(pd.DataFrame(data_asset), use_container_width=True)
-            
+            data_asset = pd.DataFrame(
+                [tuple(a) for a in assets],
+                columns=["ID", "Nama", "SN", "Kategori", "User", "Status"],
+            )
+            st.dataframe(data_asset, use_container_width=True, hide_index=True)
+
+            col_p1, col_p2, col_p3 = st.columns([1, 2, 1])
+            if col_p1.button("⬅️ Sebelumnya", key="asset_prev", disabled=len(asset_cursors) == 1, use_container_width=True):
+                asset_cursors.pop()
+                st.rerun()
+            col_p2.caption(f"Halaman {len(asset_cursors)} • {len(assets)} aset ditampilkan")
+            if col_p3.button("Berikutnya ➡️", key="asset_next", disabled=next_after is None, use_container_width=True):
+                asset_cursors.append(next_after)
+                st.rerun()
+
             del_id = st.number_input("Hapus ID Aset", min_value=1, step=1)
             if st.button("Hapus Aset"):
-                a_del = session.query(Asset).get(del_id)
+                a_del = session.get(Asset, del_id)
                 if a_del:
+                    # Tiket lama tetap menyimpan label aset, hanya tautan FK yang dilepas
+                    session.query(Ticket).filter(Ticket.asset_id == del_id).update({"asset_id": None})
+                    session.query(ArchivedTicket).filter(ArchivedTicket.asset_id == del_id).update({"asset_id": None})
                     session.delete(a_del)
                     session.commit()
+                    invalidate_asset_caches()
                     st.success("Aset dihapus.")
                     st.rerun()
+        elif asset_search:
+            st.info("Tidak ada aset yang cocok.")
         else:
             st.info("Belum ada data aset.")
 
+        with st.expander("📥 Import / Export Massal (CSV / XLSX)"):
+            render_bulk_tools("assets")
+
+        st.markdown("---")
+        st.subheader("🩺 Kesehatan Aset")
+        window = st.selectbox("Periode", list(ASSET_HEALTH_WINDOWS), index=1, key="asset_health_window")
+        health = load_asset_health(ASSET_HEALTH_WINDOWS[window])
+        if health["assets"]:
+            st.markdown("**Perangkat dengan tiket terbanyak**")
+            st.dataframe(pd.DataFrame(
+                health["assets"],
+                columns=["ID", "Nama", "SN", "Kategori", "User", "Tiket", "Belum Selesai"],
+            ), use_container_width=True, hide_index=True)
+            col_h1, col_h2 = st.columns(2)
+            for col, title, data in (
+                (col_h1, "Per Kategori Aset", health["by_category"]),
+                (col_h2, "Per Pemegang", health["by_assignee"]),
+            ):
+                df_health = pd.DataFrame.from_dict(data, orient="index").sort_values("tickets", ascending=False)
+                df_health.columns = ["Aset", "Tiket", "Belum Selesai"]
+                col.markdown(f"**{title}**")
+                col.dataframe(df_health, use_container_width=True)
+        else:
+            st.info("Belum ada tiket yang terhubung ke aset pada periode ini.")
+
     elif menu == "📊 Dashboard":
         st.title("📊 IT Operations Dashboard")
-        tickets = session.query(Ticket).all()
-        total = len(tickets)
-        open_t = len([t for t in tickets if t.status == 'Open'])
-        prog_t = len([t for t in tickets if t.status == 'In Progress'])
-        res_t = len([t for t in tickets if t.status == 'Resolved'])
+        stats = load_ticket_stats()
+        by_status = stats["by_status"]
         
         c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Total Tiket", total)
-        c2.metric("Open", open_t, delta_color="inverse")
-        c3.metric("In Progress", prog_t, delta_color="off")
-        c4.metric("Resolved", res_t, delta_color="normal")
+        c1.metric("Total Tiket", stats["total"])
+        c2.metric("Open", by_status.get('Open', 0), delta_color="inverse")
+        c3.metric("In Progress", by_status.get('In Progress', 0), delta_color="off")
+        c4.metric("Resolved", by_status.get('Resolved', 0), delta_color="normal")
         st.markdown("---")
         
-        if tickets:
-            df = pd.DataFrame([{'Kategori': t.category, 'Status': t.status, 'Departemen': t.department} for t in tickets])
+        if stats["total"]:
             col_chart1, col_chart2 = st.columns(2)
             with col_chart1:
                 st.subheader("Tiket per Kategori")
-                st.bar_chart(df['Kategori'].value_counts())
+                st.bar_chart(pd.Series(stats["by_category"], name="count").sort_values(ascending=False))
             with col_chart2:
                 st.subheader("Distribusi Status")
-                st.bar_chart(df['Status'].value_counts(), color="#ffaa00")
+                st.bar_chart(pd.Series(by_status, name="count").sort_values(ascending=False), color="#ffaa00")
         else:
             st.info("Belum ada data.")
 
+        st.markdown("---")
+        st.subheader("⏰ SLA Tiket Aktif")
+        sla_summary, sla_watchlist = load_sla_overview()
+        s1, s2, s3 = st.columns(3)
+        s1.metric("Aktif", sum(v["active"] for v in sla_summary.values()))
+        s2.metric("🔴 Melewati SLA", sum(v["breach"] for v in sla_summary.values()))
+        s3.metric(f"🟡 Breach < {DUE_SOON_HOURS} Jam", sum(v["due_soon"] for v in sla_summary.values()))
+        if sla_watchlist:
+            df_watch = compute_sla(pd.DataFrame([t._asdict() for t in sla_watchlist]), get_wib_time(), SLA_THRESHOLDS)
+            st.dataframe(pd.DataFrame({
+                "ID": df_watch["id"], "Tgl": df_watch["created_at"].dt.strftime('%d/%m %H:%M'),
+                "Pelapor": df_watch["requester_name"], "Subject": df_watch["subject"],
+                "Prioritas": df_watch["priority"], "Status": df_watch["status"], "SLA": df_watch["SLA"],
+            }), use_container_width=True, hide_index=True)
+
     elif menu == "📋 Manajemen Tiket":
         st.title("📋 Daftar Tiket Masuk")
-        col_f1, col_f2 = st.columns(2)
+        if "bulk_result" in st.session_state:
+            st.success(st.session_state.pop("bulk_result"))
+        col_f1, col_f2, col_f3 = st.columns([2, 2, 1])
         with col_f1: filter_status = st.multiselect("Filter Status", ["Open", "In Progress", "Resolved"], default=["Open", "In Progress"])
-        with col_f2: search_query = st.text_input("Cari (Pelapor/Subject)")
+        with col_f2: search_query = st.text_input("Cari (Pelapor/Subject/Deskripsi)", help="Tekan Enter untuk mencari").strip()
+        with col_f3: page_size = st.selectbox("Per Halaman", [25, 50, 100, 200], index=1)
 
-        query = session.query(Ticket)
-        if filter_status: query = query.filter(Ticket.status.in_(filter_status))
-        if search_query: query = query.filter(Ticket.subject.contains(search_query) | Ticket.requester_name.contains(search_query))
-        
-        tickets = query.order_by(Ticket.created_at.desc()).all()
+        # Stack cursor halaman; reset ke halaman 1 kalau filter berubah
+        filter_key = (tuple(filter_status), search_query, page_size)
+        if st.session_state.get('ticket_list_filter') != filter_key:
+            st.session_state.ticket_list_filter = filter_key
+            st.session_state.ticket_page_cursors = [None]
+        cursors = st.session_state.ticket_page_cursors
+
+        if search_query and len(search_query) < SEARCH_MIN_CHARS:
+            st.caption(f"Ketik minimal {SEARCH_MIN_CHARS} karakter untuk mencari.")
+            search_query = ""
+        search_archive = bool(search_query) and st.checkbox("🗄️ Cari juga di arsip", help="Tiket Resolved lama yang sudah diarsipkan")
+        if search_query:
+            tickets, next_cursor = load_ticket_search(search_query, tuple(filter_status), page_size), None
+        else:
+            tickets, next_cursor = list_tickets_page(session, filter_status, None, page_size, cursors[-1])
 
         if tickets:
-            data = []
-            for t in tickets:
-                data.append({
-                    "ID": t.id, "Tgl": t.created_at.strftime('%d/%m %H:%M'),
-                    "Pelapor": t.requester_name, "Subject": t.subject,
-                    "Aset": t.related_asset if t.related_asset else "-",
-                    "Prioritas": t.priority, "Status": t.status,
-                    "SLA": calculate_sla(t.created_at, t.status)
-                })
-            st.dataframe(pd.DataFrame(data), use_container_width=True, hide_index=True)
-            
-            st.markdown("### 🛠️ Tindakan")
-            selected_id = st.selectbox("Pilih ID Tiket untuk Detail:", [t.id for t in tickets])
-            if selected_id:
-                ticket = session.query(Ticket).get(selected_id)
-                show_ticket_detail(ticket, is_admin=True)
+            # SLA dihitung sekaligus untuk satu halaman, dengan satu nilai "now"
+            df = compute_sla(pd.DataFrame([t._asdict() for t in tickets]), get_wib_time(), SLA_THRESHOLDS)
+            unread = st.session_state.event_unread
+            data = pd.DataFrame({
+                "ID": df["id"], "🔔": df["id"].map(lambda tid: f"{unread[tid]} baru" if tid in unread else ""),
+                "Tgl": df["created_at"].dt.strftime('%d/%m %H:%M'),
+                "Pelapor": df["requester_name"], "Subject": df["subject"],
+                "Aset": df["related_asset"].fillna("-"),
+                "Prioritas": df["priority"], "Status": df["status"],
+                "SLA": df["SLA"],
+            })
+            # Centang baris untuk tindakan massal; key berganti per halaman/filter &
+            # setelah aksi, supaya pilihan lama tidak menunjuk ke baris lain
+            table_key = f"ticket_table_{st.session_state.get('bulk_nonce', 0)}_{hash((filter_key, len(cursors)))}"
+            table = st.dataframe(data, use_container_width=True, hide_index=True, key=table_key,
+                                 on_select="rerun", selection_mode="multi-row")
+            selected_ids = [int(data["ID"].iloc[i]) for i in table.selection.rows]
+            if selected_ids:
+                render_bulk_ticket_actions(selected_ids)
+
+            col_p1, col_p2, col_p3 = st.columns([1, 2, 1])
+            if col_p1.button("⬅️ Sebelumnya", disabled=len(cursors) == 1, use_container_width=True):
+                cursors.pop()
+                st.rerun()
+            if search_query:
+                col_p2.caption(f"{len(tickets)} hasil teratas untuk '{search_query}' (urut relevansi)")
+            else:
+                col_p2.caption(f"Halaman {len(cursors)} • {len(tickets)} tiket ditampilkan")
+            if col_p3.button("Berikutnya ➡️", disabled=next_cursor is None, use_container_width=True):
+                cursors.append(next_cursor)
+                st.rerun()
         else:
             st.info("Tidak ada tiket.")
 
-        if st.sidebar.button("📥 Download Report (Resolved)"):
-             resolved_tickets = session.query(Ticket).filter(Ticket.status == 'Resolved').all()
-             if resolved_tickets:
-                 df_export = pd.DataFrame([{
-                     'ID': t.id, 'Pelapor': t.requester_name, 'Aset': t.related_asset,
-                     'Masalah': t.subject, 'Solusi': t.description
-                 } for t in resolved_tickets])
-                 from io import BytesIO
-                 output = BytesIO()
-                 with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                    df_export.to_excel(writer, index=False, sheet_name='Laporan Resolved')
-                    worksheet = writer.sheets['Laporan Resolved']
-                    for column in worksheet.columns:
-                        max_length = 0
-                        column_letter = column[0].column_letter
-                        for cell in column:
-                            try:
-                                if len(str(cell.value)) > max_length:
-                                    max_length = len(str(cell.value))
-                            except: pass
-                        adjusted_width = (max_length + 2) * 1.2
-                        worksheet.column_dimensions[column_letter].width = adjusted_width
-                 excel_data = output.getvalue()
-                 st.sidebar.download_button(
-                    label="📄 Simpan Laporan", data=excel_data,
-                    file_name=f"Laporan_Resolved_{datetime.now().strftime('%Y-%m-%d')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-                 st.sidebar.success("File Siap!")
+        if search_archive:
+            archive_hits = load_archive_search(search_query, page_size)
+            st.markdown(f"#### 🗄️ Arsip ({len(archive_hits)} hasil)")
+            if archive_hits:
+                st.dataframe(pd.DataFrame({
+                    "ID": [t.id for t in archive_hits], "Tgl": [t.created_at.strftime('%d/%m/%Y') for t in archive_hits],
+                    "Pelapor": [t.requester_name for t in archive_hits], "Subject": [t.subject for t in archive_hits],
+                    "Aset": [t.related_asset or "-" for t in archive_hits],
+                }), use_container_width=True, hide_index=True)
+                st.caption("Ketik ID tiket arsip di bawah untuk melihat detailnya.")
+
+        st.markdown("### 🛠️ Tindakan")
+        col_t1, col_t2 = st.columns(2)
+        with col_t1: selected_id = st.selectbox("Pilih ID Tiket (halaman ini):", [t.id for t in tickets])
+        with col_t2: typed_id = st.number_input("Atau ketik ID Tiket", min_value=1, step=1, value=None)
+        if typed_id or selected_id:
+            ticket = session.get(Ticket, typed_id or selected_id)
+            if ticket:
+                show_ticket_detail(ticket, is_admin=True)
+            else:
+                archived, archived_comments = load_archived_ticket(typed_id or selected_id)
+                if archived:
+                    show_archived_ticket(archived, archived_comments)
+                else:
+                    st.error("Tiket tidak ditemukan.")
+
+        with st.sidebar.expander("📥 Download Report (Resolved)"):
+            report_range = st.date_input("Rentang Tanggal (opsional)", value=(), format="DD/MM/YYYY")
+            report_format = st.selectbox("Format", list(EXPORT_FORMATS))
+            start_date = report_range[0] if len(report_range) > 0 else None
+            end_date = report_range[1] if len(report_range) > 1 else start_date
+            report_archive = st.checkbox("Sertakan tiket arsip", help="Tiket Resolved lama yang sudah diarsipkan")
+            _, report_ext, report_mime = EXPORT_FORMATS[report_format]
+            # File baru dibuat saat tombol diklik (di thread terpisah), bukan tiap rerun
+            st.download_button(
+                label="📄 Simpan Laporan", data=lambda: build_report(report_format, start_date, end_date, report_archive),
+                file_name=f"Laporan_Resolved_{datetime.now().strftime('%Y-%m-%d')}.{report_ext}",
+                mime=report_mime, use_container_width=True,
+            )
+
+        with st.sidebar.expander("📥 Import / Backup Tiket"):
+            render_bulk_tools("tickets")
 
 # --- MAIN APP ROUTING ---
-if st.session_state.logged_in:
-    if st.session_state.user_role == 'admin':
-        admin_dashboard()
-    else:
-        user_dashboard()
-else:
-    login_page()
\ No newline at end of file
+perf.mark_setup_done()
+try:
+    if "auth_cookie" in st.session_state:
+        write_auth_cookie(*st.session_state.pop("auth_cookie"))
+    with profile_current_run():
+        if st.session_state.logged_in:
+            if st.session_state.user_role == 'admin':
+                admin_dashboard()
+            else:
+                user_dashboard()
+        else:
+            login_page()
+finally:
+    # Kembalikan koneksi ke pool di akhir setiap run (termasuk saat st.rerun())
+    session.close()
+    perf.finish_run(perf_run, perf_token)
@@ -0,0 +1,185 @@
+# --- ARSIP TIKET RESOLVED ---
+# Tiket Resolved yang lebih tua dari N hari (umur dihitung dari created_at) beserta
+# komentarnya dipindah ke tickets_archive / comments_archive. Setiap batch satu
+# transaksi pendek (INSERT ... SELECT, lalu DELETE berdasarkan id), diselingi jeda,
+# jadi tabel aktif tidak terkunci lama. Di Postgres baris dikunci FOR UPDATE SKIP
+# LOCKED dan satu advisory lock memastikan hanya satu proses yang mengarsip.
+# Event feed aktivitas (ticket_events) yang lebih tua dari --event-days ikut dihapus.
+#     python archive.py --days 180
+#     python archive.py --days 365 --batch-size 1000 --dry-run
+# Tanpa --db-url: env DB_URL, lalu DB_URL di .streamlit/secrets.toml (sama seperti migrate.py)
+import argparse
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import DateTime, delete, func, literal, select, text
+
+from db import AISuggestion, ArchivedComment, ArchivedTicket, Comment, Ticket, build_engine, get_wib_time, prune_ticket_events
+
+ARCHIVE_BATCH = 500
+ARCHIVE_PAUSE = 0.2
+ARCHIVE_INTERVAL_HOURS = 24
+EVENT_RETENTION_DAYS = 30
+ARCHIVE_LOCK_KEY = 7_021_001  # pg advisory lock, bebas asal tidak bentrok
+TICKET_FIELDS = [c.name for c in Ticket.__table__.columns]
+COMMENT_FIELDS = [c.name for c in Comment.__table__.columns]
+
+def archive_cutoff(older_than_days, now=None):
+    return (now or get_wib_time()) - timedelta(days=older_than_days)
+
+def _reuses_ids(conn, table):
+    # SQLite tanpa AUTOINCREMENT memakai ulang id terbesar kalau baris itu dihapus
+    # (tabel yang dibuat sebelum sqlite_autoincrement di db.py). Postgres tidak.
+    if conn.dialect.name != "sqlite":
+        return False
+    ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table}).scalar()
+    return "AUTOINCREMENT" not in (ddl or "").upper()
+
+def _candidate_ids(conn, cutoff, batch_size):
+    # Kalau id bisa dipakai ulang, tiket dengan id terbesar & tiket pemilik komentar
+    # terakhir ditunda ke run berikutnya supaya id baru tidak bentrok dengan id di tabel arsip.
+    query = (
+        select(Ticket.id)
+        .where(Ticket.status == 'Resolved', Ticket.created_at < cutoff)
+        .order_by(Ticket.created_at, Ticket.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    if _reuses_ids(conn, Ticket.__tablename__):
+        query = query.where(Ticket.id < (conn.execute(select(func.max(Ticket.id))).scalar() or 0))
+    if _reuses_ids(conn, Comment.__tablename__):
+        last_comment_ticket = conn.execute(select(Comment.ticket_id).order_by(Comment.id.desc()).limit(1)).scalar()
+        if last_comment_ticket is not None:
+            query = query.where(Ticket.id != last_comment_ticket)
+    return conn.execute(query).scalars().all()
+
+def _archive_batch(conn, ids, archived_at):
+    # Return jumlah komentar yang dipindah
+    tickets, comments = Ticket.__table__, Comment.__table__
+    conn.execute(ArchivedTicket.__table__.insert().from_select(
+        TICKET_FIELDS + ["archived_at"],
+        select(*[tickets.c[name] for name in TICKET_FIELDS], literal(archived_at, DateTime)).where(tickets.c.id.in_(ids)),
+    ))
+    moved = conn.execute(ArchivedComment.__table__.insert().from_select(
+        COMMENT_FIELDS,
+        select(*[comments.c[name] for name in COMMENT_FIELDS]).where(comments.c.ticket_id.in_(ids)),
+    )).rowcount
+    conn.execute(delete(AISuggestion.__table__).where(AISuggestion.__table__.c.ticket_id.in_(ids)))
+    conn.execute(delete(comments).where(comments.c.ticket_id.in_(ids)))
+    conn.execute(delete(tickets).where(tickets.c.id.in_(ids)))
+    return moved
+
+def count_archivable(db_engine, older_than_days):
+    with db_engine.connect() as conn:
+        return conn.execute(
+            select(func.count(Ticket.id))
+            .where(Ticket.status == 'Resolved', Ticket.created_at < archive_cutoff(older_than_days))
+        ).scalar()
+
+def archive_resolved_tickets(db_engine, older_than_days, batch_size=ARCHIVE_BATCH, pause=ARCHIVE_PAUSE,
+                             max_batches=None, stop_event=None):
+    # Return dict {tickets, comments, batches, seconds, locked}. locked=True: proses lain
+    # (Postgres) sedang mengarsip, run ini berhenti tanpa memindah apa-apa.
+    started = time.perf_counter()
+    result = {"tickets": 0, "comments": 0, "batches": 0, "seconds": 0.0, "locked": False}
+    cutoff = archive_cutoff(older_than_days)
+    is_postgres = db_engine.dialect.name == "postgresql"
+    while max_batches is None or result["batches"] < max_batches:
+        if stop_event is not None and stop_event.is_set():
+            break
+        with db_engine.begin() as conn:
+            if is_postgres and not conn.execute(select(func.pg_try_advisory_xact_lock(ARCHIVE_LOCK_KEY))).scalar():
+                result["locked"] = True
+                break
+            ids = _candidate_ids(conn, cutoff, batch_size)
+            if ids:
+                result["comments"] += _archive_batch(conn, ids, get_wib_time())
+        if not ids:
+            break
+        result["tickets"] += len(ids)
+        result["batches"] += 1
+        if len(ids) < batch_size:
+            break
+        # Jeda antar batch: beri ruang ke transaksi tulis dari halaman
+        time.sleep(pause)
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def format_result(result):
+    rate = result["tickets"] / max(result["seconds"], 1e-9)
+    return (f"✅ {result['tickets']} tiket & {result['comments']} komentar diarsip dalam {result['batches']} batch "
+            f"({result['seconds']:.1f}s, {rate:.0f} tiket/detik)")
+
+# --- JOB BACKGROUND ---
+# Dipakai app.py (ARCHIVE_AFTER_DAYS di secrets): satu thread daemon per proses,
+# jalan sekali saat start lalu setiap interval_hours.
+class ArchiveWorker:
+    def __init__(self, db_engine, older_than_days, interval_hours=ARCHIVE_INTERVAL_HOURS,
+                 batch_size=ARCHIVE_BATCH, pause=ARCHIVE_PAUSE, event_days=EVENT_RETENTION_DAYS, on_archived=None):
+        self.db_engine = db_engine
+        self.older_than_days = older_than_days
+        self.interval = interval_hours * 3600
+        self.batch_size = batch_size
+        self.pause = pause
+        self.event_days = event_days
+        self.on_archived = on_archived  # callback(result) kalau ada tiket yang dipindah
+        self.last_result = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ticket-archiver", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.last_result = archive_resolved_tickets(
+                    self.db_engine, self.older_than_days, self.batch_size, self.pause, stop_event=self._stop)
+                prune_ticket_events(self.db_engine, archive_cutoff(self.event_days))
+                self.last_error = None
+                if self.last_result["tickets"] and self.on_archived:
+                    self.on_archived(self.last_result)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️ Arsip tiket gagal: {e}")
+            self._stop.wait(self.interval)
+
+def main():
+    from migrate import SECRETS_FILE, load_db_url
+
+    parser = argparse.ArgumentParser(description="Arsipkan tiket Resolved lama beserta komentarnya")
+    parser.add_argument("--days", type=int, required=True, help="Umur minimal tiket (hari sejak dibuat)")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH)
+    parser.add_argument("--pause", type=float, default=ARCHIVE_PAUSE, help="Jeda antar batch (detik)")
+    parser.add_argument("--event-days", type=int, default=EVENT_RETENTION_DAYS, help="Umur maksimal event feed aktivitas")
+    parser.add_argument("--dry-run", action="store_true", help="Hanya hitung tiket yang akan diarsip")
+    parser.add_argument("--db-url", help="Default: env DB_URL / .streamlit/secrets.toml")
+    args = parser.parse_args()
+
+    db_url = load_db_url(args.db_url)
+    if not db_url:
+        parser.error(f"DB_URL tidak ditemukan (isi --db-url, env DB_URL, atau {SECRETS_FILE})")
+    db_engine = build_engine(db_url)
+    if args.dry_run:
+        print(f"ℹ️ {count_archivable(db_engine, args.days)} tiket Resolved lebih tua dari {args.days} hari.")
+    else:
+        result = archive_resolved_tickets(db_engine, args.days, args.batch_size, args.pause)
+        if result["locked"]:
+            print("⚠️ Proses lain sedang mengarsip, coba lagi nanti.")
+        print(format_result(result))
+        print(f"🧹 {prune_ticket_events(db_engine, archive_cutoff(args.event_days))} event aktivitas lama dihapus.")
+    db_engine.dispose()
+
+if __name__ == "__main__":
+    main()
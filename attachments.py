@@ -0,0 +1,207 @@
+# --- LAMPIRAN TIKET ---
+# File disimpan content-addressed (sha256), jadi upload gambar yang sama cukup
+# disimpan sekali. Thumbnail dibuat oleh worker thread setelah upload, halaman
+# detail hanya mengirim thumbnail; file asli dimuat kalau diminta.
+# Backend: folder lokal atau object storage S3-compatible (AWS S3 / MinIO).
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+THUMB_SIZE = (480, 480)
+THUMB_QUALITY = 80
+THUMB_PREFIX = "thumbs"
+CONTENT_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp", ".gif": "image/gif"}
+
+# --- BACKEND STORAGE ---
+class LocalAttachmentStore:
+    def __init__(self, root="uploads"):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key):
+        return os.path.isfile(self._path(key))
+
+    def put(self, key, data, content_type=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Tulis ke file sementara lalu rename, supaya pembaca tidak melihat file setengah jadi
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, key):
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+class S3AttachmentStore:
+    # client bisa diisi manual (mis. stand-in lokal untuk testing); default boto3
+    def __init__(self, bucket, prefix="", client=None, endpoint_url=None, **client_kwargs):
+        if client is None:
+            import boto3
+            client = boto3.client("s3", endpoint_url=endpoint_url, **client_kwargs)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception as e:
+            code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+            if code in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put(self, key, data, content_type=None):
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, **extra)
+
+    def get(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+
+class LocalS3Client:
+    # Pengganti client boto3 (subset head/put/get_object) untuk development/benchmark
+    # tanpa server S3. Bisa diberi latency buatan untuk meniru jaringan.
+    class NotFound(Exception):
+        response = {"Error": {"Code": "404"}}
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.objects = {}
+        self.calls = {"head": 0, "put": 0, "get": 0}
+
+    def _wait(self, op):
+        self.calls[op] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def head_object(self, Bucket, Key):
+        self._wait("head")
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound(Key)
+        return {"ContentLength": len(self.objects[(Bucket, Key)][0])}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self._wait("put")
+        self.objects[(Bucket, Key)] = (bytes(Body), ContentType)
+
+    def get_object(self, Bucket, Key):
+        self._wait("get")
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound(Key)
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)][0])}
+
+# --- THUMBNAIL ---
+def make_thumbnail(data, size=THUMB_SIZE, quality=THUMB_QUALITY):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        # draft(): decoder JPEG langsung downscale saat decode (jauh lebih cepat)
+        img.draft("RGB", size)
+        img.thumbnail(size)
+        if img.mode not in ("RGB", "L"):
+            background = Image.new("RGB", img.size, "white")
+            background.paste(img, mask=img.convert("RGBA").split()[-1])
+            img = background
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=quality, optimize=True)
+        return out.getvalue()
+
+# --- SERVICE ---
+def attachment_key(data, filename):
+    ext = os.path.splitext(filename or "")[1].lower()
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest[:2]}/{digest}{ext}"
+
+def thumbnail_key(key):
+    return f"{THUMB_PREFIX}/{os.path.splitext(key)[0]}.jpg"
+
+class AttachmentService:
+    def __init__(self, store, thumb_size=THUMB_SIZE, max_workers=1):
+        self.store = store
+        self.thumb_size = thumb_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="attachment-thumb")
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counters = {"saved": 0, "deduplicated": 0, "thumbnails": 0, "thumbnail_errors": 0}
+
+    def save(self, filename, data):
+        # Return key untuk disimpan di Ticket.image_path
+        key = attachment_key(data, filename)
+        if self.store.exists(key):
+            self._count("deduplicated")
+        else:
+            self.store.put(key, data, CONTENT_TYPES.get(os.path.splitext(key)[1]))
+            self._count("saved")
+        self.schedule_thumbnail(key, data)
+        return key
+
+    def schedule_thumbnail(self, key, data=None):
+        # Future dipakai bersama kalau thumbnail yang sama sedang dibuat
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                self._executor.submit(self._build_thumbnail, future, key, data)
+        return future
+
+    def _build_thumbnail(self, future, key, data):
+        try:
+            thumb_key = thumbnail_key(key)
+            if not self.store.exists(thumb_key):
+                thumb = make_thumbnail(data if data is not None else self.load(key), self.thumb_size)
+                self.store.put(thumb_key, thumb, "image/jpeg")
+                self._count("thumbnails")
+            future.set_result(thumb_key)
+        except Exception as e:
+            print(f"⚠️ Gagal membuat thumbnail {key}: {e}")
+            self._count("thumbnail_errors")
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def load(self, key):
+        # Data lama: image_path berisi path file lokal (uploads/<timestamp>_<nama>)
+        if os.path.isfile(key):
+            with open(key, "rb") as f:
+                return f.read()
+        return self.store.get(key)
+
+    def thumbnail(self, key, timeout=5):
+        # Return bytes thumbnail; kalau belum ada (upload lama / worker belum
+        # selesai) tunggu sebentar, kalau tetap gagal return None.
+        # Langsung get (tanpa cek exists dulu): satu request ke S3, bukan dua.
+        thumb_key = thumbnail_key(key)
+        try:
+            return self.store.get(thumb_key)
+        except Exception:
+            pass
+        try:
+            self.schedule_thumbnail(key).result(timeout=timeout)
+            return self.store.get(thumb_key)
+        except Exception:
+            return None
+
+    def exists(self, key):
+        return os.path.isfile(key) or self.store.exists(key)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
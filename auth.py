@@ -0,0 +1,180 @@
+# --- LOGIN & SESI ---
+# Verifikasi password (PBKDF2, sengaja mahal) dijalankan di worker pool kecil,
+# jadi banjir percobaan login tidak menghabiskan CPU semua sesi Streamlit.
+# Password salah dibatasi token bucket per (IP, username) & per IP, jadi orang lain
+# tidak bisa mengunci akun admin hanya dengan mengirim password salah. Setelah
+# login, sesi dibawa token bertanda tangan HMAC (disimpan di cookie oleh app.py)
+# supaya reconnect/refresh tidak hash ulang.
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from passlib.hash import pbkdf2_sha256
+
+from ai_assistant import TokenBucket
+from db import User, session_scope
+
+LOGIN_WORKERS = 2
+LOGIN_MAX_PENDING = 16
+LOGIN_TIMEOUT = 10
+LOGIN_ATTEMPTS_PER_MINUTE = 5
+LOGIN_BURST = 5
+TOKEN_TTL = 12 * 3600
+MAX_BUCKETS = 10000
+
+class LoginThrottled(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Terlalu banyak percobaan login, coba lagi dalam {int(retry_after) + 1} detik.")
+        self.retry_after = retry_after
+
+class LoginBusy(Exception):
+    pass
+
+def password_fingerprint(password_hash):
+    # Token lama otomatis tidak berlaku kalau password diganti
+    return hashlib.sha256(password_hash.encode("utf-8")).hexdigest()[:12]
+
+class AuthService:
+    def __init__(self, session_factory, secret=None, workers=LOGIN_WORKERS, max_pending=LOGIN_MAX_PENDING,
+                 attempts_per_minute=LOGIN_ATTEMPTS_PER_MINUTE, burst=LOGIN_BURST, token_ttl=TOKEN_TTL):
+        self.session_factory = session_factory
+        # Tanpa AUTH_SECRET, token hanya berlaku selama proses server hidup
+        self.secret = (secret or secrets.token_hex(32)).encode("utf-8")
+        self.token_ttl = token_ttl
+        self.attempts_per_minute = attempts_per_minute
+        self.burst = burst
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="login-verify")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        # Hash dummy: username yang tidak ada tetap diverifikasi (waktu respon sama)
+        self._dummy_hash = pbkdf2_sha256.hash(secrets.token_hex(8))
+        self.counters = {"ok": 0, "failed": 0, "throttled": 0, "busy": 0, "token_ok": 0}
+
+    # --- THROTTLING ---
+    def _bucket(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= MAX_BUCKETS:
+                    self._prune()
+                bucket = self._buckets[key] = TokenBucket(self.attempts_per_minute, self.burst)
+            return bucket
+
+    def _prune(self):
+        # Buang bucket yang sudah penuh lagi (tidak ada percobaan baru-baru ini)
+        for key in [k for k, b in self._buckets.items() if b.wait_time() == 0 and b.tokens >= b.capacity]:
+            del self._buckets[key]
+
+    def _throttle(self, username, ip):
+        # Return bucket yang dipotong. Semua bucket dicek dulu baru dipotong, jadi
+        # penolakan oleh bucket IP tidak ikut menguras bucket username.
+        # Tanpa IP (CLI / test) cukup per username
+        buckets = [self._bucket(f"user:{ip or '-'}:{username.lower()}")]
+        if ip:
+            buckets.append(self._bucket(f"ip:{ip}"))
+        with self._lock:
+            wait = max(bucket.wait_time() for bucket in buckets)
+            if not wait:
+                for bucket in buckets:
+                    bucket.try_acquire()
+        if wait:
+            self._count("throttled")
+            raise LoginThrottled(wait)
+        return buckets
+
+    # --- LOGIN ---
+    def login(self, username, password, ip=None):
+        # Return {"username", "role"} atau None kalau salah. Hanya password salah
+        # yang menghabiskan kuota (login berhasil / server sibuk dikembalikan): di
+        # belakang reverse proxy semua user berbagi satu IP.
+        username = (username or "").strip()
+        buckets = self._throttle(username, ip)
+        try:
+            user = self._login(username, password)
+        except LoginBusy:
+            self._refund(buckets)
+            raise
+        if user:
+            self._refund(buckets)
+        return user
+
+    def _refund(self, buckets):
+        for bucket in buckets:
+            bucket.refund()
+
+    def _login(self, username, password):
+        if not self._slots.acquire(blocking=False):
+            self._count("busy")
+            raise LoginBusy("Server sedang sibuk, coba lagi sebentar.")
+        try:
+            future = self._executor.submit(self._verify, username, password)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            user = future.result(timeout=LOGIN_TIMEOUT)
+        except FutureTimeout:
+            self._count("busy")
+            raise LoginBusy("Verifikasi login terlalu lama, coba lagi.")
+        self._count("ok" if user else "failed")
+        return user
+
+    def _verify(self, username, password):
+        with session_scope(self.session_factory) as s:
+            row = s.query(User.username, User.role, User.password_hash).filter(User.username == username).first()
+        if row is None:
+            pbkdf2_sha256.verify(password or "", self._dummy_hash)
+            return None
+        if not pbkdf2_sha256.verify(password or "", row.password_hash):
+            return None
+        return {"username": row.username, "role": row.role, "fingerprint": password_fingerprint(row.password_hash)}
+
+    # --- TOKEN SESI ---
+    def _sign(self, payload):
+        return hmac.new(self.secret, payload.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def issue_token(self, user):
+        payload = f"{user['username']}|{user['role']}|{user['fingerprint']}|{int(time.time() + self.token_ttl)}"
+        raw = f"{payload}|{self._sign(payload)}"
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    def verify_token(self, token):
+        # Murah: satu HMAC + satu query index username (tanpa PBKDF2)
+        try:
+            raw = base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8")
+            payload, signature = raw.rsplit("|", 1)
+            username, role, fingerprint, expires = payload.split("|")
+            expires = int(expires)
+        except (ValueError, TypeError, UnicodeError, AttributeError):
+            return None
+        # Bandingkan bytes: compare_digest pada str non-ASCII melempar TypeError
+        if not hmac.compare_digest(signature.encode("utf-8"), self._sign(payload).encode("utf-8")) or expires < time.time():
+            return None
+        with session_scope(self.session_factory) as s:
+            row = s.query(User.role, User.password_hash).filter(User.username == username).first()
+        if row is None or row.role != role or password_fingerprint(row.password_hash) != fingerprint:
+            return None
+        self._count("token_ok")
+        return {"username": username, "role": role, "fingerprint": fingerprint}
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+            data["tracked_keys"] = len(self._buckets)
+        return data
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+def ensure_default_admin(session_factory, username="admin", password="admin123"):
+    with session_scope(session_factory) as s:
+        if not s.query(User.id).filter(User.username == username).first():
+            s.add(User(username=username, password_hash=pbkdf2_sha256.hash(password), role="admin"))
+            s.commit()
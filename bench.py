@@ -0,0 +1,829 @@
+# --- BENCHMARK ---
+# Skenario ukur performa tanpa UI Streamlit.
+# Contoh: python bench.py pool --workers 16 --queries 50
+#         python bench.py dashboard --tickets 100000
+#         python bench.py search --tickets 200000
+#         python bench.py similar --tickets 150000
+#         python bench.py export --tickets 300000
+#         python bench.py assets --assets 50000
+#         python bench.py asset_health --tickets 200000 --assets 20000
+#         python bench.py attachments --files 20
+#         python bench.py login --workers 32
+#         python bench.py rerun --tickets 20000
+#         python bench.py bulk --assets 15000 --tickets 100000
+#         python bench.py bulk_actions --tickets 100000 --queries 200
+#         python bench.py archive --tickets 200000 --days 90
+#         python bench.py events --tickets 100000
+#         python bench.py pool --db-url postgresql://...
+import argparse
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+from sqlalchemy import event, insert, text
+
+from db import (
+    Ticket, Comment, Asset, User, build_engine, create_schema, make_session_factory, session_scope,
+    get_pool_stats, get_ticket_stats, get_wib_time, search_tickets, get_search_backend,
+    TICKET_LIST_COLUMNS, backfill_ticket_asset_ids,
+)
+
+DEPARTMENTS = ["HRD", "Finance", "Marketing", "Operations", "IT"]
+CATEGORIES = ["Hardware", "Software", "Network", "Access", "Other"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+STATUSES = ["Open", "In Progress", "Resolved"]
+ASSET_CATEGORIES = ["Laptop", "PC", "Printer", "Network", "Server", "Mobile"]
+NAMES = ["Budi", "Siti", "Andi", "Dewi", "Rina", "Agus", "Putri", "Joko", "Wulan", "Fajar"]
+PROBLEMS = [
+    ("Printer tidak bisa mencetak", "Printer di lantai {n} menampilkan error paper jam padahal kertas sudah dicek."),
+    ("WiFi lemot", "Koneksi WiFi di ruang rapat {n} sering putus dan sangat lambat sejak pagi."),
+    ("Laptop tidak mau menyala", "Laptop kantor mati total setelah update Windows, lampu indikator tidak menyala."),
+    ("Lupa password email", "Akun email perusahaan terkunci setelah salah memasukkan password {n} kali."),
+    ("Aplikasi ERP error", "Muncul pesan error saat membuka modul keuangan di aplikasi ERP versi {n}."),
+    ("Monitor berkedip", "Monitor kedua berkedip terus, sudah ganti kabel HDMI tapi masih sama."),
+    ("VPN tidak connect", "VPN gagal terhubung dari rumah, muncul timeout setelah {n} detik."),
+    ("Akses folder shared", "Tidak bisa membuka folder shared departemen, muncul access denied."),
+]
+BATCH = 5000
+
+def temp_sqlite_url():
+    return f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='itsd_bench_'), 'bench.db')}"
+
+def make_engine(args, **kwargs):
+    db_engine = build_engine(args.db_url or temp_sqlite_url(), **kwargs)
+    create_schema(db_engine)
+    return db_engine
+
+def timed(fn, repeat=5):
+    # Return (hasil terakhir, waktu median dalam ms)
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return result, durations[len(durations) // 2]
+
+# --- SEED DATA ---
+# Insert batch via Core (bukan session.add per baris) supaya seed 100k+ cepat
+def seed(db_engine, tickets=0, comments=0, assets=0, seed_value=42):
+    rnd = random.Random(seed_value)
+    now = get_wib_time()
+    with db_engine.begin() as conn:
+        rows = []
+        for i in range(assets):
+            rows.append({
+                "name": f"{rnd.choice(ASSET_CATEGORIES)} {rnd.choice(['Dell', 'HP', 'Lenovo', 'Asus', 'Canon'])} {i}",
+                "category": rnd.choice(ASSET_CATEGORIES),
+                "serial_number": f"SN{i:07d}",
+                "assigned_to": rnd.choice(NAMES),
+                "status": "Active",
+            })
+            if len(rows) >= BATCH:
+                conn.execute(insert(Asset), rows)
+                rows = []
+        if rows:
+            conn.execute(insert(Asset), rows)
+
+        rows = []
+        for i in range(tickets):
+            subject, desc = rnd.choice(PROBLEMS)
+            n = rnd.randint(1, 9)
+            rows.append({
+                "requester_name": rnd.choice(NAMES),
+                "department": rnd.choice(DEPARTMENTS),
+                "category": rnd.choice(CATEGORIES),
+                "related_asset": f"Laptop Dell {n} (SN{rnd.randrange(max(assets, 1)):07d})" if assets and rnd.random() < 0.5 else None,
+                "priority": rnd.choice(PRIORITIES),
+                "subject": f"{subject} #{i}",
+                "description": " ".join([desc.format(n=n)] * rnd.randint(3, 8)),
+                "status": rnd.choices(STATUSES, weights=[2, 1, 7])[0],
+                "created_at": now - timedelta(minutes=rnd.randint(0, 60 * 24 * 365)),
+            })
+            if len(rows) >= BATCH:
+                conn.execute(insert(Ticket), rows)
+                rows = []
+        if rows:
+            conn.execute(insert(Ticket), rows)
+
+        rows = []
+        for _ in range(comments if tickets else 0):
+            rows.append({
+                "ticket_id": rnd.randint(1, tickets),
+                "sender": rnd.choice(["Admin"] + NAMES),
+                "content": rnd.choice(["Sedang kami cek.", "Sudah dicoba restart?", "Masih error pak.", "Terima kasih, sudah normal."]),
+                "created_at": now - timedelta(minutes=rnd.randint(0, 60 * 24 * 365)),
+            })
+            if len(rows) >= BATCH:
+                conn.execute(insert(Comment), rows)
+                rows = []
+        if rows:
+            conn.execute(insert(Comment), rows)
+    # Tiket seed hanya membawa label aset (seperti data lama), tautkan lewat migrasi
+    if tickets and assets:
+        backfill_ticket_asset_ids(db_engine)
+
+def report(title, rows):
+    print(f"\n== {title} ==")
+    width = max(len(k) for k in rows)
+    for key, value in rows.items():
+        print(f"{key.ljust(width)} : {value}")
+
+# --- SKENARIO: POOL ---
+# Bandingkan satu Session global (harus dikunci, seperti app.py lama) dengan
+# session pendek per request dari pool. Latensi jaringan disimulasikan per query.
+def bench_pool(args):
+    db_engine = make_engine(args, pool_size=args.workers, max_overflow=0)
+    if db_engine.dialect.name == "sqlite":
+        @event.listens_for(db_engine, "connect")
+        def add_sleep(dbapi_conn, _):
+            dbapi_conn.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or 0)
+        db_engine.dispose()  # koneksi dari create_schema belum punya fungsi sleep_ms
+        sleep_sql = text("SELECT sleep_ms(:ms)")
+    else:
+        sleep_sql = text("SELECT pg_sleep(:ms / 1000.0)")
+    Session = make_session_factory(db_engine)
+    total = args.workers * args.queries
+
+    shared = Session()
+    shared_lock = threading.Lock()
+
+    def shared_worker(_):
+        for _ in range(args.queries):
+            with shared_lock:
+                shared.execute(sleep_sql, {"ms": args.latency_ms})
+
+    def pooled_worker(_):
+        for _ in range(args.queries):
+            with session_scope(Session) as s:
+                s.execute(sleep_sql, {"ms": args.latency_ms})
+
+    results = {}
+    for name, worker in [("shared session", shared_worker), ("pooled sessions", pooled_worker)]:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(worker, range(args.workers)))
+        elapsed = time.perf_counter() - start
+        results[name] = f"{elapsed:.2f}s, {total / elapsed:.1f} query/s"
+    shared.close()
+
+    results["pool stats"] = get_pool_stats(db_engine)
+    report(f"pool ({args.workers} worker x {args.queries} query, latensi {args.latency_ms}ms)", results)
+
+# --- SKENARIO: DASHBOARD ---
+# Cara lama (hydrate semua Ticket + hitung di Python/pandas) vs GROUP BY di SQL
+def bench_dashboard(args):
+    db_engine = make_engine(args)
+    seed(db_engine, tickets=args.tickets)
+    Session = make_session_factory(db_engine)
+
+    def legacy():
+        with session_scope(Session) as s:
+            tickets = s.query(Ticket).all()
+            total = len(tickets)
+            open_t = len([t for t in tickets if t.status == 'Open'])
+            prog_t = len([t for t in tickets if t.status == 'In Progress'])
+            res_t = len([t for t in tickets if t.status == 'Resolved'])
+            df = pd.DataFrame([{'Kategori': t.category, 'Status': t.status, 'Departemen': t.department} for t in tickets])
+            return total, open_t, prog_t, res_t, df['Kategori'].value_counts(), df['Status'].value_counts()
+
+    def aggregated():
+        with session_scope(Session) as s:
+            return get_ticket_stats(s)
+
+    legacy_result, legacy_ms = timed(legacy, repeat=3)
+    stats, agg_ms = timed(aggregated)
+    assert stats["total"] == legacy_result[0]
+    report(f"dashboard ({args.tickets} tiket)", {
+        "legacy .all() + pandas": f"{legacy_ms:.1f} ms",
+        "GROUP BY": f"{agg_ms:.1f} ms",
+        "speedup": f"{legacy_ms / agg_ms:.1f}x",
+    })
+
+# --- SKENARIO: SEARCH ---
+# LIKE '%...%' lama (full scan) vs full-text index (FTS5 / tsvector)
+SEARCH_QUERIES = ["printer", "wifi lemot", "vpn timeout", "Budi", "erp keuangan"]
+
+def bench_search(args):
+    db_engine = make_engine(args)
+    seed(db_engine, tickets=args.tickets)
+    Session = make_session_factory(db_engine)
+    results = {"backend": get_search_backend(db_engine)}
+    for query in SEARCH_QUERIES:
+        def legacy():
+            with session_scope(Session) as s:
+                return (
+                    s.query(*TICKET_LIST_COLUMNS)
+                    .filter(Ticket.subject.contains(query) | Ticket.requester_name.contains(query))
+                    .order_by(Ticket.created_at.desc()).all()
+                )
+
+        def indexed():
+            with session_scope(Session) as s:
+                return search_tickets(s, query, limit=50)
+
+        legacy_rows, legacy_ms = timed(legacy, repeat=3)
+        rows, fts_ms = timed(indexed)
+        results[query] = f"LIKE {legacy_ms:.1f} ms ({len(legacy_rows)} baris) | FTS top-50 {fts_ms:.1f} ms"
+    report(f"search ({args.tickets} tiket)", results)
+
+# --- SKENARIO: SIMILAR ---
+# Waktu build index tiket serupa + latensi query top-k
+SIMILAR_QUERIES = ["printer tidak bisa print", "wifi putus terus", "laptop mati total", "password email terkunci", "vpn timeout"]
+
+def bench_similar(args):
+    from similarity import SimilarityIndex, iter_resolved_tickets
+
+    db_engine = make_engine(args)
+    seed(db_engine, tickets=args.tickets)
+    Session = make_session_factory(db_engine)
+    index = SimilarityIndex()
+    start = time.perf_counter()
+    with session_scope(Session) as s:
+        index.build(iter_resolved_tickets(s))
+    build_s = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(20):
+        for query in SIMILAR_QUERIES:
+            start = time.perf_counter()
+            index.query(query, k=5)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    start = time.perf_counter()
+    for i in range(1000):
+        index.add(10_000_000 + i, "Printer baru error", "Printer error setelah ganti toner")
+    add_ms = (time.perf_counter() - start) * 1000 / 1000
+    report(f"similar ({index.size} tiket resolved dari {args.tickets})", {
+        "build": f"{build_s:.2f}s",
+        "matrix": f"{index.matrix.nbytes / 1e6:.1f} MB",
+        "query p50": f"{latencies[len(latencies) // 2]:.2f} ms",
+        "query p95": f"{latencies[int(len(latencies) * 0.95)]:.2f} ms",
+        "add (incremental)": f"{add_ms:.3f} ms/tiket",
+    })
+
+# --- SKENARIO: EXPORT ---
+# Export laporan Resolved: cara lama (.all() + DataFrame + loop semua sel)
+# vs streaming. Tiap varian jalan di proses anak supaya peak RSS terpisah.
+def legacy_export(Session, out):
+    with session_scope(Session) as s:
+        resolved_tickets = s.query(Ticket).filter(Ticket.status == 'Resolved').all()
+        df_export = pd.DataFrame([{
+            'ID': t.id, 'Pelapor': t.requester_name, 'Aset': t.related_asset,
+            'Masalah': t.subject, 'Solusi': t.description
+        } for t in resolved_tickets])
+    with pd.ExcelWriter(out, engine='openpyxl') as writer:
+        df_export.to_excel(writer, index=False, sheet_name='Laporan Resolved')
+        worksheet = writer.sheets['Laporan Resolved']
+        for column in worksheet.columns:
+            max_length = max(len(str(cell.value)) for cell in column)
+            worksheet.column_dimensions[column[0].column_letter].width = (max_length + 2) * 1.2
+    return len(df_export)
+
+def run_measured(fn, result_queue):
+    import resource
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result_queue.put((rows, elapsed, (peak - base) / 1024))
+
+def bench_export(args):
+    import multiprocessing
+    from reports import EXPORT_FORMATS, export_resolved
+
+    db_url = args.db_url or temp_sqlite_url()
+    db_engine = build_engine(db_url)
+    create_schema(db_engine)
+    seed(db_engine, tickets=args.tickets)
+    db_engine.dispose()
+
+    def variant(fmt):
+        def run():
+            Session = make_session_factory(build_engine(db_url))
+            with tempfile.TemporaryFile() as out:
+                if fmt is None:
+                    return legacy_export(Session, out)
+                with session_scope(Session) as s:
+                    return export_resolved(s, fmt, out)
+        return run
+
+    ctx = multiprocessing.get_context("fork")
+    results = {}
+    for name, fmt in [("legacy xlsx", None)] + [(f"stream {f}", f) for f in EXPORT_FORMATS]:
+        result_queue = ctx.Queue()
+        proc = ctx.Process(target=run_measured, args=(variant(fmt), result_queue))
+        proc.start()
+        rows, elapsed, peak_mb = result_queue.get()
+        proc.join()
+        results[name] = f"{elapsed:.2f}s, +{peak_mb:.0f} MB peak RSS ({rows} baris)"
+    report(f"export ({args.tickets} tiket)", results)
+
+# --- SKENARIO: SLA ---
+# calculate_sla lama (get_wib_time + format per baris) vs compute_sla vektor
+def legacy_calculate_sla(created_at, status):
+    if status == 'Resolved':
+        return "Selesai"
+    hours = (get_wib_time() - created_at).total_seconds() / 3600
+    if hours < 24:
+        return f"🟢 {int(hours)} Jam"
+    elif hours < 48:
+        return f"🟡 {int(hours/24)} Hari"
+    return f"🔴 {int(hours/24)} Hari"
+
+def bench_sla(args):
+    from sla import compute_sla, get_sla_summary, get_sla_watchlist
+
+    db_engine = make_engine(args)
+    seed(db_engine, tickets=args.tickets)
+    Session = make_session_factory(db_engine)
+    with session_scope(Session) as s:
+        rows = s.query(Ticket.id, Ticket.created_at, Ticket.priority, Ticket.status).all()
+    df = pd.DataFrame([r._asdict() for r in rows])
+
+    _, legacy_ms = timed(lambda: [legacy_calculate_sla(r.created_at, r.status) for r in rows], repeat=3)
+    _, vector_ms = timed(lambda: compute_sla(df, get_wib_time()))
+
+    def db_side():
+        with session_scope(Session) as s:
+            now = get_wib_time()
+            return get_sla_summary(s, now), get_sla_watchlist(s, now)
+    _, db_ms = timed(db_side)
+    report(f"sla ({len(rows)} tiket)", {
+        "per baris (lama)": f"{legacy_ms:.1f} ms",
+        "compute_sla": f"{vector_ms:.1f} ms",
+        "summary + watchlist DB": f"{db_ms:.1f} ms",
+    })
+
+def bench_assets(args):
+    from db import Asset, list_assets_page, load_asset_options, build_asset_catalogue, search_asset_catalogue
+
+    db_engine = make_engine(args)
+    seed(db_engine, assets=args.assets)
+    Session = make_session_factory(db_engine)
+
+    def legacy_picker():
+        # Versi lama: semua kolom semua aset diformat tiap rerun form
+        with session_scope(Session) as s:
+            return ["- Tidak Ada / Perangkat Umum -"] + [f"{a.name} ({a.serial_number})" for a in s.query(Asset).all()]
+
+    def load_catalogue():
+        with session_scope(Session) as s:
+            return build_asset_catalogue(load_asset_options(s))
+
+    def admin_page(search=None):
+        with session_scope(Session) as s:
+            return list_assets_page(s, search, 50, args.assets // 2)
+
+    _, legacy_ms = timed(legacy_picker, repeat=3)
+    catalogue, build_ms = timed(load_catalogue, repeat=3)
+    _, search_ms = timed(lambda: search_asset_catalogue(catalogue, "printer de"), repeat=50)
+    _, page_ms = timed(admin_page)
+    _, page_search_ms = timed(lambda: admin_page("SN00"))
+    report(f"assets ({args.assets} aset)", {
+        "picker .all() per rerun (lama)": f"{legacy_ms:.1f} ms",
+        "bangun katalog (sekali / TTL)": f"{build_ms:.1f} ms",
+        "cari prefix di katalog": f"{search_ms:.3f} ms",
+        "halaman admin (keyset)": f"{page_ms:.2f} ms",
+        "halaman admin + cari SN": f"{page_search_ms:.2f} ms",
+    })
+
+def bench_asset_health(args):
+    from db import get_asset_health, list_asset_tickets
+
+    db_engine = make_engine(args)
+    seed(db_engine, tickets=args.tickets, assets=args.assets)
+    Session = make_session_factory(db_engine)
+
+    # Ulangi backfill dari kondisi data lama (asset_id kosong semua)
+    with db_engine.begin() as conn:
+        conn.execute(Ticket.__table__.update().values(asset_id=None))
+    (linked, unmatched), backfill_ms = timed(lambda: backfill_ticket_asset_ids(db_engine), repeat=1)
+
+    serial = f"SN{args.assets // 2:07d}"
+    with session_scope(Session) as s:
+        asset_id = s.query(Asset.id).filter(Asset.serial_number == serial).scalar()
+
+    def legacy_lookup():
+        with session_scope(Session) as s:
+            return s.query(Ticket.id).filter(Ticket.related_asset.like(f"%({serial})")).all()
+
+    def fk_lookup():
+        with session_scope(Session) as s:
+            return list_asset_tickets(s, asset_id)
+
+    def health():
+        with session_scope(Session) as s:
+            return get_asset_health(s, since=get_wib_time() - timedelta(days=90))
+
+    legacy_rows, legacy_ms = timed(legacy_lookup)
+    fk_rows, fk_ms = timed(fk_lookup)
+    _, health_ms = timed(health)
+    report(f"asset_health ({args.tickets} tiket, {args.assets} aset)", {
+        "backfill asset_id": f"{backfill_ms:.0f} ms ({linked} tertaut, {unmatched} tidak cocok)",
+        "tiket per aset: LIKE label (lama)": f"{legacy_ms:.2f} ms ({len(legacy_rows)} tiket)",
+        "tiket per aset: FK index": f"{fk_ms:.2f} ms ({len(fk_rows)} tiket)",
+        "kesehatan aset 90 hari": f"{health_ms:.1f} ms",
+    })
+
+def make_screenshot(rnd, size=(1920, 1080)):
+    # PNG mirip screenshot: blok warna + garis teks, bukan noise acak
+    from PIL import Image, ImageDraw
+    img = Image.new("RGB", size, (rnd.randrange(200, 256),) * 3)
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rnd.randrange(size[0]), rnd.randrange(size[1])
+        draw.rectangle([x, y, x + rnd.randrange(50, 600), y + rnd.randrange(20, 300)],
+                       fill=tuple(rnd.randrange(256) for _ in range(3)))
+    # Satu area "foto" (noise) supaya ukuran PNG mendekati screenshot asli
+    img.paste(Image.frombytes("RGB", (480, 360), rnd.randbytes(480 * 360 * 3)), (rnd.randrange(1400), rnd.randrange(700)))
+    for line in range(0, size[1], 24):
+        draw.text((20, line), f"Error 0x{rnd.randrange(1 << 32):08X} at module {rnd.choice(NAMES)}", fill=(0, 0, 0))
+    out = io.BytesIO()
+    img.save(out, "PNG")
+    return out.getvalue()
+
+def bench_attachments(args):
+    from attachments import AttachmentService, LocalAttachmentStore, S3AttachmentStore, LocalS3Client, make_thumbnail
+
+    rnd = random.Random(42)
+    files = [make_screenshot(rnd) for _ in range(args.files)]
+    root = tempfile.mkdtemp(prefix="bench-uploads-")
+
+    def legacy_save(data, i):
+        os.makedirs(os.path.join(root, "legacy"), exist_ok=True)
+        with open(os.path.join(root, "legacy", f"{time.time()}_{i}.png"), "wb") as f:
+            f.write(data)
+
+    local = AttachmentService(LocalAttachmentStore(os.path.join(root, "store")))
+    _, legacy_ms = timed(lambda: [legacy_save(d, i) for i, d in enumerate(files)], repeat=1)
+    keys, save_ms = timed(lambda: [local.save(f"shot{i}.png", d) for i, d in enumerate(files)], repeat=1)
+    _, dedup_ms = timed(lambda: [local.save("ulang.png", d) for d in files], repeat=1)
+    _, thumb_ms = timed(lambda: make_thumbnail(files[0]))
+    for key in keys:
+        local.schedule_thumbnail(key).result()
+    thumbs = [local.thumbnail(key) for key in keys]
+
+    # Stand-in S3 dengan latency 20 ms per request
+    s3 = AttachmentService(S3AttachmentStore("bench", client=LocalS3Client(latency=0.02)))
+    s3_keys = [s3.save(f"shot{i}.png", d) for i, d in enumerate(files[:5])]
+    for key in s3_keys:
+        s3.schedule_thumbnail(key).result()
+    _, s3_thumb_ms = timed(lambda: s3.thumbnail(s3_keys[0]))
+    _, s3_orig_ms = timed(lambda: s3.load(s3_keys[0]))
+
+    orig_kb = sum(len(d) for d in files) / len(files) / 1024
+    thumb_kb = sum(len(t) for t in thumbs) / len(thumbs) / 1024
+    report(f"attachments ({args.files} screenshot 1920x1080)", {
+        "simpan lama (per file)": f"{legacy_ms / len(files):.2f} ms",
+        "simpan + hash + antri thumbnail": f"{save_ms / len(files):.2f} ms",
+        "upload ulang (dedup)": f"{dedup_ms / len(files):.2f} ms, {local.counters['deduplicated']} tidak ditulis ulang",
+        "buat thumbnail (worker)": f"{thumb_ms:.1f} ms",
+        "ukuran asli vs thumbnail": f"{orig_kb:.0f} KB -> {thumb_kb:.0f} KB",
+        "S3 stand-in: thumbnail / asli": f"{s3_thumb_ms:.0f} ms / {s3_orig_ms:.0f} ms",
+    })
+
+def bench_login(args):
+    # Badai login (thread penyerang) vs latency halaman lain di proses yang sama
+    from passlib.hash import pbkdf2_sha256
+    from auth import AuthService, LoginBusy, LoginThrottled, ensure_default_admin
+
+    db_engine = make_engine(args, pool_size=args.workers, max_overflow=args.workers)
+    seed(db_engine, tickets=min(args.tickets, 20_000))
+    Session = make_session_factory(db_engine)
+    ensure_default_admin(Session)
+    duration = 3.0
+
+    def other_page():
+        with session_scope(Session) as s:
+            get_ticket_stats(s)
+
+    def legacy_attempt(i):
+        # verify_user lama: query + PBKDF2 langsung di thread script
+        with session_scope(Session) as s:
+            user = s.query(User).filter_by(username="admin").first()
+            pbkdf2_sha256.verify(f"salah{i}", user.password_hash)
+
+    def storm(attempt):
+        stop = threading.Event()
+        counts = {"attempts": 0}
+        def attacker(n):
+            i = 0
+            while not stop.is_set():
+                try:
+                    attempt(n * 1_000_000 + i)
+                except (LoginBusy, LoginThrottled):
+                    time.sleep(0.01)
+                counts["attempts"] += 1
+                i += 1
+        threads = [threading.Thread(target=attacker, args=(n,), daemon=True) for n in range(args.workers)]
+        for t in threads:
+            t.start()
+        latencies = []
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            other_page()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.02)
+        stop.set()
+        for t in threads:
+            t.join()
+        latencies.sort()
+        return latencies, counts["attempts"]
+
+    def fmt(latencies):
+        return f"p50 {latencies[len(latencies) // 2]:.1f} ms, p95 {latencies[int(len(latencies) * 0.95)]:.1f} ms"
+
+    baseline, _ = storm(lambda i: time.sleep(0.05))
+    legacy, legacy_n = storm(legacy_attempt)
+    # IP & username berganti tiap percobaan: yang membatasi hanya worker pool
+    auth = AuthService(Session)
+    pooled, pooled_n = storm(lambda i: auth.login(f"user{i}", "salah", ip=f"10.0.{i % 250}.{i // 250 % 250}"))
+    pooled_stats = auth.stats()
+    auth = AuthService(Session)
+    throttled, throttled_n = storm(lambda i: auth.login("admin", "salah", ip="10.0.0.1"))
+    throttled_stats = auth.stats()
+
+    auth = AuthService(Session)
+    token = auth.issue_token(auth.login("admin", "admin123"))
+    _, token_ms = timed(lambda: auth.verify_token(token), repeat=50)
+    _, hash_ms = timed(lambda: legacy_attempt(0))
+    report(f"login ({args.workers} thread penyerang, {duration:.0f} detik)", {
+        "halaman lain, tanpa badai": fmt(baseline),
+        "badai, verifikasi di thread (lama)": f"{fmt(legacy)} ({legacy_n} percobaan)",
+        "badai, worker pool (IP berganti)": f"{fmt(pooled)} ({pooled_stats['failed']} diverifikasi, {pooled_stats['busy']} ditolak sibuk)",
+        "badai, 1 IP + 1 username": f"{fmt(throttled)} ({throttled_stats['failed']} diverifikasi, {throttled_stats['throttled']} di-throttle)",
+        "login ulang: PBKDF2 vs token": f"{hash_ms:.1f} ms vs {token_ms:.2f} ms",
+    })
+
+def bench_rerun(args):
+    # Overhead per interaksi: kerja startup yang dulu jalan di setiap rerun
+    # (create_schema + cek admin) vs cek versi skema yang sekarang sekali per proses
+    from streamlit.testing.v1 import AppTest
+    from db import get_schema_version, migrate
+
+    db_engine = make_engine(args)
+    seed(db_engine, tickets=min(args.tickets, 20_000))
+    migrate(db_engine)
+    Session = make_session_factory(db_engine)
+    statements = []
+    event.listen(db_engine, "before_cursor_execute", lambda *a, **kw: statements.append(1))
+
+    def legacy_startup():
+        create_schema(db_engine)
+        with session_scope(Session) as s:
+            s.query(User).filter_by(username='admin').first()
+    statements.clear()
+    _, legacy_ms = timed(legacy_startup, repeat=1)
+    legacy_statements = len(statements)
+    _, legacy_ms = timed(legacy_startup)
+
+    statements.clear()
+    _, check_ms = timed(lambda: get_schema_version(db_engine), repeat=1)
+    check_statements = len(statements)
+
+    # Rerun halaman admin lewat AppTest (proses sama, cache_resource aktif)
+    at = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"), default_timeout=120)
+    at.secrets["DB_URL"] = str(db_engine.url)
+    at.run()
+    at.text_input[0].input("admin")
+    at.text_input[1].input("admin123")
+    at.button[0].click().run()
+    at.sidebar.radio[0].set_value("📋 Manajemen Tiket").run()
+    durations = []
+    for _ in range(args.queries):
+        start = time.perf_counter()
+        at.run()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    report(f"rerun ({db_engine.dialect.name})", {
+        "startup per rerun (lama)": f"{legacy_ms:.1f} ms, {legacy_statements} statement SQL",
+        "cek skema (sekali per proses)": f"{check_ms:.1f} ms, {check_statements} statement SQL",
+        "startup per rerun (sekarang)": "0 statement SQL (cache_resource)",
+        "rerun Manajemen Tiket (AppTest)": f"p50 {durations[len(durations) // 2]:.0f} ms, p95 {durations[int(len(durations) * 0.95)]:.0f} ms",
+    })
+
+# --- SKENARIO: IMPORT / EXPORT MASSAL ---
+# Import file CSV / XLSX lewat bulk.py (INSERT batch per chunk) vs cara lama:
+# session.add + commit per baris (seperti form "Tambah Aset"), dalam baris/detik.
+def bench_bulk(args):
+    from bulk import ASSET_COLUMNS, TICKET_COLUMNS, export_rows, import_assets, import_tickets
+    from reports import write_csv, write_xlsx
+
+    db_engine = make_engine(args)
+    Session = make_session_factory(db_engine)
+    rnd = random.Random(7)
+    now = get_wib_time()
+    asset_rows = [
+        (None, f"{rnd.choice(ASSET_CATEGORIES)} {i}", f"INV{i:07d}", rnd.choice(ASSET_CATEGORIES), rnd.choice(NAMES), "Active")
+        for i in range(args.assets)
+    ]
+    ticket_rows = []
+    for i in range(args.tickets):
+        subject, desc = rnd.choice(PROBLEMS)
+        ticket_rows.append((
+            None, now - timedelta(minutes=rnd.randint(0, 60 * 24 * 365)), rnd.choice(NAMES), rnd.choice(DEPARTMENTS),
+            rnd.choice(CATEGORIES), rnd.choice(PRIORITIES), rnd.choice(STATUSES), f"{subject} #{i}", desc.format(n=i % 9),
+            None, f"INV{rnd.randrange(args.assets):07d}" if args.assets and rnd.random() < 0.5 else None,
+        ))
+
+    def make_file(rows, columns, fmt):
+        out = io.BytesIO()
+        headers = [label for label, _ in columns]
+        (write_xlsx if fmt == "xlsx" else write_csv)(rows, out, headers=headers)
+        out.seek(0)
+        return out
+
+    def rate(count, seconds):
+        return f"{count / seconds:,.0f} baris/detik ({count} baris, {seconds:.1f}s)"
+
+    results = {}
+    # Cara lama pada sampel kecil (per baris commit sangat lambat)
+    sample = asset_rows[:min(2000, len(asset_rows))]
+    start = time.perf_counter()
+    for _, name, sn, category, assigned_to, status in sample:
+        with session_scope(Session) as s:
+            s.add(Asset(name=name, serial_number=f"OLD{sn}", category=category, assigned_to=assigned_to, status=status))
+            s.commit()
+    results["aset: add + commit per baris (lama)"] = rate(len(sample), time.perf_counter() - start)
+
+    for fmt in ["csv", "xlsx"]:
+        data = make_file(asset_rows, ASSET_COLUMNS, fmt)
+        result = import_assets(db_engine, data, f"aset.{fmt}", on_conflict="update" if fmt == "xlsx" else "skip")
+        label = "import baru" if fmt == "csv" else "import ulang, update semua SN"
+        results[f"aset {fmt}: {label}"] = f"{rate(result['rows'], result['seconds'])}, {result['invalid']} invalid"
+
+    data = make_file(ticket_rows, TICKET_COLUMNS, "csv")
+    result = import_tickets(db_engine, data, "tiket.csv")
+    results["tiket csv: import + tautkan aset"] = f"{rate(result['rows'], result['seconds'])}, {result['linked']} tertaut, {result['invalid']} invalid"
+
+    for kind in ["assets", "tickets"]:
+        for fmt in [".csv", ".xlsx"]:
+            start = time.perf_counter()
+            with tempfile.TemporaryFile() as out, session_scope(Session) as s:
+                count = export_rows(s, kind, fmt, out)
+            results[f"export {kind} {fmt}"] = rate(count, time.perf_counter() - start)
+    report(f"bulk ({db_engine.dialect.name})", results)
+
+# --- SKENARIO: TINDAKAN MASSAL TIKET ---
+# Tutup N tiket + kirim balasan: cara lama per tiket (get + commit status, lalu
+# post_comment + commit) vs satu transaksi UPDATE ... IN + INSERT executemany.
+def bench_bulk_actions(args):
+    from db import add_ticket_comments, bulk_update_tickets
+
+    db_engine = make_engine(args)
+    seed(db_engine, tickets=args.tickets)
+    Session = make_session_factory(db_engine)
+    statements = []
+    event.listen(db_engine, "before_cursor_execute", lambda *a, **kw: statements.append(1))
+    count = args.queries
+    reply = "Masalah selesai. Tiket ditutup."
+
+    def legacy(ids):
+        with session_scope(Session) as s:
+            for tid in ids:
+                ticket = s.get(Ticket, tid)
+                ticket.status = "Resolved"
+                s.commit()
+                s.add(Comment(ticket_id=tid, sender="Admin", content=reply, created_at=get_wib_time()))
+                s.commit()
+
+    def bulk(ids):
+        with session_scope(Session) as s:
+            bulk_update_tickets(s, ids, status="Resolved", priority="Low")
+            add_ticket_comments(s, ids, "Admin", reply, get_wib_time())
+            s.commit()
+
+    results = {}
+    for name, fn, first_id in [("per tiket (lama)", legacy, 1), ("massal, 1 transaksi", bulk, count + 1)]:
+        ids = list(range(first_id, first_id + count))
+        statements.clear()
+        start = time.perf_counter()
+        fn(ids)
+        elapsed = (time.perf_counter() - start) * 1000
+        results[f"{name}: {count} tiket"] = f"{elapsed:.0f} ms, {len(statements)} statement SQL"
+    report(f"bulk_actions ({db_engine.dialect.name})", results)
+
+# --- SKENARIO: ARSIP ---
+# Query tabel aktif sebelum/sesudah tiket Resolved lama dipindah ke arsip, plus
+# latensi tulis komentar dari thread lain selama job arsip berjalan.
+def bench_archive(args):
+    from archive import archive_resolved_tickets, count_archivable
+    from db import list_tickets_page
+
+    db_engine = make_engine(args)
+    seed(db_engine, tickets=args.tickets, comments=args.tickets * 5)
+    Session = make_session_factory(db_engine)
+
+    def active_views():
+        with session_scope(Session) as s:
+            get_ticket_stats(s)
+            list_tickets_page(s, ["Resolved"], page_size=50)
+            return search_tickets(s, "printer", limit=50)
+
+    _, before_ms = timed(active_views)
+    candidates = count_archivable(db_engine, args.days)
+
+    write_ms = []
+    done = threading.Event()
+
+    def writer():
+        while not done.is_set():
+            start = time.perf_counter()
+            with db_engine.begin() as conn:
+                conn.execute(insert(Comment), {"ticket_id": args.tickets, "sender": "Admin", "content": "ping", "created_at": get_wib_time()})
+            write_ms.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    result = archive_resolved_tickets(db_engine, args.days)
+    done.set()
+    thread.join()
+    _, after_ms = timed(active_views)
+    write_ms.sort()
+    report(f"archive ({args.tickets} tiket, > {args.days} hari, {db_engine.dialect.name})", {
+        "diarsip": f"{result['tickets']}/{candidates} tiket, {result['comments']} komentar, {result['batches']} batch",
+        "durasi job": f"{result['seconds']:.1f} s ({result['tickets'] / max(result['seconds'], 1e-9):.0f} tiket/detik)",
+        "tulis komentar selama job": f"p50 {write_ms[len(write_ms) // 2]:.1f} ms, max {write_ms[-1]:.1f} ms ({len(write_ms)} insert)",
+        "dashboard + daftar + cari (sebelum)": f"{before_ms:.1f} ms",
+        "dashboard + daftar + cari (sesudah)": f"{after_ms:.1f} ms",
+    })
+
+# --- SKENARIO: FEED AKTIVITAS ---
+# Biaya satu tick: query event "id > cursor" vs render ulang daftar tiket + stats
+def bench_events(args):
+    from db import TicketEvent, list_events_since, list_tickets_page
+
+    db_engine = make_engine(args)
+    seed(db_engine, tickets=args.tickets)
+    now = get_wib_time()
+    with db_engine.begin() as conn:
+        for start in range(0, args.tickets * 2, BATCH):
+            conn.execute(insert(TicketEvent), [
+                {"kind": "comment", "ticket_id": i % args.tickets + 1, "actor": "Budi", "detail": "Masih error pak.", "created_at": now}
+                for i in range(start, min(start + BATCH, args.tickets * 2))
+            ])
+    Session = make_session_factory(db_engine)
+    cursor = args.tickets * 2 - 5
+
+    def full_list():
+        with session_scope(Session) as s:
+            get_ticket_stats(s)
+            return list_tickets_page(s, ["Open", "In Progress"], page_size=50)
+
+    def feed_tick():
+        with session_scope(Session) as s:
+            return list_events_since(s, cursor, limit=200)
+
+    _, list_ms = timed(full_list)
+    events, feed_ms = timed(feed_tick, repeat=25)
+    report(f"events ({args.tickets} tiket, {args.tickets * 2} event)", {
+        "stats + daftar tiket per tick": f"{list_ms:.1f} ms",
+        f"feed id > cursor ({len(events)} event baru)": f"{feed_ms:.2f} ms",
+        "speedup": f"{list_ms / feed_ms:.0f}x",
+    })
+
+SCENARIOS = {
+    "pool": bench_pool,
+    "dashboard": bench_dashboard,
+    "search": bench_search,
+    "similar": bench_similar,
+    "export": bench_export,
+    "sla": bench_sla,
+    "assets": bench_assets,
+    "asset_health": bench_asset_health,
+    "attachments": bench_attachments,
+    "login": bench_login,
+    "rerun": bench_rerun,
+    "bulk": bench_bulk,
+    "bulk_actions": bench_bulk_actions,
+    "archive": bench_archive,
+    "events": bench_events,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IT Service Desk")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--db-url", default=os.environ.get("BENCH_DB_URL"), help="Default: SQLite sementara")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=25)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--tickets", type=int, default=100_000)
+    parser.add_argument("--assets", type=int, default=50_000)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--days", type=int, default=90, help="Skenario archive: umur minimal tiket")
+    args = parser.parse_args()
+    SCENARIOS[args.scenario](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+# --- IMPORT / EXPORT MASSAL ---
+# Inventaris aset & tiket lama (CSV / XLSX) dibaca streaming per chunk,
+# divalidasi per baris, lalu ditulis dengan INSERT batch (executemany) satu
+# transaksi per chunk, bukan session.add + commit per baris. Serial number yang
+# sudah ada di DB (atau dobel di file) di-skip / di-update / dicatat sebagai
+# error sesuai on_conflict. Export untuk backup memakai writer streaming yang
+# sama dengan laporan (reports.py). Export aset bisa di-import ulang; export tiket
+# satu arah (tanpa komentar, import ulang menambah tiket baru).
+#     python bulk.py import assets inventaris.xlsx --on-conflict update
+#     python bulk.py import tickets tiket_lama.csv
+#     python bulk.py export assets backup_aset.csv
+#     python bulk.py export tickets backup_tiket.xlsx
+# Tanpa --db-url: env DB_URL, lalu DB_URL di .streamlit/secrets.toml (sama seperti migrate.py)
+import argparse
+import csv
+import io
+import os
+import time
+from datetime import date, datetime
+from itertools import chain, islice
+
+from sqlalchemy import insert, select
+
+from db import Asset, Ticket, asset_label, build_engine, get_wib_time, make_session_factory, parse_asset_serial, session_scope
+from reports import write_csv, write_xlsx
+
+CHUNK_SIZE = 2000
+MAX_ERRORS = 200
+CONFLICT_POLICIES = ["skip", "update", "error"]
+TICKET_PRIORITIES = ["Low", "Medium", "High", "Critical"]
+TICKET_STATUSES = ["Open", "In Progress", "Resolved"]
+DATE_FORMATS = ["%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y %H:%M", "%d-%m-%Y"]
+FILE_FORMATS = {".csv": "text/csv", ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+
+# Kolom file: (header export, kolom DB). Header import dicocokkan case-insensitive
+# dengan header export, nama field, atau alias.
+ASSET_COLUMNS = [
+    ("ID", Asset.id),
+    ("Nama", Asset.name),
+    ("Serial Number", Asset.serial_number),
+    ("Kategori", Asset.category),
+    ("Pemegang", Asset.assigned_to),
+    ("Status", Asset.status),
+]
+TICKET_COLUMNS = [
+    ("ID", Ticket.id),
+    ("Tanggal", Ticket.created_at),
+    ("Pelapor", Ticket.requester_name),
+    ("Departemen", Ticket.department),
+    ("Kategori", Ticket.category),
+    ("Prioritas", Ticket.priority),
+    ("Status", Ticket.status),
+    ("Masalah", Ticket.subject),
+    ("Deskripsi", Ticket.description),
+    ("Aset", Ticket.related_asset),
+    ("Serial Number Aset", Asset.serial_number),
+]
+ALIASES = {
+    "sn": "serial_number", "dipegang oleh": "assigned_to", "user": "assigned_to",
+    "serial_number_aset": "asset_serial", "serial number aset": "asset_serial", "asset_serial": "asset_serial",
+}
+
+# --- BACA FILE ---
+def read_rows(file, filename):
+    # Return (header, iterator (nomor baris, tuple nilai)). `file` mode biner (open(..., "rb") / UploadedFile)
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext == ".csv":
+        return _read_csv(file)
+    if ext == ".xlsx":
+        return _read_xlsx(file)
+    raise ValueError(f"Format file tidak didukung: {ext or filename} (pakai {' / '.join(FILE_FORMATS)})")
+
+def _read_csv(file):
+    text_in = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    first = text_in.readline()
+    # Excel dengan locale Indonesia menyimpan CSV dengan pemisah ';'
+    delimiter = ";" if first.count(";") > first.count(",") else ","
+    reader = csv.reader(chain([first], text_in), delimiter=delimiter)
+    header = next(reader, [])
+    return header, ((reader.line_num, row) for row in reader if any(v.strip() for v in row))
+
+def _read_xlsx(file):
+    from openpyxl import load_workbook
+
+    # read_only: baris dibaca bertahap dari zip, tidak dimuat semua ke memori
+    ws = load_workbook(file, read_only=True, data_only=True).active
+    rows = ws.iter_rows(values_only=True)
+    header = [str(v) if v is not None else "" for v in next(rows, ())]
+    return header, ((line, row) for line, row in enumerate(rows, start=2) if any(v is not None and v != "" for v in row))
+
+def map_header(header, columns, required):
+    # Return {index kolom file: nama field}; ValueError kalau kolom wajib tidak ada
+    names = {}
+    for label, col in columns:
+        names[label.lower()] = names[col.key] = col.key
+    names.update(ALIASES)
+    mapping = {}
+    for idx, title in enumerate(header):
+        field = names.get(str(title or "").strip().lower())
+        if field and field != "id" and field not in mapping.values():
+            mapping[idx] = field
+    missing = [f for f in required if f not in mapping.values()]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ada di file: {', '.join(missing)}")
+    return mapping
+
+# --- VALIDASI ---
+# Panjang maksimum kolom String, dibaca sekali (atribut ORM lambat kalau dibaca per baris)
+ASSET_LENGTHS = {c.key: getattr(c.type, "length", None) for c in Asset.__table__.columns}
+TICKET_LENGTHS = {c.key: getattr(c.type, "length", None) for c in Ticket.__table__.columns}
+TICKET_LENGTHS["asset_serial"] = ASSET_LENGTHS["serial_number"]
+
+def _text(record, field, max_length=None, required=False):
+    value = record.get(field)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # serial angka dari Excel (12345.0)
+    value = str(value).strip() if value is not None else ""
+    if not value:
+        if required:
+            raise ValueError(f"'{field}' wajib diisi")
+        return None
+    if max_length and len(value) > max_length:
+        raise ValueError(f"'{field}' maksimal {max_length} karakter")
+    return value
+
+def _choice(value, choices, field, default):
+    if value is None:
+        return default
+    for choice in choices:
+        if choice.lower() == value.lower():
+            return choice
+    raise ValueError(f"'{field}' harus salah satu dari {', '.join(choices)}")
+
+def _datetime(value):
+    if value is None or value == "":
+        return get_wib_time()
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    value = str(value).strip()
+    try:
+        return datetime.fromisoformat(value)  # format export (YYYY-MM-DD HH:MM:SS[.ffffff])
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"tanggal tidak dikenali: {value}")
+
+def validate_asset(record):
+    return {
+        "name": _text(record, "name", ASSET_LENGTHS["name"], required=True),
+        "category": _text(record, "category", ASSET_LENGTHS["category"], required=True),
+        "serial_number": _text(record, "serial_number", ASSET_LENGTHS["serial_number"]),
+        "assigned_to": _text(record, "assigned_to", ASSET_LENGTHS["assigned_to"]),
+        "status": _text(record, "status", ASSET_LENGTHS["status"]) or "Active",
+    }
+
+def validate_ticket(record):
+    return {
+        "requester_name": _text(record, "requester_name", TICKET_LENGTHS["requester_name"], required=True),
+        "department": _text(record, "department", TICKET_LENGTHS["department"], required=True),
+        "category": _text(record, "category", TICKET_LENGTHS["category"], required=True),
+        "priority": _choice(_text(record, "priority", TICKET_LENGTHS["priority"]), TICKET_PRIORITIES, "priority", "Medium"),
+        "status": _choice(_text(record, "status", TICKET_LENGTHS["status"]), TICKET_STATUSES, "status", "Open"),
+        "subject": _text(record, "subject", TICKET_LENGTHS["subject"], required=True),
+        "description": _text(record, "description", TICKET_LENGTHS["description"], required=True),
+        "related_asset": _text(record, "related_asset", TICKET_LENGTHS["related_asset"]),
+        "asset_serial": _text(record, "asset_serial", TICKET_LENGTHS["asset_serial"]),
+        "created_at": _datetime(record.get("created_at")),
+    }
+
+def _validated_chunks(rows, mapping, validate, result, chunk_size):
+    # Yield list (nomor baris, record valid) per chunk; baris invalid dicatat di result
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        valid = []
+        for line, values in chunk:
+            result["rows"] += 1
+            record = {field: values[idx] for idx, field in mapping.items() if idx < len(values)}
+            try:
+                valid.append((line, validate(record)))
+            except ValueError as e:
+                _reject(result, line, str(e))
+        yield valid
+
+def _reject(result, line, message):
+    result["invalid"] += 1
+    if len(result["errors"]) < MAX_ERRORS:
+        result["errors"].append((line, message))
+
+def _new_result():
+    return {"rows": 0, "inserted": 0, "updated": 0, "skipped": 0, "invalid": 0, "errors": [], "seconds": 0.0}
+
+# --- IMPORT ---
+def _asset_insert(db_engine, on_conflict):
+    # INSERT ... ON CONFLICT (serial_number): aset dengan serial yang sama yang masuk
+    # di antara cek "sudah ada" dan INSERT tidak lagi membatalkan chunk (IntegrityError).
+    # RETURNING serial_number -> baris yang benar-benar ditambah / diupdate.
+    if db_engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif db_engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(Asset).returning(Asset.serial_number)
+    stmt = dialect_insert(Asset)
+    if on_conflict == "update":
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["serial_number"],
+            set_={name: stmt.excluded[name] for name in ("name", "category", "assigned_to", "status")},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["serial_number"])
+    return stmt.returning(Asset.serial_number)
+
+def import_assets(db_engine, file, filename, on_conflict="skip", chunk_size=CHUNK_SIZE):
+    # Return ringkasan: rows, inserted, updated, skipped, invalid, errors [(baris, pesan)], seconds
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"on_conflict harus salah satu dari {', '.join(CONFLICT_POLICIES)}")
+    started = time.perf_counter()
+    header, rows = read_rows(file, filename)
+    mapping = map_header(header, ASSET_COLUMNS, ["name", "category"])
+    result = _new_result()
+    insert_stmt = _asset_insert(db_engine, on_conflict)
+    seen = set()  # serial yang sudah diproses dari chunk sebelumnya
+    for chunk in _validated_chunks(rows, mapping, validate_asset, result, chunk_size):
+        # Serial dobel di dalam file: dengan "update" baris terakhir yang menang dan
+        # baris sebelumnya dihitung skipped. Aset tanpa serial number tidak punya
+        # kunci, jadi selalu ditambah baru.
+        pending = {}
+        for line, record in chunk:
+            serial = record["serial_number"]
+            if serial and (serial in pending or serial in seen) and on_conflict != "update":
+                _conflict(result, line, serial, on_conflict)
+                continue
+            if serial in pending:
+                result["skipped"] += 1
+            pending[serial or line] = (line, record)
+        serials = [key for key in pending if isinstance(key, str)]
+        with db_engine.begin() as conn:
+            existing = set(conn.execute(
+                select(Asset.serial_number).where(Asset.serial_number.in_(serials))
+            ).scalars()) if serials else set()
+            records = []
+            for key, (line, record) in pending.items():
+                if key in existing and on_conflict != "update":
+                    _conflict(result, line, key, on_conflict)
+                else:
+                    records.append((line, record))
+            written = set(conn.execute(insert_stmt, [r for _, r in records]).scalars()) if records else set()
+        for line, record in records:
+            serial = record["serial_number"]
+            if serial in existing:
+                result["updated"] += 1
+            elif serial is None or serial in written:
+                result["inserted"] += 1
+            else:
+                # Ditambah proses lain setelah cek di atas
+                _conflict(result, line, serial, on_conflict)
+        seen.update(serials)
+    result["errors"].sort()
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def _conflict(result, line, serial, on_conflict):
+    if on_conflict == "skip":
+        result["skipped"] += 1
+    else:
+        _reject(result, line, f"serial number {serial} sudah ada")
+
+def import_tickets(db_engine, file, filename, chunk_size=CHUNK_SIZE):
+    # Tiket selalu ditambah sebagai baris baru (kolom ID di file diabaikan).
+    # Aset ditautkan lewat "Serial Number Aset" atau serial di label "Aset".
+    started = time.perf_counter()
+    header, rows = read_rows(file, filename)
+    mapping = map_header(header, TICKET_COLUMNS, ["requester_name", "department", "category", "subject", "description"])
+    result = _new_result()
+    result["linked"] = 0
+    for chunk in _validated_chunks(rows, mapping, validate_ticket, result, chunk_size):
+        records = [record for _, record in chunk]
+        for record in records:
+            record["asset_serial"] = record["asset_serial"] or parse_asset_serial(record["related_asset"])
+        with db_engine.begin() as conn:
+            serials = {r["asset_serial"] for r in records} - {None}
+            assets = {row.serial_number: row for row in conn.execute(
+                select(Asset.serial_number, Asset.id, Asset.name).where(Asset.serial_number.in_(serials))
+            )} if serials else {}
+            for record in records:
+                asset = assets.get(record.pop("asset_serial"))
+                record["asset_id"] = asset.id if asset else None
+                if asset and not record["related_asset"]:
+                    record["related_asset"] = asset_label(asset.name, asset.serial_number)
+            if records:
+                conn.execute(insert(Ticket), records)
+        result["inserted"] += len(records)
+        result["linked"] += sum(1 for r in records if r["asset_id"])
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+# --- EXPORT ---
+def iter_export_rows(s, columns, chunk_size=CHUNK_SIZE):
+    query = s.query(*[col for _, col in columns])
+    if columns is TICKET_COLUMNS:
+        query = query.outerjoin(Asset, Ticket.asset_id == Asset.id)
+    for row in query.order_by(columns[0][1]).execution_options(yield_per=chunk_size):
+        yield tuple(row)
+
+def export_rows(s, kind, fmt, out):
+    # kind: "assets" / "tickets"; fmt: ".csv" / ".xlsx". Return jumlah baris.
+    columns = ASSET_COLUMNS if kind == "assets" else TICKET_COLUMNS
+    headers = [label for label, _ in columns]
+    rows = iter_export_rows(s, columns)
+    if fmt == ".xlsx":
+        return write_xlsx(rows, out, headers=headers, sheet="Aset" if kind == "assets" else "Tiket")
+    return write_csv(rows, out, headers=headers)
+
+# --- CLI ---
+def main():
+    from migrate import SECRETS_FILE, load_db_url
+
+    parser = argparse.ArgumentParser(description="Import / export massal aset & tiket (CSV / XLSX)")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("kind", choices=["assets", "tickets"])
+    parser.add_argument("path", help="File .csv / .xlsx")
+    parser.add_argument("--on-conflict", choices=CONFLICT_POLICIES, default="skip", help="Serial number aset yang sudah ada")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--db-url", help="Default: env DB_URL / .streamlit/secrets.toml")
+    args = parser.parse_args()
+
+    db_url = load_db_url(args.db_url)
+    if not db_url:
+        parser.error(f"DB_URL tidak ditemukan (isi --db-url, env DB_URL, atau {SECRETS_FILE})")
+    fmt = os.path.splitext(args.path)[1].lower()
+    if fmt not in FILE_FORMATS:
+        parser.error(f"Format file harus {' / '.join(FILE_FORMATS)}")
+    db_engine = build_engine(db_url)
+
+    if args.action == "export":
+        started = time.perf_counter()
+        with open(args.path, "wb") as out, session_scope(make_session_factory(db_engine)) as s:
+            count = export_rows(s, args.kind, fmt, out)
+        elapsed = time.perf_counter() - started
+        print(f"✅ {count} baris diekspor ke {args.path} ({elapsed:.1f}s, {count / max(elapsed, 1e-9):.0f} baris/detik)")
+    else:
+        with open(args.path, "rb") as f:
+            if args.kind == "assets":
+                result = import_assets(db_engine, f, args.path, args.on_conflict, args.chunk_size)
+            else:
+                result = import_tickets(db_engine, f, args.path, args.chunk_size)
+        print(format_result(result))
+        for line, message in result["errors"]:
+            print(f"  baris {line}: {message}")
+    db_engine.dispose()
+
+def format_result(result):
+    rate = result["rows"] / max(result["seconds"], 1e-9)
+    text = (f"✅ {result['rows']} baris dibaca: {result['inserted']} ditambah, {result['updated']} diupdate, "
+            f"{result['skipped']} dilewati, {result['invalid']} invalid ({result['seconds']:.1f}s, {rate:.0f} baris/detik)")
+    if "linked" in result:
+        text += f"; {result['linked']} tiket tertaut ke aset"
+    return text
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# --- CHAT BUS (NOTIFIKASI PERUBAHAN ANTAR SESI) ---
+# Satu bus per proses server. Setiap tiket punya nomor versi yang naik tiap ada
+# komentar baru, plus buffer pesan terakhir. Fragment chat cukup cek versi di
+# memori dan hanya menyentuh DB kalau versi berubah dan buffer tidak cukup.
+# Tanpa Postgres (mis. SQLite lokal) bus cukup jalan in-memory; dengan Postgres,
+# LISTEN/NOTIFY membawa komentar dari proses lain.
+import select
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+CHAT_NOTIFY_CHANNEL = "ticket_comments"
+CHAT_BUFFER_SIZE = 50
+# Penanda proses ini di payload NOTIFY: "<origin>:<ticket_id>"
+PROCESS_ID = uuid.uuid4().hex
+
+ChatMessage = namedtuple("ChatMessage", ["id", "sender", "content", "created_at"])
+
+class ChatBus:
+    def __init__(self, buffer_size=CHAT_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._events = {}
+        self._buffer_size = buffer_size
+
+    def version(self, ticket_id):
+        with self._lock:
+            return self._versions.get(ticket_id, 0)
+
+    def publish(self, ticket_id, message=None):
+        # message=None berarti "ada perubahan" tanpa isi (mis. dari NOTIFY proses lain)
+        with self._lock:
+            version = self._versions.get(ticket_id, 0) + 1
+            self._versions[ticket_id] = version
+            events = self._events.setdefault(ticket_id, deque(maxlen=self._buffer_size))
+            events.append((version, message))
+            return version
+
+    def events_since(self, ticket_id, since_version):
+        # Return (versi_terkini, list pesan) atau (versi_terkini, None) kalau
+        # ada celah yang tidak bisa ditutup dari buffer -> caller harus baca DB.
+        with self._lock:
+            current = self._versions.get(ticket_id, 0)
+            if since_version is None:
+                return current, None
+            if since_version == current:
+                return current, []
+            events = [e for e in self._events.get(ticket_id, ()) if e[0] > since_version]
+            if len(events) != current - since_version or any(m is None for _, m in events):
+                return current, None
+            return current, [m for _, m in events]
+
+# --- POSTGRES LISTEN/NOTIFY ---
+def notify_payload(ticket_id, origin=PROCESS_ID):
+    return f"{origin}:{ticket_id}"
+
+def parse_notify_payload(payload, origin=PROCESS_ID):
+    # Return ticket_id, atau None untuk NOTIFY dari proses ini sendiri (pesannya
+    # sudah dipublish lengkap ke bus) dan payload yang tidak dikenal
+    sender, _, ticket_id = payload.rpartition(":")
+    if sender == origin:
+        return None
+    try:
+        return int(ticket_id)
+    except ValueError:
+        return None
+
+def start_pg_listener(bus, db_engine):
+    # LISTEN/NOTIFY agar komentar yang ditulis proses/server lain ikut menaikkan versi.
+    # Koneksi khusus di luar pool: dipegang selamanya & autocommit, jadi tidak boleh
+    # memakan slot pool app, dan ditutup setiap kali putus sebelum reconnect.
+    cargs, cparams = db_engine.dialect.create_connect_args(db_engine.url)
+
+    def listen():
+        while True:
+            conn = None
+            try:
+                conn = db_engine.dialect.connect(*cargs, **cparams)
+                conn.autocommit = True
+                cur = conn.cursor()
+                cur.execute(f"LISTEN {CHAT_NOTIFY_CHANNEL}")
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        ticket_id = parse_notify_payload(conn.notifies.pop(0).payload)
+                        if ticket_id is not None:
+                            bus.publish(ticket_id)
+            except Exception as e:
+                print(f"⚠️ Listener chat terputus: {e}")
+                time.sleep(5)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    thread = threading.Thread(target=listen, name="chat-bus-listener", daemon=True)
+    thread.start()
+    return thread
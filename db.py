@@ -0,0 +1,695 @@
+# --- DATABASE LAYER ---
+# Model, engine & session dipisah dari app.py supaya bisa dipakai ulang oleh
+# script lain (benchmark, migrasi, import) tanpa menjalankan halaman Streamlit.
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytz
+from sqlalchemy import create_engine, event, func, and_, or_, case, select, insert, update, bindparam, text, inspect, table, column, literal_column, Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateIndex
+
+Base = declarative_base()
+
+# --- FUNGSI WAKTU WIB (BARU) ---
+# Fungsi ini memastikan waktu selalu WIB, tidak peduli server ada di mana
+def get_wib_time():
+    utc_now = datetime.now(pytz.utc)
+    wib_now = utc_now.astimezone(pytz.timezone('Asia/Jakarta'))
+    return wib_now.replace(tzinfo=None) # Hapus info timezone agar DB tidak bingung
+
+# --- MODEL DATABASE ---
+class User(Base):
+    __tablename__ = 'users'
+    id = Column(Integer, primary_key=True)
+    username = Column(String(50), unique=True, nullable=False)
+    password_hash = Column(String(200), nullable=False)
+    role = Column(String(20), default='user')
+
+class Asset(Base):
+    __tablename__ = 'assets'
+    __table_args__ = (
+        # Pencarian prefix nama (case-insensitive) & serial number untuk picker aset.
+        # varchar_pattern_ops supaya LIKE 'abc%' tetap pakai index di Postgres non-C locale.
+        Index('ix_assets_serial_number_prefix', 'serial_number', postgresql_ops={'serial_number': 'varchar_pattern_ops'}),
+    )
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    category = Column(String(50), nullable=False)
+    serial_number = Column(String(50), unique=True)
+    assigned_to = Column(String(50))
+    status = Column(String(20), default='Active')
+
+Index('ix_assets_name_lower', func.lower(Asset.name).label('name_lower'), postgresql_ops={'name_lower': 'text_pattern_ops'})
+
+# Id tiket & komentar tidak boleh dipakai ulang: arsip (tickets_archive /
+# comments_archive) menyimpan id asli, jadi id baru harus selalu lebih besar dari
+# id yang pernah ada. Postgres (sequence) sudah begitu; di SQLite butuh AUTOINCREMENT
+# (sqlite_autoincrement). Tabel SQLite lama tanpa AUTOINCREMENT ditangani archive.py.
+class Ticket(Base):
+    __tablename__ = 'tickets'
+    __table_args__ = (
+        # Index "covering" untuk agregasi dashboard (GROUP BY status/kategori/departemen)
+        Index('ix_tickets_status_category_department', 'status', 'category', 'department'),
+        # Index untuk keyset pagination daftar tiket: ORDER BY created_at DESC, id DESC
+        Index('ix_tickets_status_created_at_id', 'status', 'created_at', 'id'),
+        Index('ix_tickets_created_at_id', 'created_at', 'id'),
+        # Index untuk query SLA (tiket aktif per prioritas yang melewati batas waktu)
+        Index('ix_tickets_status_priority_created_at', 'status', 'priority', 'created_at'),
+        # Riwayat tiket per aset & agregasi kesehatan aset (covering: asset_id, created_at, status)
+        Index('ix_tickets_asset_id_created_at_status', 'asset_id', 'created_at', 'status'),
+        {'sqlite_autoincrement': True},
+    )
+    id = Column(Integer, primary_key=True)
+    requester_name = Column(String(100), nullable=False)
+    department = Column(String(50), nullable=False)
+    category = Column(String(50), nullable=False)
+    related_asset = Column(String(100), nullable=True) # Label aset saat tiket dibuat (snapshot)
+    asset_id = Column(Integer, ForeignKey('assets.id'), nullable=True)
+    priority = Column(String(20), nullable=False)
+    subject = Column(String(200), nullable=False)
+    description = Column(Text, nullable=False)
+    status = Column(String(20), default='Open')
+    created_at = Column(DateTime, default=datetime.now) # Default tetap ada, tapi nanti kita override
+    image_path = Column(String(200), nullable=True)
+    comments = relationship('Comment', backref='ticket', cascade="all, delete-orphan")
+
+class Comment(Base):
+    __tablename__ = 'comments'
+    # Index untuk polling chat incremental: WHERE ticket_id = ? AND id > ?
+    __table_args__ = (Index('ix_comments_ticket_id_id', 'ticket_id', 'id'), {'sqlite_autoincrement': True})
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, ForeignKey('tickets.id'), nullable=False)
+    sender = Column(String(50), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+# --- ARSIP ---
+# Tiket Resolved lama + komentarnya dipindah ke tabel arsip (lihat archive.py),
+# supaya tabel "panas" (dashboard, daftar tiket, SLA, chat) tetap kecil.
+# id asli dipertahankan; tanpa FK ke assets supaya aset tetap bisa dihapus.
+class ArchivedTicket(Base):
+    __tablename__ = 'tickets_archive'
+    __table_args__ = (Index('ix_tickets_archive_created_at_id', 'created_at', 'id'),)
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    requester_name = Column(String(100), nullable=False)
+    department = Column(String(50), nullable=False)
+    category = Column(String(50), nullable=False)
+    related_asset = Column(String(100), nullable=True)
+    asset_id = Column(Integer, nullable=True, index=True)
+    priority = Column(String(20), nullable=False)
+    subject = Column(String(200), nullable=False)
+    description = Column(Text, nullable=False)
+    status = Column(String(20), default='Resolved')
+    created_at = Column(DateTime)
+    image_path = Column(String(200), nullable=True)
+    archived_at = Column(DateTime, nullable=False)
+
+class ArchivedComment(Base):
+    __tablename__ = 'comments_archive'
+    __table_args__ = (Index('ix_comments_archive_ticket_id_id', 'ticket_id', 'id'),)
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    ticket_id = Column(Integer, nullable=False)
+    sender = Column(String(50), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime)
+
+class AISuggestion(Base):
+    # Saran AI per tiket, dikunci hash (deskripsi, kategori, aset) -> tampilan ulang instan
+    __tablename__ = 'ai_suggestions'
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, ForeignKey('tickets.id'), nullable=False, index=True)
+    input_hash = Column(String(64), nullable=False, unique=True)
+    model = Column(String(100), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+class OutboxMessage(Base):
+    # Antrian notifikasi keluar (Telegram) yang tahan restart server
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (Index('ix_notification_outbox_status_id', 'status', 'id'),)
+    id = Column(Integer, primary_key=True)
+    channel = Column(String(20), nullable=False, default='telegram')
+    payload = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default='pending') # pending / sent / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    sent_at = Column(DateTime, nullable=True)
+
+class TicketEvent(Base):
+    # Feed aktivitas admin (tiket baru, ganti status, komentar baru). Dibaca dengan
+    # cursor "id > N" lewat PK; tanpa FK supaya tiket tetap bisa diarsip.
+    __tablename__ = 'ticket_events'
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False) # ticket / status / comment
+    ticket_id = Column(Integer, nullable=False)
+    actor = Column(String(100), nullable=True)
+    detail = Column(String(200), nullable=True)
+    created_at = Column(DateTime, default=datetime.now, index=True)
+    origin = Column(String(32), nullable=True) # Sesi browser yang memicu event (bukan peran pengirim)
+
+class SchemaVersion(Base):
+    # Riwayat migrasi (lihat migrate.py); app cukup cek versi terakhir sekali per proses
+    __tablename__ = 'schema_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime, default=datetime.now)
+
+# Naikkan setiap kali model / index berubah, lalu jalankan `python migrate.py`
+SCHEMA_VERSION = 5
+
+def create_schema(db_engine):
+    Base.metadata.create_all(db_engine)
+    migrate_ticket_asset_fk(db_engine)
+    migrate_ticket_event_origin(db_engine)
+    # create_all tidak menambah index ke tabel yang sudah ada, jadi pastikan manual.
+    # IF NOT EXISTS (bukan checkfirst) karena index ekspresi tidak terbaca lewat reflection SQLite.
+    with db_engine.begin() as conn:
+        for model_table in Base.metadata.sorted_tables:
+            for index in model_table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+    create_search_index(db_engine)
+
+def get_schema_version(db_engine):
+    if not inspect(db_engine).has_table(SchemaVersion.__tablename__):
+        return 0
+    with db_engine.connect() as conn:
+        return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+def migrate(db_engine):
+    # Return (versi sebelum, versi sesudah)
+    current = get_schema_version(db_engine)
+    if current < SCHEMA_VERSION:
+        create_schema(db_engine)
+        with db_engine.begin() as conn:
+            conn.execute(SchemaVersion.__table__.insert().values(version=SCHEMA_VERSION, applied_at=get_wib_time()))
+    return current, max(current, SCHEMA_VERSION)
+
+# --- MIGRASI: tickets.asset_id ---
+# Dulu tiket hanya menyimpan label "{nama} ({serial_number})". Kolom asset_id
+# ditambahkan ke tabel lama lalu diisi dari serial number di label tersebut.
+ASSET_LABEL_SERIAL_RE = re.compile(r"\(([^()]+)\)\s*$")
+BACKFILL_BATCH = 5000
+
+def migrate_ticket_asset_fk(db_engine):
+    columns = {c["name"] for c in inspect(db_engine).get_columns("tickets")}
+    if "asset_id" in columns:
+        return
+    with db_engine.begin() as conn:
+        conn.execute(text("ALTER TABLE tickets ADD COLUMN asset_id INTEGER REFERENCES assets(id)"))
+    backfill_ticket_asset_ids(db_engine)
+
+def parse_asset_serial(label):
+    match = ASSET_LABEL_SERIAL_RE.search(label or "")
+    return match.group(1).strip() if match else None
+
+def backfill_ticket_asset_ids(db_engine, batch_size=BACKFILL_BATCH):
+    # Per rentang id (PK range scan), cocokkan serial -> id dengan satu IN (...),
+    # lalu UPDATE executemany. asset_id IS NULL sengaja dicek di Python: kalau
+    # ada di WHERE, planner memilih index asset_id yang isinya NULL semua.
+    # Return (jumlah tertaut, jumlah label yang tidak cocok dengan aset manapun).
+    linked = unmatched = 0
+    update_stmt = (
+        Ticket.__table__.update()
+        .where(Ticket.__table__.c.id == bindparam("ticket_id"))
+        .values(asset_id=bindparam("new_asset_id"))
+    )
+    with db_engine.connect() as conn:
+        max_id = conn.execute(select(func.max(Ticket.id))).scalar() or 0
+    for start in range(0, max_id, batch_size):
+        with db_engine.begin() as conn:
+            rows = conn.execute(
+                select(Ticket.id, Ticket.related_asset, Ticket.asset_id)
+                .where(Ticket.id > start, Ticket.id <= start + batch_size, Ticket.related_asset.isnot(None))
+            ).all()
+            rows = [r for r in rows if r.asset_id is None]
+            serials = {parse_asset_serial(r.related_asset) for r in rows} - {None}
+            asset_ids = dict(conn.execute(
+                select(Asset.serial_number, Asset.id).where(Asset.serial_number.in_(serials))
+            ).all()) if serials else {}
+            params = []
+            for r in rows:
+                asset_id = asset_ids.get(parse_asset_serial(r.related_asset))
+                if asset_id:
+                    params.append({"ticket_id": r.id, "new_asset_id": asset_id})
+            if params:
+                conn.execute(update_stmt, params)
+            linked += len(params)
+            unmatched += len(rows) - len(params)
+    return linked, unmatched
+
+# --- MIGRASI: ticket_events.origin ---
+# Event lama tanpa origin dianggap dari sesi lain (muncul di feed & badge)
+def migrate_ticket_event_origin(db_engine):
+    columns = {c["name"] for c in inspect(db_engine).get_columns("ticket_events")}
+    if "origin" in columns:
+        return
+    with db_engine.begin() as conn:
+        conn.execute(text("ALTER TABLE ticket_events ADD COLUMN origin VARCHAR(32)"))
+
+# --- AGREGASI DASHBOARD ---
+# Satu GROUP BY kecil (status x kategori x departemen), sisanya dijumlah di Python.
+# Jumlah baris hasil tetap kecil berapapun banyaknya tiket.
+def get_ticket_stats(s):
+    rows = (
+        s.query(Ticket.status, Ticket.category, Ticket.department, func.count(Ticket.id))
+        .group_by(Ticket.status, Ticket.category, Ticket.department)
+        .all()
+    )
+    stats = {"total": 0, "by_status": {}, "by_category": {}, "by_department": {}}
+    for status, category, department, count in rows:
+        stats["total"] += count
+        stats["by_status"][status] = stats["by_status"].get(status, 0) + count
+        stats["by_category"][category] = stats["by_category"].get(category, 0) + count
+        stats["by_department"][department] = stats["by_department"].get(department, 0) + count
+    return stats
+
+# --- FULL-TEXT SEARCH TIKET ---
+# Postgres: GIN index atas tsvector (config 'simple' -> tanpa stemming/stopword
+# bahasa Inggris, jadi aman untuk teks Bahasa Indonesia).
+# SQLite lokal: tabel virtual FTS5 yang disinkron lewat trigger.
+# Dialect lain / SQLite tanpa FTS5: fallback ke LIKE.
+FTS_CONFIG = "simple"
+FTS_DOCUMENT = (
+    f"to_tsvector('{FTS_CONFIG}', coalesce(subject, '') || ' ' || coalesce(description, '') "
+    "|| ' ' || coalesce(requester_name, ''))"
+)
+FTS_TABLES = {"tickets": "tickets_fts", "tickets_archive": "tickets_archive_fts"}
+
+def sqlite_fts_ddl(source, fts):
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            subject, description, requester_name,
+            content='{source}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN
+            INSERT INTO {fts}(rowid, subject, description, requester_name)
+            VALUES (new.id, new.subject, new.description, new.requester_name);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN
+            INSERT INTO {fts}({fts}, rowid, subject, description, requester_name)
+            VALUES ('delete', old.id, old.subject, old.description, old.requester_name);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF subject, description, requester_name ON {source} BEGIN
+            INSERT INTO {fts}({fts}, rowid, subject, description, requester_name)
+            VALUES ('delete', old.id, old.subject, old.description, old.requester_name);
+            INSERT INTO {fts}(rowid, subject, description, requester_name)
+            VALUES (new.id, new.subject, new.description, new.requester_name);
+        END""",
+    ]
+
+tickets_fts = table("tickets_fts", column("rowid"))
+tickets_archive_fts = table("tickets_archive_fts", column("rowid"))
+
+def create_search_index(db_engine):
+    if db_engine.dialect.name == "postgresql":
+        with db_engine.begin() as conn:
+            for source, fts in FTS_TABLES.items():
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{fts} ON {source} USING GIN ({FTS_DOCUMENT})"))
+    elif db_engine.dialect.name == "sqlite":
+        try:
+            with db_engine.begin() as conn:
+                for source, fts in FTS_TABLES.items():
+                    is_new = not inspect(conn).has_table(fts)
+                    for ddl in sqlite_fts_ddl(source, fts):
+                        conn.execute(text(ddl))
+                    if is_new:
+                        # Index baris yang sudah ada sebelum tabel FTS dibuat
+                        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        except Exception as e:
+            print(f"⚠️ FTS5 tidak tersedia, pencarian pakai LIKE: {e}")
+    db_engine.search_backend = None
+
+def get_search_backend(db_engine):
+    backend = getattr(db_engine, "search_backend", None)
+    if backend is None:
+        if db_engine.dialect.name == "postgresql":
+            backend = "tsvector"
+        elif db_engine.dialect.name == "sqlite" and inspect(db_engine).has_table("tickets_fts"):
+            backend = "fts5"
+        else:
+            backend = "like"
+        db_engine.search_backend = backend
+    return backend
+
+def search_terms(query):
+    # Ambil kata saja (huruf/angka), buang operator & tanda kutip dari input user
+    return re.findall(r"\w+", query or "", re.UNICODE)
+
+def search_tickets(s, query, statuses=None, limit=50, columns=None, archive=False):
+    # Hasil diurutkan berdasarkan relevansi; setiap kata dicocokkan sebagai prefix
+    # supaya "print" juga menemukan "printer". archive=True -> cari di tickets_archive.
+    model, fts = (ArchivedTicket, tickets_archive_fts) if archive else (Ticket, tickets_fts)
+    columns = columns or (ARCHIVED_TICKET_LIST_COLUMNS if archive else TICKET_LIST_COLUMNS)
+    terms = search_terms(query)
+    if not terms:
+        return []
+    backend = get_search_backend(s.get_bind())
+    q = s.query(*columns)
+    if statuses: q = q.filter(model.status.in_(statuses))
+    if backend == "tsvector":
+        tsquery = func.to_tsquery(FTS_CONFIG, " & ".join(f"{t}:*" for t in terms))
+        document = literal_column(FTS_DOCUMENT)
+        q = q.filter(document.op("@@")(tsquery)).order_by(func.ts_rank(document, tsquery).desc(), model.id.desc())
+    elif backend == "fts5":
+        match = " ".join(f'"{t}"*' for t in terms)
+        q = (
+            q.join(fts, fts.c.rowid == model.id)
+            .filter(text(f"{fts.name} MATCH :match")).params(match=match)
+            .order_by(text(f"bm25({fts.name})"), model.id.desc())
+        )
+    else:
+        for t in terms:
+            q = q.filter(model.subject.contains(t) | model.requester_name.contains(t) | model.description.contains(t))
+        q = q.order_by(model.created_at.desc(), model.id.desc())
+    return q.limit(limit).all()
+
+# --- DAFTAR TIKET (KEYSET PAGINATION) ---
+# Hanya kolom yang tampil di tabel (tanpa description). Cursor = (created_at, id)
+# baris terakhir halaman sebelumnya, jadi halaman ke-N sama murahnya dengan halaman 1.
+TICKET_LIST_COLUMNS = (
+    Ticket.id, Ticket.created_at, Ticket.requester_name, Ticket.subject,
+    Ticket.related_asset, Ticket.priority, Ticket.status,
+)
+ARCHIVED_TICKET_LIST_COLUMNS = tuple(getattr(ArchivedTicket, c.key) for c in TICKET_LIST_COLUMNS)
+
+def list_tickets_page(s, statuses=None, search=None, page_size=50, cursor=None):
+    if search:
+        # Hasil pencarian diurutkan per relevansi, cukup satu halaman hasil teratas
+        return search_tickets(s, search, statuses, limit=page_size), None
+    query = s.query(*TICKET_LIST_COLUMNS)
+    if statuses: query = query.filter(Ticket.status.in_(statuses))
+    if cursor:
+        cursor_created_at, cursor_id = cursor
+        query = query.filter(or_(
+            Ticket.created_at < cursor_created_at,
+            and_(Ticket.created_at == cursor_created_at, Ticket.id < cursor_id),
+        ))
+    rows = query.order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(page_size + 1).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+# --- TINDAKAN MASSAL TIKET ---
+# Tiket yang dipilih di tabel admin diubah dengan UPDATE ... IN (...) dan balasan
+# ditambah dengan satu INSERT executemany. Commit di caller, jadi semua perubahan
+# satu aksi masuk dalam satu transaksi.
+def bulk_update_tickets(s, ticket_ids, status=None, priority=None):
+    # Return (id yang statusnya berubah, id yang prioritasnya berubah). Tiket yang
+    # sudah bernilai sama dilewati, jadi event & notifikasi hanya untuk perubahan nyata.
+    changed = []
+    for field, value in ((Ticket.status, status), (Ticket.priority, priority)):
+        if not value or not ticket_ids:
+            changed.append(set())
+            continue
+        changed.append(set(s.execute(
+            update(Ticket).where(Ticket.id.in_(ticket_ids), field != value)
+            .values({field.key: value}).returning(Ticket.id),
+            execution_options={"synchronize_session": False},
+        ).scalars()))
+    return tuple(changed)
+
+def add_ticket_comments(s, ticket_ids, sender, content, created_at):
+    # Return list (id, ticket_id, created_at) komentar baru. Tanpa sort_by_parameter_order:
+    # urutan tidak dibutuhkan (ticket_id ikut dikembalikan) dan SQLite bisa tetap satu INSERT batch.
+    if not ticket_ids:
+        return []
+    return s.execute(
+        insert(Comment).returning(Comment.id, Comment.ticket_id, Comment.created_at),
+        [{"ticket_id": tid, "sender": sender, "content": content, "created_at": created_at} for tid in ticket_ids],
+    ).all()
+
+# --- FEED AKTIVITAS ---
+# Event ditulis di transaksi yang sama dengan perubahan tiketnya (commit di caller).
+# Pembaca cukup menyimpan id event terakhir: satu range scan PK per tick,
+# berlaku juga untuk perubahan dari proses / server lain.
+EVENT_LIST_COLUMNS = (TicketEvent.id, TicketEvent.kind, TicketEvent.ticket_id, TicketEvent.actor, TicketEvent.detail, TicketEvent.created_at, TicketEvent.origin)
+EVENT_DETAIL_LEN = 200
+
+def add_ticket_events(s, kind, rows, actor=None, created_at=None, origin=None):
+    # rows: list (ticket_id, detail); satu INSERT executemany
+    if not rows:
+        return
+    created_at = created_at or get_wib_time()
+    s.execute(insert(TicketEvent), [
+        {"kind": kind, "ticket_id": ticket_id, "actor": actor,
+         "detail": detail[:EVENT_DETAIL_LEN] if detail else detail, "created_at": created_at, "origin": origin}
+        for ticket_id, detail in rows
+    ])
+
+def list_events_since(s, after_id=0, limit=100):
+    return s.query(*EVENT_LIST_COLUMNS).filter(TicketEvent.id > after_id).order_by(TicketEvent.id).limit(limit).all()
+
+def list_recent_events(s, limit=20):
+    # Urut lama -> baru, sama seperti list_events_since
+    return s.query(*EVENT_LIST_COLUMNS).order_by(TicketEvent.id.desc()).limit(limit).all()[::-1]
+
+def prune_ticket_events(db_engine, before):
+    # Return jumlah event yang dihapus (lebih tua dari `before`)
+    with db_engine.begin() as conn:
+        return conn.execute(TicketEvent.__table__.delete().where(TicketEvent.__table__.c.created_at < before)).rowcount
+
+# --- ASET ---
+ASSET_LIST_COLUMNS = (Asset.id, Asset.name, Asset.serial_number, Asset.category, Asset.assigned_to, Asset.status)
+
+def _starts_with(col, prefix, dialect):
+    if dialect == "sqlite":
+        # LIKE di SQLite case-insensitive & tidak memakai index; pakai rentang
+        # supaya tetap index range scan
+        return and_(col >= prefix, col < prefix + "\U0010ffff")
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return col.like(escaped + "%", escape="\\")
+
+def asset_prefix_filter(s, query_text):
+    # Prefix nama (case-insensitive) atau serial number
+    prefix = (query_text or "").strip()
+    dialect = s.get_bind().dialect.name
+    return or_(
+        _starts_with(func.lower(Asset.name), prefix.lower(), dialect),
+        _starts_with(Asset.serial_number, prefix, dialect),
+        _starts_with(Asset.serial_number, prefix.upper(), dialect),
+    )
+
+def list_assets_page(s, search=None, page_size=50, after_id=None):
+    # Keyset pagination berdasarkan id (urut menaik)
+    query = s.query(*ASSET_LIST_COLUMNS)
+    if search: query = query.filter(asset_prefix_filter(s, search))
+    if after_id: query = query.filter(Asset.id > after_id)
+    rows = query.order_by(Asset.id).limit(page_size + 1).all()
+    next_after = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_after = rows[-1].id
+    return rows, next_after
+
+def load_asset_options(s):
+    # Kolom minimal untuk katalog picker aset
+    return s.query(Asset.id, Asset.name, Asset.serial_number).order_by(Asset.name).all()
+
+def asset_label(name, serial_number):
+    return f"{name} ({serial_number})"
+
+def build_asset_catalogue(rows):
+    # List terurut (lowercase) nama & SN -> pencarian prefix pakai bisect
+    labels = [asset_label(r.name, r.serial_number) for r in rows]
+    by_name = sorted((r.name.lower(), i) for i, r in enumerate(rows))
+    by_sn = sorted(((r.serial_number or "").lower(), i) for i, r in enumerate(rows))
+    return {
+        "ids": [r.id for r in rows], "labels": labels,
+        "name_keys": [k for k, _ in by_name], "name_pos": [i for _, i in by_name],
+        "sn_keys": [k for k, _ in by_sn], "sn_pos": [i for _, i in by_sn],
+    }
+
+def search_asset_catalogue(catalogue, query, limit=50):
+    # Prefix nama / serial number (case-insensitive); query kosong -> urut nama.
+    # Return list (asset_id, label).
+    prefix = (query or "").strip().lower()
+    found = []
+    seen = set()
+    for keys, pos in ((catalogue["name_keys"], catalogue["name_pos"]), (catalogue["sn_keys"], catalogue["sn_pos"])):
+        j = bisect_left(keys, prefix)
+        while j < len(keys) and len(found) < limit and keys[j].startswith(prefix):
+            if pos[j] not in seen:
+                seen.add(pos[j])
+                found.append(pos[j])
+            j += 1
+    return [(catalogue["ids"][i], catalogue["labels"][i]) for i in found]
+
+# --- KESEHATAN ASET ---
+# Tiket dihitung per asset_id dulu (cukup baca index asset_id/created_at/status),
+# baru di-join ke assets. Rekap per kategori & pemegang dari satu GROUP BY kecil.
+def _asset_ticket_counts(since=None):
+    query = (
+        select(
+            Ticket.asset_id.label("asset_id"),
+            func.count(Ticket.id).label("tickets"),
+            func.sum(case((Ticket.status != 'Resolved', 1), else_=0)).label("open_tickets"),
+        )
+        .where(Ticket.asset_id.isnot(None))
+    )
+    if since:
+        query = query.where(Ticket.created_at >= since)
+    return query.group_by(Ticket.asset_id).subquery()
+
+def get_asset_health(s, since=None, limit=20):
+    counts = _asset_ticket_counts(since)
+    top = s.execute(
+        select(Asset.id, Asset.name, Asset.serial_number, Asset.category, Asset.assigned_to,
+               counts.c.tickets, counts.c.open_tickets)
+        .join(counts, counts.c.asset_id == Asset.id)
+        .order_by(counts.c.tickets.desc(), Asset.id)
+        .limit(limit)
+    ).all()
+    groups = s.execute(
+        select(Asset.category, Asset.assigned_to, func.count(Asset.id),
+               func.sum(counts.c.tickets), func.sum(counts.c.open_tickets))
+        .join(counts, counts.c.asset_id == Asset.id)
+        .group_by(Asset.category, Asset.assigned_to)
+    ).all()
+    by_category, by_assignee = {}, {}
+    for category, assignee, n_assets, tickets, open_tickets in groups:
+        for bucket, key in ((by_category, category), (by_assignee, assignee or "-")):
+            entry = bucket.setdefault(key, {"assets": 0, "tickets": 0, "open": 0})
+            entry["assets"] += n_assets
+            entry["tickets"] += int(tickets or 0)
+            entry["open"] += int(open_tickets or 0)
+    return {"assets": top, "by_category": by_category, "by_assignee": by_assignee}
+
+def list_asset_tickets(s, asset_id, limit=20):
+    # Riwayat tiket satu aset, terbaru dulu (pakai index asset_id/created_at)
+    return (
+        s.query(Ticket.id, Ticket.created_at, Ticket.subject, Ticket.status, Ticket.priority)
+        .filter(Ticket.asset_id == asset_id)
+        .order_by(Ticket.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+# --- CONNECTION POOL ---
+# Default untuk Supabase/Postgres remote: koneksi sedikit tapi dipakai ulang,
+# pre_ping untuk koneksi yang diputus pooler, recycle sebelum idle-timeout server.
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+POOL_TIMEOUT = 30
+POOL_RECYCLE = 300
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self, pool=None):
+        with self._lock:
+            data = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.total_wait * 1000, 2),
+                "wait_max_ms": round(self.max_wait * 1000, 2),
+                "wait_avg_ms": round(self.total_wait * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            })
+        return data
+
+class TimedQueuePool(QueuePool):
+    # QueuePool biasa + catat berapa lama request menunggu koneksi kosong
+    stats = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            if self.stats:
+                self.stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.stats:
+            self.stats.record_wait(time.perf_counter() - start)
+        return conn
+
+def build_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT, pool_recycle=POOL_RECYCLE, **kwargs):
+    stats = PoolStats()
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") == "sqlite:"):
+        # SQLite in-memory tidak bisa di-pool, pakai default SQLAlchemy
+        db_engine = create_engine(url, **kwargs)
+    else:
+        pool_class = type("TimedQueuePool", (TimedQueuePool,), {"stats": stats})
+        db_engine = create_engine(
+            url,
+            poolclass=pool_class,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=True,
+            **kwargs,
+        )
+
+    @event.listens_for(db_engine, "checkout")
+    def on_checkout(*args):
+        stats.incr("checkouts")
+
+    @event.listens_for(db_engine, "checkin")
+    def on_checkin(*args):
+        stats.incr("checkins")
+
+    @event.listens_for(db_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.incr("connects")
+        if db_engine.dialect.name == "sqlite" and db_engine.url.database not in (None, "", ":memory:"):
+            # WAL: pembaca panjang (build index tiket serupa, export) tidak memblokir
+            # commit tulis; tanpa ini komentar baru bisa gagal "database is locked"
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.close()
+
+    db_engine.pool_stats = stats
+    return db_engine
+
+def get_pool_stats(db_engine):
+    return db_engine.pool_stats.snapshot(db_engine.pool)
+
+def make_session_factory(db_engine):
+    return sessionmaker(bind=db_engine)
+
+@contextmanager
+def session_scope(session_factory):
+    # Session berumur pendek: satu script run / satu tick fragment, lalu koneksi kembali ke pool
+    s = session_factory()
+    try:
+        yield s
+    except Exception:
+        s.rollback()
+        raise
+    finally:
+        s.close()
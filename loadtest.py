@@ -0,0 +1,335 @@
+# --- LOAD TEST ---
+# Menjalankan halaman asli app.py lewat Streamlit AppTest terhadap DB berisi
+# volume realistis (default 100k tiket, 1M komentar, 20k aset). Gemini diganti
+# FakeModelClient dan Telegram diarahkan ke stub HTTP lokal, jadi tidak ada
+# panggilan keluar. Per skenario dilaporkan p50/p95 latency, statement SQL per
+# run dan puncak memori (tracemalloc, diukur di run terpisah).
+# Contoh: python loadtest.py
+#         python loadtest.py --db-url sqlite:////tmp/itsd_load.db --runs 30
+#         python loadtest.py --scenarios ticket_detail,chat_reply --json hasil.json
+#         python loadtest.py --db-url sqlite:////tmp/itsd_load.db --baseline hasil.json
+#         python loadtest.py --db-url postgresql://... --tickets 100000 --comments 1000000
+# Dengan --db-url, data hanya di-seed kalau tabel tiket masih kosong (DB bisa dipakai ulang).
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+
+from bench import report, seed, temp_sqlite_url
+from db import Ticket, build_engine, make_session_factory, migrate, session_scope
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+SEARCH_WORDS = ["printer", "wifi", "laptop", "password", "erp", "monitor", "vpn", "folder"]
+REGRESSION_TOLERANCE = 0.25
+
+# --- STUB TELEGRAM ---
+class TelegramStub:
+    # Menjawab sendMessage seperti API Telegram, dengan latency buatan
+    def __init__(self, latency=0.05):
+        stub = self
+        self.latency = latency
+        self.messages = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(stub.latency)
+                stub.messages += 1
+                body = b'{"ok": true, "result": {}}'
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name="telegram-stub", daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+# --- PENGHITUNG SQL ---
+# Listener di kelas Engine: ikut menghitung engine milik app (dibuat di dalam AppTest)
+# termasuk statement dari thread background (notifier, AI worker).
+class SqlCounter:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        with self._lock:
+            self.count += 1
+
+    def take(self):
+        with self._lock:
+            count, self.count = self.count, 0
+        return count
+
+# --- APPTEST ---
+def new_app(secrets):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=300)
+    for key, value in secrets.items():
+        at.secrets[key] = value
+    return at.run()
+
+def check(at):
+    if at.exception:
+        raise RuntimeError(f"Exception di app: {at.exception[0].value}")
+    return at
+
+def widget(elements, label):
+    return next(w for w in elements if w.label == label)
+
+def login_admin(at):
+    at.text_input[0].input("admin")
+    at.text_input[1].input("admin123")
+    return check(at.button[0].click().run())
+
+def login_guest(at):
+    return check(widget(at.button, "Masuk sebagai Guest / User Biasa").click().run())
+
+def open_menu(at, menu):
+    return check(at.sidebar.radio[0].set_value(menu).run())
+
+def open_ticket_admin(at, ticket_id):
+    return check(widget(at.number_input, "Atau ketik ID Tiket").set_value(ticket_id).run())
+
+def open_ticket_guest(at, ticket_id):
+    widget(at.number_input, "ID Tiket").set_value(ticket_id)
+    return check(widget(at.button, "Cari").click().run())
+
+def send_chat(at, text):
+    widget(at.text_input, "Ketik pesan balasan...").input(text)
+    return check(widget(at.button, "Kirim 📤").click().run())
+
+# --- SKENARIO ---
+# setup(ctx) menyiapkan halaman sekali, step(ctx) adalah satu interaksi yang diukur.
+# Satu sesi admin & satu sesi guest dipakai bergantian oleh semua skenario
+# (login berulang akan kena throttle login, lihat auth.py).
+class Context:
+    def __init__(self, secrets, db_url, max_ticket_id, rnd):
+        self.secrets = secrets
+        self.db_url = db_url
+        self.max_ticket_id = max_ticket_id
+        self.rnd = rnd
+        self.sessions = {}
+        self.at = None
+        self.session_factory = None
+
+    def random_ticket(self):
+        return self.rnd.randint(1, self.max_ticket_id)
+
+    def session(self, role):
+        if role not in self.sessions:
+            login = login_admin if role == "admin" else login_guest
+            self.sessions[role] = login(new_app(self.secrets))
+        return self.sessions[role]
+
+def admin_page(menu):
+    def setup(ctx):
+        ctx.at = open_menu(ctx.session("admin"), menu)
+    return setup
+
+def setup_ticket_admin(ctx):
+    admin_page("📋 Manajemen Tiket")(ctx)
+    open_ticket_admin(ctx.at, ctx.random_ticket())
+
+def setup_guest_lookup(ctx):
+    ctx.at = open_menu(ctx.session("guest"), "🔍 Cek Tiket")
+
+def setup_guest_ticket(ctx):
+    setup_guest_lookup(ctx)
+    open_ticket_guest(ctx.at, ctx.random_ticket())
+
+def rerun(ctx):
+    check(ctx.at.run())
+
+def step_ticket_detail(ctx):
+    open_ticket_admin(ctx.at, ctx.random_ticket())
+
+def step_ticket_search(ctx):
+    check(widget(ctx.at.text_input, "Cari (Pelapor/Subject/Deskripsi)").input(ctx.rnd.choice(SEARCH_WORDS)).run())
+
+def step_admin_reply(ctx):
+    send_chat(ctx.at, f"Sedang kami cek ({ctx.rnd.randint(1, 10**6)})")
+
+def step_guest_lookup(ctx):
+    open_ticket_guest(ctx.at, ctx.random_ticket())
+
+def step_guest_reply(ctx):
+    # Balasan user juga mengirim notifikasi Telegram (ke stub)
+    send_chat(ctx.at, f"Masih error pak ({ctx.rnd.randint(1, 10**6)})")
+
+def step_ai_suggestion(ctx):
+    # Tiket acak supaya tidak kena cache saran AI
+    at = open_ticket_admin(ctx.at, ctx.random_ticket())
+    check(widget(at.button, "🔍 Analisa Solusi via AI").click().run())
+
+def setup_export(ctx):
+    ctx.session_factory = make_session_factory(build_engine(ctx.db_url))
+
+def step_export_xlsx(ctx):
+    # Sama dengan build_report() di app.py (tombol download tidak bisa diklik lewat AppTest)
+    from reports import export_resolved
+
+    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as out:
+        with session_scope(ctx.session_factory) as s:
+            export_resolved(s, "Excel (.xlsx)", out)
+
+SCENARIOS = {
+    "admin_dashboard": (admin_page("📊 Dashboard"), rerun),
+    "admin_tickets": (admin_page("📋 Manajemen Tiket"), rerun),
+    "ticket_search": (admin_page("📋 Manajemen Tiket"), step_ticket_search),
+    "ticket_detail": (admin_page("📋 Manajemen Tiket"), step_ticket_detail),
+    "chat_stream": (setup_ticket_admin, rerun),
+    "admin_reply": (setup_ticket_admin, step_admin_reply),
+    "ai_suggestion": (admin_page("📋 Manajemen Tiket"), step_ai_suggestion),
+    "admin_assets": (admin_page("📦 Manajemen Aset"), rerun),
+    "guest_lookup": (setup_guest_lookup, step_guest_lookup),
+    "guest_reply": (setup_guest_ticket, step_guest_reply),
+    "export_xlsx": (setup_export, step_export_xlsx),
+}
+SLOW_SCENARIOS = {"export_xlsx": 3}  # jumlah run maksimum untuk skenario yang berat
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct), len(values) - 1)]
+
+def run_scenario(name, ctx, runs, sql, warmup=1):
+    setup, step = SCENARIOS[name]
+    setup(ctx)
+    for _ in range(warmup):
+        step(ctx)
+    runs = min(runs, SLOW_SCENARIOS.get(name, runs))
+    durations = []
+    sql.take()
+    for _ in range(runs):
+        start = time.perf_counter()
+        step(ctx)
+        durations.append((time.perf_counter() - start) * 1000)
+    statements = sql.take()
+
+    # Memori diukur di run terpisah: tracemalloc memperlambat eksekusi
+    tracemalloc.start()
+    try:
+        step(ctx)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "runs": runs,
+        "p50_ms": round(percentile(durations, 0.5), 1),
+        "p95_ms": round(percentile(durations, 0.95), 1),
+        "sql_per_run": round(statements / runs, 1),
+        "peak_mb": round(peak / 1024 / 1024, 1),
+    }
+
+def compare(results, baseline, tolerance):
+    # Return daftar regresi: p95 atau statement SQL per run naik melebihi toleransi
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ("p95_ms", "sql_per_run", "peak_mb"):
+            if result[key] > base[key] * (1 + tolerance) and result[key] - base[key] > 1:
+                regressions.append(f"{name}: {key} {base[key]} -> {result[key]}")
+    return regressions
+
+# --- DATA ---
+def prepare_db(args):
+    db_url = args.db_url or temp_sqlite_url()
+    db_engine = build_engine(db_url)
+    migrate(db_engine)
+    with db_engine.connect() as conn:
+        existing = conn.execute(func.count(Ticket.id).select()).scalar()
+    if existing:
+        print(f"DB sudah berisi {existing} tiket, seed dilewati.")
+    else:
+        start = time.perf_counter()
+        seed(db_engine, tickets=args.tickets, comments=args.comments, assets=args.assets)
+        print(f"Seed {args.tickets} tiket, {args.comments} komentar, {args.assets} aset: {time.perf_counter() - start:.0f}s")
+    with db_engine.connect() as conn:
+        max_ticket_id = conn.execute(func.max(Ticket.id).select()).scalar()
+    db_engine.dispose()
+    return db_url, max_ticket_id
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test IT Service Desk (AppTest)")
+    parser.add_argument("--db-url", default=os.environ.get("BENCH_DB_URL"), help="Default: SQLite sementara")
+    parser.add_argument("--tickets", type=int, default=100_000)
+    parser.add_argument("--comments", type=int, default=1_000_000)
+    parser.add_argument("--assets", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Dipisah koma")
+    parser.add_argument("--ai-delay", type=float, default=0.2, help="Latency FakeModelClient (detik)")
+    parser.add_argument("--telegram-latency", type=float, default=0.05)
+    parser.add_argument("--json", help="Simpan hasil ke file JSON (untuk --baseline berikutnya)")
+    parser.add_argument("--baseline", help="Bandingkan dengan hasil JSON sebelumnya, exit 1 kalau regresi")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    logging.getLogger("streamlit.deprecation_util").disabled = True  # warning deprecation muncul di setiap run
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"Skenario tidak dikenal: {', '.join(unknown)} (pilihan: {', '.join(SCENARIOS)})")
+
+    db_url, max_ticket_id = prepare_db(args)
+    telegram = TelegramStub(args.telegram_latency)
+    secrets = {
+        "DB_URL": db_url,
+        "AI_FAKE_MODEL": True,
+        "AI_FAKE_DELAY": args.ai_delay,
+        "AI_REQUESTS_PER_MINUTE": 100_000,
+        "TELEGRAM_BOT_TOKEN": "loadtest",
+        "TELEGRAM_CHAT_ID": "0",
+        "TELEGRAM_API_BASE": telegram.url,
+        "UPLOAD_DIR": tempfile.mkdtemp(prefix="itsd_load_uploads_"),
+    }
+    sql = SqlCounter()
+
+    ctx = Context(secrets, db_url, max_ticket_id, random.Random(args.seed))
+    results = {}
+    for name in names:
+        results[name] = run_scenario(name, ctx, args.runs, sql)
+        r = results[name]
+        print(f"{name}: p50 {r['p50_ms']} ms, p95 {r['p95_ms']} ms, {r['sql_per_run']} SQL/run, puncak {r['peak_mb']} MB")
+
+    report(f"load test ({build_engine(db_url).dialect.name}, {max_ticket_id} tiket)", {
+        name: f"p50 {r['p50_ms']:>7} ms | p95 {r['p95_ms']:>7} ms | {r['sql_per_run']:>5} SQL/run | puncak {r['peak_mb']:>6} MB"
+        for name, r in results.items()
+    })
+    print(f"\nPesan Telegram diterima stub: {telegram.messages}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"db": build_engine(db_url).dialect.name, "tickets": max_ticket_id, "scenarios": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["scenarios"], args.tolerance)
+        if regressions:
+            print("\n❌ REGRESI:\n" + "\n".join(f"- {r}" for r in regressions))
+            sys.exit(1)
+        print(f"\n✅ Tidak ada regresi (toleransi {args.tolerance:.0%}).")
+
+if __name__ == "__main__":
+    main()
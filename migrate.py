@@ -0,0 +1,47 @@
+# --- MIGRASI SKEMA ---
+# Buat / update tabel, index & full-text search. Jalankan sekali setiap deploy
+# (bukan di tiap rerun Streamlit):
+#     python migrate.py
+#     python migrate.py --db-url postgresql://...
+# Tanpa --db-url: env DB_URL, lalu DB_URL di .streamlit/secrets.toml
+import argparse
+import os
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python 3.10
+    import tomli as tomllib
+
+from auth import ensure_default_admin
+from db import build_engine, make_session_factory, migrate
+
+SECRETS_FILE = os.path.join(".streamlit", "secrets.toml")
+
+def load_db_url(cli_value=None):
+    if cli_value:
+        return cli_value
+    if os.environ.get("DB_URL"):
+        return os.environ["DB_URL"]
+    if os.path.exists(SECRETS_FILE):
+        with open(SECRETS_FILE, "rb") as f:
+            return tomllib.load(f).get("DB_URL")
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrasi skema database IT Service Desk")
+    parser.add_argument("--db-url", help="Default: env DB_URL / .streamlit/secrets.toml")
+    args = parser.parse_args()
+
+    db_url = load_db_url(args.db_url)
+    if not db_url:
+        parser.error(f"DB_URL tidak ditemukan (isi --db-url, env DB_URL, atau {SECRETS_FILE})")
+    db_engine = build_engine(db_url)
+    before, after = migrate(db_engine)
+    ensure_default_admin(make_session_factory(db_engine))
+    if before == after:
+        print(f"✅ Skema sudah versi terbaru ({after}).")
+    else:
+        print(f"✅ Skema dimigrasi dari versi {before} ke {after}.")
+    db_engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# --- NOTIFIKASI TELEGRAM (BACKGROUND) ---
+# Pesan dimasukkan ke antrian lalu dikirim oleh worker thread, jadi submit tiket
+# tidak lagi menunggu API Telegram. Kalau session_factory diberikan, setiap pesan
+# juga dicatat di tabel notification_outbox supaya yang belum terkirim dikirim
+# ulang setelah server restart.
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from db import OutboxMessage, session_scope, get_wib_time
+from perf import timer
+
+TELEGRAM_API = "https://api.telegram.org"
+
+class TelegramNotifier:
+    def __init__(self, token, chat_id, session_factory=None, api_base=TELEGRAM_API,
+                 max_queue=1000, max_attempts=5, min_interval=1.0, timeout=10, backoff_base=2.0):
+        self.url = f"{api_base}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        # Telegram membatasi ~1 pesan/detik per chat
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+
+        self.http = requests.Session()
+        self.http.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._retry = []  # heap (waktu_kirim_ulang, urutan, item)
+        self._seq = itertools.count()
+        self._overflow = False
+        self._last_sent = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.counters = {"queued": 0, "sent": 0, "retried": 0, "failed": 0, "dropped": 0}
+
+    # --- API PUBLIK ---
+    def start(self):
+        if self._thread is None:
+            self._recover_outbox()
+            self._thread = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def send(self, text):
+        item = {"id": self._persist(text), "text": text, "attempts": 0}
+        self._count("queued")
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Antrian penuh: pesan tetap aman di outbox, worker ambil lagi nanti
+            self._overflow = True
+            if item["id"] is None:
+                self._count("dropped")
+        return item["id"]
+
+    def pending(self):
+        return self._queue.qsize() + len(self._retry)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+        data["pending"] = self.pending()
+        return data
+
+    # --- WORKER ---
+    def _run(self):
+        while not self._stop.is_set():
+            item = self._next_item()
+            if item is None:
+                continue
+            self._deliver(item)
+
+    def _next_item(self):
+        now = time.monotonic()
+        if self._retry and self._retry[0][0] <= now:
+            return heapq.heappop(self._retry)[2]
+        wait = min(self._retry[0][0] - now, 1.0) if self._retry else 1.0
+        try:
+            return self._queue.get(timeout=max(wait, 0.01))
+        except queue.Empty:
+            if self._overflow:
+                self._overflow = False
+                self._recover_outbox()
+            return None
+
+    def _deliver(self, item):
+        delay = self._last_sent + self.min_interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        item["attempts"] += 1
+        try:
+            with timer("telegram"):
+                resp = self.http.post(
+                    self.url,
+                    data={"chat_id": self.chat_id, "text": item["text"], "parse_mode": "Markdown"},
+                    timeout=self.timeout,
+                )
+            self._last_sent = time.monotonic()
+        except requests.RequestException as e:
+            self._last_sent = time.monotonic()
+            return self._schedule_retry(item, str(e))
+
+        if resp.status_code == 200:
+            self._count("sent")
+            return self._mark(item, "sent")
+        if resp.status_code == 429:
+            # Rate limit: ikuti retry_after dari Telegram, tidak dihitung sebagai gagal
+            item["attempts"] -= 1
+            retry_after = self._retry_after(resp)
+            return self._schedule_retry(item, "429 Too Many Requests", retry_after)
+        if resp.status_code >= 500:
+            return self._schedule_retry(item, f"HTTP {resp.status_code}")
+        # 4xx lain (token salah, Markdown rusak, dll) tidak akan berhasil kalau diulang
+        print(f"⚠️ Gagal kirim Telegram: HTTP {resp.status_code} {resp.text[:200]}")
+        self._count("failed")
+        self._mark(item, "failed", f"HTTP {resp.status_code}: {resp.text[:500]}")
+
+    def _schedule_retry(self, item, error, delay=None):
+        if item["attempts"] >= self.max_attempts:
+            print(f"⚠️ Gagal kirim Telegram setelah {item['attempts']}x: {error}")
+            self._count("failed")
+            return self._mark(item, "failed", error)
+        if delay is None:
+            delay = self.backoff_base ** item["attempts"]
+        self._count("retried")
+        self._mark(item, "pending", error)
+        heapq.heappush(self._retry, (time.monotonic() + delay, next(self._seq), item))
+
+    @staticmethod
+    def _retry_after(resp):
+        try:
+            return float(resp.json().get("parameters", {}).get("retry_after", 1))
+        except ValueError:
+            return 1.0
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    # --- OUTBOX ---
+    def _persist(self, text):
+        if not self.session_factory:
+            return None
+        try:
+            with session_scope(self.session_factory) as s:
+                row = OutboxMessage(channel="telegram", payload=text, created_at=get_wib_time())
+                s.add(row)
+                s.commit()
+                return row.id
+        except Exception as e:
+            print(f"⚠️ Gagal simpan outbox: {e}")
+            return None
+
+    def _mark(self, item, status, error=None):
+        if not self.session_factory or item["id"] is None:
+            return
+        try:
+            with session_scope(self.session_factory) as s:
+                values = {"status": status, "attempts": item["attempts"], "last_error": error}
+                if status == "sent":
+                    values["sent_at"] = get_wib_time()
+                s.query(OutboxMessage).filter(OutboxMessage.id == item["id"]).update(values)
+                s.commit()
+        except Exception as e:
+            print(f"⚠️ Gagal update outbox: {e}")
+
+    def _recover_outbox(self):
+        # Masukkan kembali pesan 'pending' dari DB (sisa sebelum restart / saat antrian penuh)
+        if not self.session_factory:
+            return
+        try:
+            with session_scope(self.session_factory) as s:
+                rows = (
+                    s.query(OutboxMessage.id, OutboxMessage.payload, OutboxMessage.attempts)
+                    .filter(OutboxMessage.channel == "telegram", OutboxMessage.status == "pending")
+                    .order_by(OutboxMessage.id)
+                    .all()
+                )
+        except Exception as e:
+            print(f"⚠️ Gagal baca outbox: {e}")
+            return
+        queued = {item["id"] for item in list(self._queue.queue)} | {entry[2]["id"] for entry in self._retry}
+        for row in rows:
+            if row.id in queued:
+                continue
+            try:
+                self._queue.put_nowait({"id": row.id, "text": row.payload, "attempts": row.attempts})
+            except queue.Full:
+                self._overflow = True
+                break
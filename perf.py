@@ -0,0 +1,273 @@
+# --- INSTRUMENTASI PERFORMA ---
+# Satu registry per proses. Setiap script run / tick fragment membuka "run"
+# (disimpan di contextvar thread script), lalu hook SQLAlchemy & timer panggilan
+# eksternal (Gemini, Telegram) menambah angka ke run yang aktif. Kerja di thread
+# background (notifier, AI worker) masuk ke halaman "background".
+# Hasil: ringkasan p50/p95 per halaman, teks Prometheus (/metrics lokal) dan
+# log JSON per run (logger "itsd.perf").
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import event
+
+BACKGROUND = "background"
+SAMPLES_PER_PAGE = 200
+PROFILE_TOP = 25
+
+logger = logging.getLogger("itsd.perf")
+_current_run = contextvars.ContextVar("perf_run", default=None)
+
+class RunMetrics:
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.setup_ms = None
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.external = defaultdict(lambda: [0, 0.0])  # nama -> [jumlah, ms]
+
+    def as_dict(self, total_ms):
+        return {
+            "page": self.page, "total_ms": round(total_ms, 2), "setup_ms": round(self.setup_ms or 0, 2),
+            "sql_count": self.sql_count, "sql_ms": round(self.sql_ms, 2),
+            "external": {name: {"calls": n, "ms": round(ms, 2)} for name, (n, ms) in self.external.items()},
+        }
+
+def _percentile(values, pct):
+    return values[min(int(len(values) * pct), len(values) - 1)] if values else 0.0
+
+class PerfRegistry:
+    def __init__(self, samples_per_page=SAMPLES_PER_PAGE, log_runs=False):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=samples_per_page))
+        self.log_runs = log_runs
+        # Counter kumulatif (untuk Prometheus)
+        self.page_runs = defaultdict(int)
+        self.page_ms = defaultdict(float)
+        self.sql_total = defaultdict(int)
+        self.sql_ms_total = defaultdict(float)
+        self.external_total = defaultdict(lambda: [0, 0.0, 0])  # nama -> [jumlah, ms, error]
+        self.fragment_ticks = defaultdict(lambda: deque(maxlen=600))
+
+    # --- RUN ---
+    def start_run(self, page="?"):
+        run = RunMetrics(page)
+        return run, _current_run.set(run)
+
+    def finish_run(self, run, token):
+        total_ms = (time.perf_counter() - run.started) * 1000
+        _current_run.reset(token)
+        data = run.as_dict(total_ms)
+        with self._lock:
+            self.samples[run.page].append(data)
+            self.page_runs[run.page] += 1
+            self.page_ms[run.page] += total_ms
+            self.sql_total[run.page] += run.sql_count
+            self.sql_ms_total[run.page] += run.sql_ms
+        if self.log_runs:
+            logger.info(json.dumps(data))
+        return data
+
+    @contextmanager
+    def run(self, page):
+        run, token = self.start_run(page)
+        try:
+            yield run
+        finally:
+            self.finish_run(run, token)
+
+    def set_page(self, page):
+        run = _current_run.get()
+        if run is not None:
+            run.page = page
+
+    def mark_setup_done(self):
+        run = _current_run.get()
+        if run is not None:
+            run.setup_ms = (time.perf_counter() - run.started) * 1000
+
+    @contextmanager
+    def fragment(self, name):
+        # Tick fragment dihitung sebagai run sendiri ("fragment:<nama>")
+        with self._lock:
+            self.fragment_ticks[name].append(time.time())
+        with self.run(f"fragment:{name}") as run:
+            yield run
+
+    # --- SQL ---
+    def instrument_engine(self, db_engine):
+        @event.listens_for(db_engine, "before_cursor_execute")
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("perf_started", []).append(time.perf_counter())
+
+        @event.listens_for(db_engine, "after_cursor_execute")
+        def after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["perf_started"].pop()
+            self._add_sql((time.perf_counter() - started) * 1000)
+
+        @event.listens_for(db_engine, "handle_error")
+        def failed(exception_context):
+            # Statement gagal: after_cursor_execute tidak dipanggil
+            conn = exception_context.connection
+            if conn is not None and conn.info.get("perf_started"):
+                self._add_sql((time.perf_counter() - conn.info["perf_started"].pop()) * 1000)
+        return db_engine
+
+    def _add_sql(self, ms):
+        run = _current_run.get()
+        if run is not None:
+            run.sql_count += 1
+            run.sql_ms += ms
+            return
+        with self._lock:
+            self.sql_total[BACKGROUND] += 1
+            self.sql_ms_total[BACKGROUND] += ms
+
+    # --- PANGGILAN EKSTERNAL ---
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            run = _current_run.get()
+            if run is not None:
+                run.external[name][0] += 1
+                run.external[name][1] += ms
+            with self._lock:
+                total = self.external_total[name]
+                total[0] += 1
+                total[1] += ms
+                total[2] += int(failed)
+
+    # --- RINGKASAN ---
+    def summary(self):
+        with self._lock:
+            pages = {page: list(samples) for page, samples in self.samples.items()}
+            externals = {name: list(v) for name, v in self.external_total.items()}
+            ticks = {name: list(v) for name, v in self.fragment_ticks.items()}
+            background_sql = (self.sql_total.get(BACKGROUND, 0), self.sql_ms_total.get(BACKGROUND, 0.0))
+        rows = []
+        for page, samples in sorted(pages.items()):
+            total = sorted(s["total_ms"] for s in samples)
+            sql = sorted(s["sql_count"] for s in samples)
+            rows.append({
+                "page": page, "runs": len(samples),
+                "p50_ms": _percentile(total, 0.5), "p95_ms": _percentile(total, 0.95),
+                "sql_p50": _percentile(sql, 0.5), "sql_max": sql[-1],
+                "sql_ms_avg": round(sum(s["sql_ms"] for s in samples) / len(samples), 2),
+                "setup_ms_p50": _percentile(sorted(s["setup_ms"] for s in samples), 0.5),
+            })
+        now = time.time()
+        return {
+            "pages": rows,
+            "external": {name: {"calls": n, "avg_ms": round(ms / n, 1) if n else 0, "errors": err}
+                         for name, (n, ms, err) in externals.items()},
+            "fragment_ticks_per_min": {name: sum(1 for t in v if now - t <= 60) for name, v in ticks.items()},
+            "background_sql": {"statements": background_sql[0], "ms": round(background_sql[1], 1)},
+        }
+
+    def prometheus(self):
+        with self._lock:
+            page_runs, page_ms = dict(self.page_runs), dict(self.page_ms)
+            sql_total, sql_ms = dict(self.sql_total), dict(self.sql_ms_total)
+            externals = {name: list(v) for name, v in self.external_total.items()}
+        lines = []
+        def metric(name, kind, help_text, values):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+        # Tick fragment tercatat sebagai page="fragment:<nama>"
+        metric("itsd_page_runs_total", "counter", "Script run / tick fragment per halaman",
+               [({"page": p}, n) for p, n in page_runs.items()])
+        metric("itsd_page_duration_ms_total", "counter", "Total waktu render per halaman (ms)",
+               [({"page": p}, round(ms, 3)) for p, ms in page_ms.items()])
+        metric("itsd_sql_statements_total", "counter", "Statement SQL per halaman",
+               [({"page": p}, n) for p, n in sql_total.items()])
+        metric("itsd_sql_duration_ms_total", "counter", "Waktu SQL per halaman (ms)",
+               [({"page": p}, round(ms, 3)) for p, ms in sql_ms.items()])
+        metric("itsd_external_calls_total", "counter", "Panggilan layanan eksternal",
+               [({"name": n}, v[0]) for n, v in externals.items()])
+        metric("itsd_external_duration_ms_total", "counter", "Waktu panggilan eksternal (ms)",
+               [({"name": n}, round(v[1], 3)) for n, v in externals.items()])
+        metric("itsd_external_errors_total", "counter", "Panggilan eksternal yang gagal",
+               [({"name": n}, v[2]) for n, v in externals.items()])
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+REGISTRY = PerfRegistry()
+
+def timer(name):
+    return REGISTRY.timer(name)
+
+# --- ENDPOINT /metrics ---
+def start_metrics_server(registry=REGISTRY, port=9108, host="127.0.0.1"):
+    # HTTP server kecil di thread daemon, hanya listen di localhost secara default
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics":
+                body, content_type = registry.prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+            elif self.path.split("?")[0] == "/metrics.json":
+                body, content_type = json.dumps(registry.summary()).encode("utf-8"), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="perf-metrics", daemon=True).start()
+    return server
+
+# --- PROFILER ---
+@contextmanager
+def profile(report):
+    # Profil blok kode dengan pyinstrument (kalau terpasang) atau cProfile.
+    # report(teks) tetap dipanggil kalau blok keluar lewat exception (mis. st.rerun()).
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            report(profiler.output_text(unicode=True, color=False))
+        return
+
+    import cProfile
+    import io
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        report(out.getvalue())
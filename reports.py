@@ -0,0 +1,116 @@
+# --- EXPORT LAPORAN ---
+# Laporan tiket Resolved ditulis secara streaming: query per-chunk (yield_per)
+# langsung ke writer (openpyxl write-only / csv / parquet), jadi memori tetap
+# kecil walaupun isinya ratusan ribu baris. Lebar kolom Excel dihitung dari
+# sampel baris pertama saja.
+import csv
+import io
+from datetime import datetime, timedelta
+from itertools import chain, islice
+
+from db import ArchivedTicket, Ticket
+
+REPORT_COLUMNS = [
+    ("ID", Ticket.id),
+    ("Tanggal", Ticket.created_at),
+    ("Pelapor", Ticket.requester_name),
+    ("Aset", Ticket.related_asset),
+    ("Masalah", Ticket.subject),
+    ("Solusi", Ticket.description),
+]
+REPORT_SHEET = 'Laporan Resolved'
+CHUNK_SIZE = 2000
+WIDTH_SAMPLE = 500
+MAX_COLUMN_WIDTH = 80
+
+def iter_report_rows(s, start_date=None, end_date=None, chunk_size=CHUNK_SIZE, include_archive=False):
+    # include_archive: tiket di tickets_archive (lihat archive.py) ikut, ditulis lebih dulu
+    sources = [(ArchivedTicket, None), (Ticket, 'Resolved')] if include_archive else [(Ticket, 'Resolved')]
+    for model, status in sources:
+        query = s.query(*[getattr(model, col.key) for _, col in REPORT_COLUMNS])
+        if status:
+            query = query.filter(model.status == status)
+        if start_date:
+            query = query.filter(model.created_at >= datetime.combine(start_date, datetime.min.time()))
+        if end_date:
+            # end_date inklusif: sampai sebelum tengah malam hari berikutnya
+            query = query.filter(model.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        for row in query.order_by(model.id).execution_options(yield_per=chunk_size):
+            yield tuple(row)
+
+def write_xlsx(rows, out, sample_size=WIDTH_SAMPLE, headers=None, sheet=REPORT_SHEET):
+    # headers/sheet bisa diganti untuk export lain (lihat bulk.py)
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    from openpyxl.utils import get_column_letter
+
+    headers = headers or [name for name, _ in REPORT_COLUMNS]
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    rows = iter(rows)
+    sample = list(islice(rows, sample_size))
+    # Mode write-only: lebar kolom harus diset sebelum baris pertama ditulis
+    for idx, header in enumerate(headers):
+        max_length = max([len(header)] + [len(str(r[idx])) for r in sample if r[idx] is not None])
+        ws.column_dimensions[get_column_letter(idx + 1)].width = (min(max_length, MAX_COLUMN_WIDTH) + 2) * 1.2
+    ws.append(headers)
+    count = 0
+    for row in chain(sample, rows):
+        # Karakter kontrol di teks tiket membuat openpyxl error, buang saja
+        ws.append([ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str) else v for v in row])
+        count += 1
+    wb.save(out)
+    return count
+
+def write_csv(rows, out, headers=None):
+    # Encode sendiri per potongan baris (BOM utf-8-sig supaya Excel membaca huruf
+    # non-ASCII dengan benar). TextIOWrapper di atas SpooledTemporaryFile gagal di
+    # Python 3.10 karena objek itu tidak punya readable/writable.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers or [name for name, _ in REPORT_COLUMNS])
+    out.write(buffer.getvalue().encode("utf-8-sig"))
+    count = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        out.write(buffer.getvalue().encode("utf-8"))
+        count += len(chunk)
+    return count
+
+def write_parquet(rows, out, chunk_size=CHUNK_SIZE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    names = [name for name, _ in REPORT_COLUMNS]
+    schema = pa.schema([
+        ("ID", pa.int64()), ("Tanggal", pa.timestamp("us")), ("Pelapor", pa.string()),
+        ("Aset", pa.string()), ("Masalah", pa.string()), ("Solusi", pa.string()),
+    ])
+    count = 0
+    rows = iter(rows)
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            columns = list(zip(*chunk))
+            writer.write_table(pa.table({name: list(col) for name, col in zip(names, columns)}, schema=schema))
+            count += len(chunk)
+    return count
+
+EXPORT_FORMATS = {
+    "Excel (.xlsx)": (write_xlsx, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV (.csv)": (write_csv, "csv", "text/csv"),
+    "Parquet (.parquet)": (write_parquet, "parquet", "application/vnd.apache.parquet"),
+}
+
+def export_resolved(s, fmt, out, start_date=None, end_date=None, include_archive=False):
+    # Return jumlah baris yang ditulis ke file-like `out` (mode biner)
+    writer, _, _ = EXPORT_FORMATS[fmt]
+    return writer(iter_report_rows(s, start_date, end_date, include_archive=include_archive), out)
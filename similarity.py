@@ -0,0 +1,218 @@
+# --- INDEX TIKET SERUPA ---
+# Vektor hashed n-gram (kata + 3-gram karakter, bobot TF-IDF) dari subject &
+# deskripsi tiket Resolved, disimpan sebagai matriks NumPy ternormalisasi.
+# Query = satu perkalian matriks-vektor, cukup cepat untuk 100k tiket.
+# 3-gram karakter membuat "printer"/"ngeprint"/"print" tetap saling cocok.
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from db import ArchivedComment, ArchivedTicket, Ticket, Comment
+
+DIM = 256
+FINE_BITS = 18
+FINE_BUCKETS = 1 << FINE_BITS
+MIN_SCORE = 0.2
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = {
+    "yang", "dan", "di", "ke", "dari", "ini", "itu", "untuk", "dengan", "pada", "ada", "saya", "kami",
+    "tidak", "bisa", "sudah", "belum", "juga", "atau", "karena", "jadi", "akan", "masih", "sejak",
+    "tapi", "sama", "mohon", "tolong", "pak", "bu", "the", "and", "to", "is", "of",
+}
+
+def ticket_text(subject, description):
+    return f"{subject or ''} {description or ''}"
+
+def features(text):
+    words = [w for w in TOKEN_RE.findall((text or "").lower()) if len(w) > 1 and w not in STOPWORDS]
+    feats = list(words)
+    for w in words:
+        padded = f"#{w}#"
+        feats.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return feats
+
+def hash_features(text):
+    # crc32 (bukan hash()) supaya stabil antar proses; return (bucket unik, jumlah)
+    hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) & (FINE_BUCKETS - 1) for f in features(text)), dtype=np.int64)
+    if hashes.size == 0:
+        return hashes, hashes
+    return np.unique(hashes, return_counts=True)
+
+class SimilarityIndex:
+    def __init__(self, dim=DIM):
+        self.dim = dim
+        self._lock = threading.RLock()
+        self._reset()
+        self.ready = False
+        self._build_thread = None
+
+    def _reset(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self.size = 0
+        self.positions = {}
+        self.df = np.zeros(FINE_BUCKETS, dtype=np.int32)
+        self.n_docs = 0
+        self.built_docs = 0
+        self.idf = np.ones(FINE_BUCKETS, dtype=np.float32)
+
+    def _vectorize(self, buckets, counts):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        if buckets.size:
+            weights = (1 + np.log(counts)) * self.idf[buckets]
+            signs = np.where((buckets >> (FINE_BITS - 1)) & 1, -1.0, 1.0)
+            np.add.at(vec, buckets & (self.dim - 1), weights * signs)
+            norm = np.linalg.norm(vec)
+            if norm:
+                vec /= norm
+        return vec
+
+    def _update_idf(self):
+        self.idf = (np.log((1 + self.n_docs) / (1 + self.df)) + 1).astype(np.float32)
+
+    def build(self, rows):
+        # rows: iterable (ticket_id, subject, description). Dua tahap: hitung DF dulu, baru vektor.
+        hashed = []
+        df = np.zeros(FINE_BUCKETS, dtype=np.int32)
+        for ticket_id, subject, description in rows:
+            buckets, counts = hash_features(ticket_text(subject, description))
+            df[buckets] += 1
+            hashed.append((ticket_id, buckets, counts))
+        with self._lock:
+            self._reset()
+            self.df = df
+            self.n_docs = self.built_docs = len(hashed)
+            self._update_idf()
+            self.matrix = np.zeros((max(len(hashed), 1), self.dim), dtype=np.float32)
+            self.ids = np.full(len(self.matrix), -1, dtype=np.int64)
+            for pos, (ticket_id, buckets, counts) in enumerate(hashed):
+                self.matrix[pos] = self._vectorize(buckets, counts)
+                self.ids[pos] = ticket_id
+                self.positions[ticket_id] = pos
+            self.size = len(hashed)
+            self.ready = True
+
+    def build_async(self, load_rows):
+        # Build awal di background supaya request pertama tidak menunggu. Kalau build
+        # lain masih jalan, pakai yang itu saja: needs_rebuild() tetap True sampai
+        # build selesai, jadi tanpa ini tiap ganti status menumpuk rebuild O(N).
+        def run():
+            try:
+                self.build(load_rows())
+            except Exception as e:
+                print(f"⚠️ Gagal membangun index tiket serupa: {e}")
+
+        with self._lock:
+            if not self.building:
+                self._build_thread = threading.Thread(target=run, name="similarity-build", daemon=True)
+                self._build_thread.start()
+        return self
+
+    @property
+    def building(self):
+        return self._build_thread is not None and self._build_thread.is_alive()
+
+    def add(self, ticket_id, subject, description):
+        # Update incremental saat tiket di-resolve. IDF lama dipakai; index
+        # dianggap perlu rebuild penuh kalau jumlah dokumen sudah 2x saat build.
+        buckets, counts = hash_features(ticket_text(subject, description))
+        with self._lock:
+            if ticket_id not in self.positions:
+                self.df[buckets] += 1
+                self.n_docs += 1
+            vec = self._vectorize(buckets, counts)
+            pos = self.positions.get(ticket_id)
+            if pos is None:
+                if self.size == len(self.matrix):
+                    grown = np.zeros((max(int(len(self.matrix) * 1.25), 64), self.dim), dtype=np.float32)
+                    grown[:self.size] = self.matrix[:self.size]
+                    self.matrix = grown
+                    grown_ids = np.full(len(grown), -1, dtype=np.int64)
+                    grown_ids[:self.size] = self.ids[:self.size]
+                    self.ids = grown_ids
+                pos = self.size
+                self.size += 1
+                self.positions[ticket_id] = pos
+                self.ids[pos] = ticket_id
+            self.matrix[pos] = vec
+
+    def remove(self, ticket_id):
+        # Tiket dibuka lagi (bukan Resolved): nolkan barisnya
+        with self._lock:
+            pos = self.positions.pop(ticket_id, None)
+            if pos is not None:
+                self.matrix[pos] = 0
+                self.ids[pos] = -1
+
+    def needs_rebuild(self):
+        return self.ready and self.n_docs > max(2 * self.built_docs, 100)
+
+    def query(self, text, k=5, exclude_id=None, min_score=MIN_SCORE):
+        # Return list (ticket_id, skor cosine) terurut menurun
+        buckets, counts = hash_features(text)
+        with self._lock:
+            if not self.size or not buckets.size:
+                return []
+            vec = self._vectorize(buckets, counts)
+            scores = self.matrix[:self.size] @ vec
+            ids = self.ids[:self.size]
+        if exclude_id is not None:
+            scores = np.where(ids == exclude_id, -1, scores)
+        k = min(k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] >= min_score and ids[i] >= 0]
+
+# --- HELPER DB ---
+def iter_resolved_tickets(s, batch_size=5000):
+    # Tiket yang sudah diarsip tetap jadi referensi solusi
+    for model, status in ((Ticket, 'Resolved'), (ArchivedTicket, None)):
+        query = s.query(model.id, model.subject, model.description)
+        if status:
+            query = query.filter(model.status == status)
+        for row in query.execution_options(yield_per=batch_size):
+            yield row.id, row.subject, row.description
+
+def _load_details(s, ticket_model, comment_model, ids):
+    tickets = {t.id: t for t in s.query(ticket_model.id, ticket_model.subject, ticket_model.description).filter(ticket_model.id.in_(ids))}
+    replies = {}
+    if tickets:
+        for c in (
+            s.query(comment_model.ticket_id, comment_model.content)
+            .filter(comment_model.ticket_id.in_(list(tickets)), comment_model.sender == "Admin")
+            .order_by(comment_model.id)
+        ):
+            replies[c.ticket_id] = c.content
+    return tickets, replies
+
+def load_similar_details(s, matches):
+    # Lengkapi hasil index dengan subject + balasan Admin terakhir (biasanya berisi solusi).
+    # Id yang tidak ada di tabel tiket (sudah diarsip) dicari di tabel arsip.
+    if not matches:
+        return []
+    ids = [ticket_id for ticket_id, _ in matches]
+    tickets, replies = _load_details(s, Ticket, Comment, ids)
+    missing = [ticket_id for ticket_id in ids if ticket_id not in tickets]
+    if missing:
+        archived, archived_replies = _load_details(s, ArchivedTicket, ArchivedComment, missing)
+        tickets.update(archived)
+        replies.update(archived_replies)
+    details = []
+    for ticket_id, score in matches:
+        t = tickets.get(ticket_id)
+        if t:
+            details.append({
+                "id": ticket_id, "subject": t.subject, "description": t.description,
+                "solution": replies.get(ticket_id), "score": score,
+            })
+    return details
+
+def format_prompt_context(details, max_chars=400):
+    lines = []
+    for d in details:
+        lines.append(f"- Tiket #{d['id']}: {d['subject']}. Masalah: {d['description'][:max_chars]}")
+        if d["solution"]:
+            lines.append(f"  Solusi admin: {d['solution'][:max_chars]}")
+    return "\n".join(lines)
@@ -0,0 +1,109 @@
+# --- SLA ENGINE ---
+# Umur & status SLA dihitung sekaligus untuk satu DataFrame (satu nilai "now"),
+# bukan per baris. Ambang jam bisa beda per prioritas.
+# Query breach/hampir breach dijalankan di DB dengan filter created_at per
+# prioritas, jadi tidak perlu memindai semua tiket open di Python.
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, or_, and_
+
+from db import Ticket
+
+# prioritas -> (jam mulai kuning/peringatan, jam breach/merah)
+DEFAULT_SLA_HOURS = {
+    "Critical": (4, 8),
+    "High": (8, 24),
+    "Medium": (24, 48),
+    "Low": (24, 48),
+}
+ACTIVE_STATUSES = ["Open", "In Progress"]
+DUE_SOON_HOURS = 2
+
+def load_thresholds(overrides=None):
+    # overrides mis. dari st.secrets: {"Critical": [2, 4]}
+    thresholds = dict(DEFAULT_SLA_HOURS)
+    for priority, hours in (overrides or {}).items():
+        thresholds[priority] = (float(hours[0]), float(hours[1]))
+    return thresholds
+
+def compute_sla(df, now, thresholds=None):
+    # df minimal punya kolom created_at, status, priority. Return df + kolom
+    # sla_age_hours, sla_state (done/ok/warning/breach) dan label SLA.
+    thresholds = thresholds or DEFAULT_SLA_HOURS
+    out = df.copy()
+    if out.empty:
+        return out.assign(sla_age_hours=[], sla_state=[], SLA=[])
+    age = (now - pd.to_datetime(out["created_at"])).dt.total_seconds().to_numpy() / 3600
+    default_warn, default_breach = DEFAULT_SLA_HOURS["Low"]
+    warn = out["priority"].map({p: h[0] for p, h in thresholds.items()}).fillna(default_warn).to_numpy()
+    breach = out["priority"].map({p: h[1] for p, h in thresholds.items()}).fillna(default_breach).to_numpy()
+    done = (out["status"] == "Resolved").to_numpy()
+
+    state = np.select([done, age >= breach, age >= warn], ["done", "breach", "warning"], default="ok")
+    icon = pd.Series(state).map({"ok": "🟢", "warning": "🟡", "breach": "🔴"}).fillna("")
+    age_label = np.where(
+        age < 24,
+        pd.Series(np.maximum(age, 0).astype(int)).astype(str) + " Jam",
+        pd.Series((age / 24).astype(int)).astype(str) + " Hari",
+    )
+    label = np.where(done, "Selesai", icon.to_numpy() + " " + age_label)
+
+    out["sla_age_hours"] = age
+    out["sla_state"] = state
+    out["SLA"] = label
+    return out
+
+def _deadline_filters(now, thresholds, hours_before=0):
+    # created_at <= now - (breach - hours_before) per prioritas
+    clauses = []
+    for priority, (_, breach) in thresholds.items():
+        clauses.append(and_(
+            Ticket.priority == priority,
+            Ticket.created_at <= now - timedelta(hours=max(breach - hours_before, 0)),
+        ))
+    return or_(*clauses)
+
+def get_sla_watchlist(s, now, thresholds=None, due_soon_hours=DUE_SOON_HOURS, limit=50):
+    # Tiket aktif yang sudah breach atau akan breach dalam `due_soon_hours` jam
+    thresholds = thresholds or DEFAULT_SLA_HOURS
+    rows = (
+        s.query(Ticket.id, Ticket.created_at, Ticket.requester_name, Ticket.subject, Ticket.priority, Ticket.status)
+        .filter(Ticket.status.in_(ACTIVE_STATUSES), _deadline_filters(now, thresholds, due_soon_hours))
+        .order_by(Ticket.created_at)
+        .limit(limit)
+        .all()
+    )
+    return rows
+
+def get_sla_summary(s, now, thresholds=None, due_soon_hours=DUE_SOON_HOURS):
+    # Jumlah tiket aktif per prioritas: total, breach, hampir breach (satu GROUP BY)
+    thresholds = thresholds or DEFAULT_SLA_HOURS
+    breached = case(
+        *[(and_(Ticket.priority == p, Ticket.created_at <= now - timedelta(hours=h[1])), 1) for p, h in thresholds.items()],
+        else_=0,
+    )
+    due_soon = case(
+        *[(and_(
+            Ticket.priority == p,
+            Ticket.created_at > now - timedelta(hours=h[1]),
+            Ticket.created_at <= now - timedelta(hours=max(h[1] - due_soon_hours, 0)),
+        ), 1) for p, h in thresholds.items()],
+        else_=0,
+    )
+    rows = (
+        s.query(
+            Ticket.priority,
+            func.count(Ticket.id),
+            func.sum(breached),
+            func.sum(due_soon),
+        )
+        .filter(Ticket.status.in_(ACTIVE_STATUSES))
+        .group_by(Ticket.priority)
+        .all()
+    )
+    return {
+        priority: {"active": total, "breach": int(n_breach or 0), "due_soon": int(n_soon or 0)}
+        for priority, total, n_breach, n_soon in rows
+    }
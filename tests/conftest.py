@@ -0,0 +1,21 @@
+import os
+import sys
+
+# Modul app ada di root repo (flat), bukan package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from db import build_engine, create_schema, make_session_factory
+
+@pytest.fixture
+def db_engine(tmp_path):
+    # SQLite sementara dengan skema lengkap (termasuk FTS5), dibuang setelah test
+    db_engine = build_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    create_schema(db_engine)
+    yield db_engine
+    db_engine.dispose()
+
+@pytest.fixture
+def session_factory(db_engine):
+    return make_session_factory(db_engine)
@@ -0,0 +1,50 @@
+# SuggestionService dengan FakeModelClient: request digabung, cache DB, rate limit
+from concurrent.futures import wait
+
+import pytest
+
+from ai_assistant import FakeModelClient, QuotaExceeded, SuggestionService, TokenBucket
+
+TICKET = (1, "Laptop tidak bisa connect WiFi kantor", "Hardware", "Laptop Dell (SN-01)")
+
+class FailingClient(FakeModelClient):
+    def generate(self, prompt):
+        self.calls += 1
+        raise RuntimeError("model error")
+
+def test_concurrent_submits_share_one_model_call(session_factory):
+    client = FakeModelClient(delay=0.2)
+    service = SuggestionService(client, session_factory, max_workers=4)
+    futures = [service.submit(*TICKET) for _ in range(8)]
+    wait(futures, timeout=5)
+    assert client.calls == 1
+    assert len({f.result() for f in futures}) == 1
+
+def test_resubmit_is_served_from_cache(session_factory):
+    client = FakeModelClient(delay=0)
+    service = SuggestionService(client, session_factory)
+    first = service.submit(*TICKET).result(timeout=5)
+    assert service.get_cached(service.key_for(*TICKET[1:])) == first
+    assert service.submit(*TICKET).result(timeout=5) == first
+    assert "".join(service.stream(*TICKET)) == first
+    assert client.calls == 1
+
+def test_requests_over_the_limit_are_throttled(session_factory):
+    client = FakeModelClient(delay=0)
+    service = SuggestionService(client, session_factory, limiter=TokenBucket(rate_per_minute=1, capacity=2))
+    for i in range(2):
+        service.submit(i + 1, f"Printer {i} macet", "Hardware", None).result(timeout=5)
+    with pytest.raises(QuotaExceeded):
+        service.submit(3, "Printer 3 macet", "Hardware", None).result(timeout=5)
+    assert client.calls == 2
+
+def test_model_error_reaches_the_caller_and_is_not_cached(session_factory):
+    client = FailingClient(delay=0)
+    service = SuggestionService(client, session_factory)
+    with pytest.raises(RuntimeError, match="model error"):
+        service.submit(*TICKET).result(timeout=5)
+    assert service.get_cached(service.key_for(*TICKET[1:])) is None
+    # Request berikutnya mencoba lagi, bukan memakai Future lama yang gagal
+    with pytest.raises(RuntimeError):
+        service.submit(*TICKET).result(timeout=5)
+    assert client.calls == 2
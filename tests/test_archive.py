@@ -0,0 +1,50 @@
+# Arsip tiket Resolved lama: pindah tabel tanpa mengubah id, tetap bisa dicari & dilaporkan
+from datetime import timedelta
+
+from archive import archive_resolved_tickets, archive_cutoff
+from db import (
+    ArchivedComment, ArchivedTicket, Comment, Ticket, TicketEvent, add_ticket_events, get_wib_time,
+    prune_ticket_events, search_tickets, session_scope,
+)
+from reports import iter_report_rows
+
+def add_ticket(s, subject, status, age_days):
+    created_at = get_wib_time() - timedelta(days=age_days)
+    ticket = Ticket(requester_name="Budi", department="Finance", category="Hardware", priority="Medium",
+                    subject=subject, description=f"{subject} sejak pagi", status=status, created_at=created_at)
+    s.add(ticket)
+    s.flush()
+    s.add(Comment(ticket_id=ticket.id, sender="Admin", content=f"Solusi untuk {subject}", created_at=created_at))
+    add_ticket_events(s, "ticket", [(ticket.id, subject)], actor="Budi", created_at=created_at)
+    return ticket.id
+
+def test_archive_moves_old_resolved_tickets(db_engine, session_factory):
+    with session_scope(session_factory) as s:
+        old_ids = [add_ticket(s, "Printer macet lantai 3", "Resolved", 400), add_ticket(s, "Monitor berkedip", "Resolved", 300)]
+        open_id = add_ticket(s, "Printer tinta habis", "Open", 400)
+        recent_id = add_ticket(s, "Printer offline", "Resolved", 5)
+        s.commit()
+
+    result = archive_resolved_tickets(db_engine, 180, batch_size=1, pause=0)
+    assert (result["tickets"], result["comments"]) == (2, 2)
+    assert prune_ticket_events(db_engine, archive_cutoff(180)) == 3
+
+    with session_scope(session_factory) as s:
+        # Id asli dipertahankan, baris hilang dari tabel aktif
+        assert sorted(r.id for r in s.query(ArchivedTicket.id)) == sorted(old_ids)
+        assert sorted(r.ticket_id for r in s.query(ArchivedComment.ticket_id)) == sorted(old_ids)
+        assert sorted(r.id for r in s.query(Ticket.id)) == [open_id, recent_id]
+        assert s.query(Comment).filter(Comment.ticket_id.in_(old_ids)).count() == 0
+        assert [r.ticket_id for r in s.query(TicketEvent.ticket_id)] == [recent_id]
+
+        # Laporan: arsip hanya ikut dengan include_archive=True
+        assert [r[0] for r in iter_report_rows(s)] == [recent_id]
+        assert sorted(r[0] for r in iter_report_rows(s, include_archive=True)) == sorted(old_ids + [recent_id])
+
+        # Full-text search: tabel aktif tidak lagi menemukan tiket arsip, tabel arsip menemukannya
+        assert sorted(r.id for r in search_tickets(s, "printer")) == [open_id, recent_id]
+        assert [r.id for r in search_tickets(s, "printer", archive=True)] == [old_ids[0]]
+        assert [r.id for r in search_tickets(s, "monitor", archive=True)] == [old_ids[1]]
+
+        # Id baru tidak bentrok dengan id di arsip
+        assert add_ticket(s, "Keyboard rusak", "Open", 0) > max(old_ids + [recent_id])
@@ -0,0 +1,48 @@
+# Penyimpanan lampiran (lokal & S3 lewat LocalS3Client) dan thumbnail
+import io
+
+import pytest
+from PIL import Image
+
+from attachments import AttachmentService, LocalAttachmentStore, LocalS3Client, S3AttachmentStore, THUMB_SIZE, thumbnail_key
+
+@pytest.fixture(params=["local", "s3"])
+def store(request, tmp_path):
+    if request.param == "local":
+        return LocalAttachmentStore(str(tmp_path / "uploads"))
+    return S3AttachmentStore("lampiran", prefix="itsd", client=LocalS3Client())
+
+def png_bytes(size=(1200, 800)):
+    out = io.BytesIO()
+    Image.new("RGBA", size, (200, 30, 30, 128)).save(out, "PNG")
+    return out.getvalue()
+
+def test_store_round_trip(store):
+    assert not store.exists("ab/file.png")
+    store.put("ab/file.png", b"isi file", "image/png")
+    assert store.exists("ab/file.png")
+    assert store.get("ab/file.png") == b"isi file"
+
+def test_missing_s3_object_raises_from_get():
+    store = S3AttachmentStore("lampiran", client=LocalS3Client())
+    with pytest.raises(LocalS3Client.NotFound):
+        store.get("tidak/ada.png")
+
+def test_save_deduplicates_and_builds_thumbnail(store):
+    service = AttachmentService(store)
+    data = png_bytes()
+    key = service.save("layar.png", data)
+    assert service.save("salinan.png", data) == key
+    service.schedule_thumbnail(key).result(timeout=5)
+    assert service.counters["saved"] == 1 and service.counters["deduplicated"] == 1
+    assert service.load(key) == data
+    with Image.open(io.BytesIO(service.thumbnail(key))) as thumb:
+        assert thumb.format == "JPEG"
+        assert thumb.width <= THUMB_SIZE[0] and thumb.height <= THUMB_SIZE[1]
+    assert store.exists(thumbnail_key(key))
+
+def test_thumbnail_of_broken_image_returns_none(store):
+    service = AttachmentService(store)
+    key = service.save("rusak.png", b"bukan gambar")
+    assert service.thumbnail(key, timeout=5) is None
+    assert service.counters["thumbnail_errors"] >= 1
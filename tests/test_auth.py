@@ -0,0 +1,47 @@
+# Token sesi: token rusak / palsu harus ditolak, bukan melempar exception
+import base64
+
+import pytest
+
+from auth import AuthService, ensure_default_admin
+
+@pytest.fixture
+def auth(session_factory):
+    ensure_default_admin(session_factory)
+    return AuthService(session_factory, secret="rahasia")
+
+def encode(raw):
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def test_valid_token_round_trip(auth):
+    user = auth.login("admin", "admin123")
+    assert auth.verify_token(auth.issue_token(user))["username"] == "admin"
+
+@pytest.mark.parametrize("token", [
+    encode("admin|admin|abc|9999999999|tanda-tangan-é"),
+    encode("admin|admin|abc|bukan-angka|00"),
+    "bukan base64 ✓",
+    None,
+])
+def test_tampered_token_is_rejected(auth, token):
+    assert auth.verify_token(token) is None
+
+def test_failed_logins_from_one_ip_do_not_lock_out_others(auth):
+    from auth import LoginThrottled
+    with pytest.raises(LoginThrottled):
+        for _ in range(auth.burst + 1):
+            auth.login("admin", "salah", ip="203.0.113.9")
+    assert auth.login("admin", "admin123", ip="198.51.100.7")["username"] == "admin"
+
+def test_successful_logins_do_not_spend_the_shared_ip_quota(auth):
+    # Di belakang reverse proxy semua user datang dari satu IP
+    for _ in range(auth.burst * 3):
+        assert auth.login("admin", "admin123", ip="10.0.0.1")["username"] == "admin"
+
+def test_ip_rejection_does_not_drain_the_user_bucket(auth):
+    from auth import LoginThrottled
+    for i in range(auth.burst):
+        auth.login(f"tamu{i}", "salah", ip="203.0.113.9")
+    with pytest.raises(LoginThrottled):
+        auth.login("admin", "salah", ip="203.0.113.9")
+    assert auth._bucket("user:203.0.113.9:admin").tokens == auth.burst
@@ -0,0 +1,62 @@
+# Import aset & tindakan massal tiket
+import io
+import tempfile
+
+import pytest
+from sqlalchemy import event, insert, select
+
+from bulk import export_rows, import_assets
+from db import Asset, Ticket, bulk_update_tickets, get_wib_time, session_scope
+
+CSV = "name,category,serial_number\nA,Laptop,S1\nB,Laptop,S2\nC,Laptop,S1\nD,Laptop,\nE,Laptop,S3\n"
+
+@pytest.fixture(autouse=True)
+def existing_asset(db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(insert(Asset), [{"name": "lama", "category": "PC", "serial_number": "S2"}])
+
+def assets(db_engine):
+    with db_engine.connect() as conn:
+        return dict(conn.execute(select(Asset.serial_number, Asset.name)).all())
+
+def test_update_counts_serial_repeated_in_file(db_engine):
+    result = import_assets(db_engine, io.BytesIO(CSV.encode()), "aset.csv", "update")
+    assert (result["inserted"], result["updated"], result["skipped"]) == (3, 1, 1)
+    assert assets(db_engine) == {"S1": "C", "S2": "B", None: "D", "S3": "E"}
+
+def test_serial_inserted_concurrently_is_skipped(db_engine):
+    # Proses lain menambah S3 tepat sebelum INSERT batch ini
+    raced = []
+
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def race(conn, cursor, statement, params, context, executemany):
+        if statement.startswith("INSERT INTO assets") and not raced:
+            raced.append(statement)
+            cursor.execute("INSERT INTO assets (name, category, serial_number, status) VALUES ('lain', 'PC', 'S3', 'Tersedia')")
+
+    result = import_assets(db_engine, io.BytesIO(CSV.encode()), "aset.csv", "error")
+    assert result["inserted"] == 2
+    assert result["errors"] == [(3, "serial number S2 sudah ada"), (4, "serial number S1 sudah ada"),
+                                (6, "serial number S3 sudah ada")]
+    assert assets(db_engine)["S3"] == "lain"
+
+def test_bulk_update_skips_tickets_already_in_target_state(session_factory):
+    with session_scope(session_factory) as s:
+        s.add_all([Ticket(requester_name="a", department="IT", category="PC", priority="High", subject="s", description="d",
+                          status=status, created_at=get_wib_time())
+                   for status in ("Open", "Resolved", "Open")])
+        s.commit()
+        status_ids, priority_ids = bulk_update_tickets(s, [1, 2, 3], status="Resolved", priority="High")
+        s.commit()
+        assert (status_ids, priority_ids) == ({1, 3}, set())
+        assert bulk_update_tickets(s, [1, 2, 3], status="Resolved") == (set(), set())
+
+def test_asset_backup_round_trip(db_engine, session_factory):
+    import_assets(db_engine, io.BytesIO(CSV.encode()), "aset.csv", "skip")
+    with tempfile.SpooledTemporaryFile() as out:
+        with session_scope(session_factory) as s:
+            assert export_rows(s, "assets", ".csv", out) == 4
+        out.seek(0)
+        result = import_assets(db_engine, out, "backup.csv", "skip")
+    # Aset tanpa serial number tidak punya kunci, jadi ditambah lagi
+    assert (result["inserted"], result["skipped"]) == (1, 3)
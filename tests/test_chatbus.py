@@ -0,0 +1,58 @@
+# Chat bus in-memory (mode SQLite / tanpa LISTEN) & parsing payload NOTIFY
+import threading
+from datetime import datetime
+
+from chatbus import ChatBus, ChatMessage, notify_payload, parse_notify_payload
+
+def message(i):
+    return ChatMessage(i, "Budi", f"pesan {i}", datetime(2026, 1, 1))
+
+def test_publish_delivers_buffered_messages():
+    bus = ChatBus()
+    version, chats = bus.events_since(1, None)
+    assert (version, chats) == (0, None)  # subscriber baru selalu baca DB dulu
+    assert bus.events_since(1, version) == (0, [])
+    bus.publish(1, message(1))
+    bus.publish(1, message(2))
+    assert bus.events_since(1, version) == (2, [message(1), message(2)])
+    assert bus.events_since(2, 0) == (0, [])  # tiket lain tidak terpengaruh
+
+def test_buffer_trim_forces_db_read():
+    bus = ChatBus(buffer_size=3)
+    for i in range(1, 6):
+        bus.publish(7, message(i))
+    # Versi 1-2 sudah terbuang dari buffer -> caller harus baca DB
+    assert bus.events_since(7, 0) == (5, None)
+    assert bus.events_since(7, 2) == (5, [message(3), message(4), message(5)])
+
+def test_notification_without_message_forces_db_read():
+    bus = ChatBus()
+    bus.publish(3, message(1))
+    bus.publish(3)
+    assert bus.events_since(3, 0) == (2, None)
+
+def test_subscriber_wakes_up_on_publish_from_other_thread():
+    bus = ChatBus()
+    version, _ = bus.events_since(9, None)
+    seen = []
+    done = threading.Event()
+
+    def subscriber():
+        # Seperti tick fragment chat: cek versi di memori sampai ada perubahan
+        while not done.wait(0.01):
+            current, chats = bus.events_since(9, version)
+            if chats:
+                seen.extend(chats)
+                done.set()
+
+    thread = threading.Thread(target=subscriber)
+    thread.start()
+    bus.publish(9, message(1))
+    assert done.wait(2)
+    thread.join()
+    assert seen == [message(1)]
+
+def test_own_notifications_are_ignored():
+    assert parse_notify_payload(notify_payload(42, origin="abc"), origin="abc") is None
+    assert parse_notify_payload(notify_payload(42, origin="other"), origin="abc") == 42
+    assert parse_notify_payload("bukan-angka", origin="abc") is None
@@ -0,0 +1,83 @@
+# TelegramNotifier terhadap stub endpoint sendMessage lokal
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from db import OutboxMessage, session_scope
+from notifier import TelegramNotifier
+
+class StubTelegram:
+    # Jawab sendMessage sesuai urutan `responses` (status, body), lalu 200 terus
+    def __init__(self, responses=()):
+        stub = self
+        self.responses = list(responses)
+        self.calls = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.calls.append(self.path)
+                status, body = stub.responses.pop(0) if stub.responses else (200, {"ok": True, "result": {}})
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def close(self):
+        self.server.shutdown()
+
+def outbox_rows(session_factory):
+    with session_scope(session_factory) as s:
+        return s.query(OutboxMessage.status, OutboxMessage.attempts).order_by(OutboxMessage.id).all()
+
+def wait_until(check, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return True
+        time.sleep(0.02)
+    return False
+
+def make_notifier(stub, session_factory):
+    return TelegramNotifier("TOKEN", "123", session_factory=session_factory, api_base=stub.url,
+                            min_interval=0, backoff_base=0.05)
+
+def test_429_is_retried_after_retry_after(session_factory):
+    stub = StubTelegram([(429, {"ok": False, "parameters": {"retry_after": 0.2}})])
+    notifier = make_notifier(stub, session_factory).start()
+    try:
+        started = time.monotonic()
+        notifier.send("tiket baru")
+        assert wait_until(lambda: notifier.stats()["sent"] == 1)
+        assert time.monotonic() - started >= 0.2
+        assert len(stub.calls) == 2
+        assert notifier.stats()["retried"] == 1
+        # 429 tidak dihitung sebagai percobaan gagal
+        assert outbox_rows(session_factory) == [("sent", 1)]
+    finally:
+        notifier.stop()
+        stub.close()
+
+def test_pending_outbox_is_sent_after_restart(session_factory):
+    stub = StubTelegram()
+    # Proses lama: pesan tercatat di outbox tapi worker tidak sempat jalan
+    make_notifier(stub, session_factory).send("belum terkirim")
+    assert outbox_rows(session_factory) == [("pending", 0)]
+
+    notifier = make_notifier(stub, session_factory).start()
+    try:
+        assert wait_until(lambda: outbox_rows(session_factory) == [("sent", 1)])
+        assert len(stub.calls) == 1
+    finally:
+        notifier.stop()
+        stub.close()
@@ -0,0 +1,18 @@
+# Penulis laporan ke file sementara (sama seperti download di app.py)
+import csv
+import io
+import tempfile
+
+from reports import write_csv
+
+def test_write_csv_into_spooled_file():
+    rows = [(i, f"Budi {i}", "Printer érror, lantai 3") for i in range(5001)]
+    with tempfile.SpooledTemporaryFile(max_size=1024) as out:
+        assert write_csv(rows, out, headers=["ID", "Pelapor", "Masalah"]) == 5001
+        out.seek(0)
+        data = out.read()
+    assert data.startswith(b"\xef\xbb\xbf")
+    parsed = list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+    assert parsed[0] == ["ID", "Pelapor", "Masalah"]
+    assert parsed[-1] == ["5000", "Budi 5000", "Printer érror, lantai 3"]
+    assert len(parsed) == 5002
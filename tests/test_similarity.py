@@ -0,0 +1,25 @@
+# Index tiket serupa: rebuild di background
+import threading
+
+from similarity import SimilarityIndex
+
+def test_build_async_reuses_running_build():
+    release = threading.Event()
+    calls = []
+
+    def load_rows():
+        calls.append(1)
+        release.wait(5)
+        return [(1, "Printer macet", "Kertas nyangkut di printer lantai 3")]
+
+    index = SimilarityIndex()
+    index.build_async(load_rows)
+    index.build_async(load_rows)
+    assert index.building
+    release.set()
+    index._build_thread.join(5)
+    assert len(calls) == 1
+    assert index.ready and index.query("printer macet")[0][0] == 1
+    # Setelah selesai, rebuild berikutnya boleh jalan lagi
+    index.build_async(load_rows)._build_thread.join(5)
+    assert len(calls) == 2